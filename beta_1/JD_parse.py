@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db.models import Q
+from django.utils.module_loading import import_string
 from dateutil import parser
 import datetime
 import re
@@ -8,7 +10,12 @@ from pydantic import BaseModel
 import json
 from dotenv import load_dotenv
 import os
-from .serializers import CandidateSerializer , CandidateFullSerializer # Import at the top
+from .candidate_pool import candidate_pool, scope_company
+from .fulltext import NOT_SEARCHED, match_keywords
+from .gemini import generate_content
+from .jd_compile import CompiledJD, compile_jd
+from .llm_rerank import rerank_candidates
+from .prompt_compaction import compact_inputs
 
 load_dotenv()
 
@@ -45,7 +52,7 @@ class CandidateScore(BaseModel):
     underfit: bool | None = None
 
 def extract_jd_requirements(jd_content: str) -> JDRequirements | None:
-    client = genai.Client(api_key=api_key)
+    jd_content = compact_inputs("gemini-2.0-flash", 'JD requirements', jd=jd_content)['jd']
     prompt = f"""
     Extract the key requirements from the following job description and format them as a JSON object according to the schema provided.
 
@@ -67,7 +74,7 @@ def extract_jd_requirements(jd_content: str) -> JDRequirements | None:
     }}
     """
     try:
-        response = client.models.generate_content(
+        response = generate_content(
             model="gemini-2.0-flash",
             contents=prompt,
             config={"response_mime_type": "application/json", "response_schema": JDRequirements},
@@ -77,31 +84,76 @@ def extract_jd_requirements(jd_content: str) -> JDRequirements | None:
         print(f"Error extracting JD requirements: {e}")
         return None
 
-def find_matching_candidates(jd_content: str):
-    jd_requirements = extract_jd_requirements(jd_content)
-    if not jd_requirements:
+def find_matching_candidates(jd_content: str, company=None, user=None, min_years=None, require_skill_match=None):
+    """
+    Ranks one company's candidates against a job description. The scope is company, else
+    the HR user's company; without either nothing is ranked. Status, minimum experience and
+    required-skill filters run in SQL (candidate_pool), so only that subset is scored.
+
+    Returns:
+        [(candidate, score, details)] best first
+    """
+    company = scope_company(company, user)
+    if company is None:
+        print("Error finding matching candidates: no company or HR user to scope the search to")
         return []
+    # Requirements are extracted once per JD text and compiled once per process
+    compiled_jd = compile_jd(jd_content)
+    if not compiled_jd:
+        return []
+    pool = candidate_pool(company, compiled_jd, min_years=min_years, require_skill_match=require_skill_match)
+    # By default rankings are snapshotted and only candidates changed since the last one are
+    # re-scored; sql_ranking.rank_in_database scores in the database instead
+    return import_string(settings.RANKING_BACKEND)(company, compiled_jd, jd_content, pool)
 
-    candidates = Candidate.objects.all()
-    scored_candidates_with_details = []
+def score_pool(compiled_jd, candidates, company=None, keyword_hits=NOT_SEARCHED):
+    """
+    Scores candidates against a compiled JD.
+
+    Args:
+        keyword_hits: fulltext.match_keywords result the caller already has, else it is searched here
 
-    for candidate in candidates:
-        score, details = score_candidate(candidate, jd_requirements)
+    Returns:
+        [(candidate, score, details)] in queryset order
+    """
+    if keyword_hits is NOT_SEARCHED:
+        # Keyword and project-keyword matches for the whole pool come from the full-text index in one query
+        keyword_hits = match_keywords(compiled_jd.keywords, compiled_jd.project_keywords, company=company)
+    scored_candidates_with_details = []
+    for candidate in candidates.prefetch_related('candidateskill_set__skill', 'experiences'):
+        score, details = score_candidate(candidate, compiled_jd, keyword_hits=keyword_hits)
         scored_candidates_with_details.append((candidate, score, details))
+    return scored_candidates_with_details
 
-    ranked_candidates = sorted(scored_candidates_with_details, key=lambda item: item[1], reverse=True)
-    return ranked_candidates
+def sort_ranking(scored_candidates_with_details):
+    # BM25 relevance breaks ties between equal scores
+    return sorted(
+        scored_candidates_with_details,
+        key=lambda item: (item[1], item[2].get('keyword_relevance', 0.0)),
+        reverse=True,
+    )
 
-def score_candidate(candidate, jd_requirements):
+def score_candidate(candidate, jd_requirements, keyword_hits=None):
+    """
+    Scores a candidate against extracted JD requirements, given as JDRequirements or, when
+    scoring many candidates, the CompiledJD from jd_compile.compile_jd.
+
+    keyword_hits is the result of fulltext.match_keywords for the pool being ranked; without it
+    keywords are matched by substring against skills, roles and location.
+    """
+    jd = jd_requirements if isinstance(jd_requirements, CompiledJD) else CompiledJD(jd_requirements)
     score = 0
     details = {}
 
     # Skills
-    if jd_requirements.skills:
-        candidate_skills_lower = set(cs.skill.skill_name.lower() for cs in candidate.candidateskill_set.all())
-        matched = [s for s in jd_requirements.skills if s.lower() in candidate_skills_lower]
-        skill_score = (len(matched) / len(jd_requirements.skills)) * 30 # Increased weight
-        details['matched_skills'] = matched
+    if jd.skills:
+        # Similarity-weighted match on canonical skill ids: "React.js" fully matches "React",
+        # a synonym such as "TypeScript" for "JavaScript" earns partial credit
+        candidate_skill_ids = set(cs.skill_id for cs in candidate.candidateskill_set.all())
+        skill_weights = {skill: round(weight, 3) for skill, weight in jd.match_skills(candidate_skill_ids).items()}
+        skill_score = (sum(skill_weights.values()) / len(jd.skills)) * 30 # Increased weight
+        details['matched_skills'] = list(skill_weights)
+        details['skill_match_weights'] = skill_weights
     else:
         skill_score = 30
         details['matched_skills'] = []
@@ -110,8 +162,8 @@ def score_candidate(candidate, jd_requirements):
 
     # Experience
     candidate_exp = calculate_total_experience(candidate)
-    if jd_requirements.experience_years is not None:
-        exp_diff = candidate_exp - jd_requirements.experience_years
+    if jd.experience_years is not None:
+        exp_diff = candidate_exp - jd.experience_years
         if abs(exp_diff) <= 1:
             exp_score = 25 # Increased weight
         elif abs(exp_diff) <= 3:
@@ -126,7 +178,7 @@ def score_candidate(candidate, jd_requirements):
             exp_score -= 5
             details['underfit'] = True
         details['candidate_experience'] = f"{candidate_exp:.2f} years"
-        details['required_experience'] = f"{jd_requirements.experience_years} years"
+        details['required_experience'] = f"{jd.experience_years} years"
     else:
         exp_score = 25
         details['candidate_experience'] = f"{candidate_exp:.2f} years"
@@ -137,48 +189,62 @@ def score_candidate(candidate, jd_requirements):
     # Role
     role_score = 0
     matched_roles = []
-    if jd_requirements.role:
+    if jd.role_lower:
+        exact_role = False
         for exp in candidate.experiences.all():
-            if exp.role and jd_requirements.role.lower() in exp.role.lower():
+            role_lower = exp.role.lower() if exp.role else ''
+            if jd.role_lower in role_lower:
                 matched_roles.append(exp.role)
-        if any(jd_requirements.role.lower() == r.lower() for r in matched_roles):
+                exact_role = exact_role or role_lower == jd.role_lower
+        if exact_role:
             role_score = 20 # Increased weight
         elif matched_roles:
             role_score = 10
     details['matched_roles'] = matched_roles
     details['role_score'] = role_score
-    details['required_role'] = jd_requirements.role
+    details['required_role'] = jd.role
     score += role_score
 
     # Location
     location_score = 0
     candidate_location = getattr(candidate, 'location', None) or getattr(candidate, 'linkedin_url', '')
-    if jd_requirements.location:
-        if candidate_location and jd_requirements.location.lower() == candidate_location.lower():
+    if jd.location_lower and candidate_location:
+        candidate_location_lower = candidate_location.lower()
+        if jd.location_lower == candidate_location_lower:
             location_score = 10
-        elif candidate_location and jd_requirements.location.lower() in candidate_location.lower():
+        elif jd.location_lower in candidate_location_lower:
             location_score = 5
     details['candidate_location'] = candidate_location
     details['location_score'] = location_score
-    details['required_location'] = jd_requirements.location
+    details['required_location'] = jd.location
     score += location_score
 
     # Keywords
     keyword_score = 0
     matched_keywords = []
-    if jd_requirements.keywords:
-        candidate_text = ' '.join([
+    matched_project_keywords = []
+    if keyword_hits is not None:
+        if jd.keywords or jd.project_keywords:
+            hits = keyword_hits.get(candidate.id, {})
+            matched_keywords = hits.get('keywords', [])
+            matched_project_keywords = hits.get('project_keywords', [])
+            total_keywords = len(jd.keywords) + len(jd.project_keywords)
+            keyword_score = ((len(matched_keywords) + len(matched_project_keywords)) / total_keywords) * 15
+            details['keyword_relevance'] = hits.get('relevance', 0.0)
+    elif jd.keywords:
+        candidate_text = '\n'.join([
             ' '.join([cs.skill.skill_name for cs in candidate.candidateskill_set.all()]),
             ' '.join([exp.role or '' for exp in candidate.experiences.all()]),
             candidate_location or ''
-        ]).lower()
-        for kw in jd_requirements.keywords:
-            if kw.lower() in candidate_text:
-                matched_keywords.append(kw)
-        keyword_score = (len(matched_keywords) / len(jd_requirements.keywords)) * 15 # Increased weight
+        ])
+        # One pass of the JD's keyword automaton over the candidate text
+        matched_keywords, _ = jd.keyword_matcher.match(candidate_text)
+        keyword_score = (len(matched_keywords) / len(jd.keywords)) * 15 # Increased weight
     details['matched_keywords'] = matched_keywords
+    details['matched_project_keywords'] = matched_project_keywords
     details['keyword_score'] = keyword_score
-    details['required_keywords'] = jd_requirements.keywords
+    details['required_keywords'] = jd.requirements.keywords
+    details['required_project_keywords'] = jd.requirements.project_keywords
     score += keyword_score
 
     details['total_score'] = score
@@ -193,58 +259,10 @@ def calculate_total_experience(candidate):
             total_experience_years += duration.days / 365.25
     return total_experience_years
 
-def get_candidate_scores_from_llm(jd_content: str):
-    ranked_candidates_with_details = find_matching_candidates(jd_content)
-    client = genai.Client(api_key=api_key)
-    candidate_scores_list = []
-
-    for candidate, score, details in ranked_candidates_with_details:
-        # Serialize full candidate info
-        candidate_data = CandidateFullSerializer(candidate).data
-
-        # Add scoring details
-        # candidate_data.update({
-        #     "total_score": score,
-        #     "skill_score": details.get('skill_score', 0),
-        #     "experience_score": details.get('experience_score', 0),
-        #     "role_score": details.get('role_score', 0),
-        #     "location_score": details.get('location_score', 0),
-        #     "keyword_score": details.get('keyword_score', 0),
-        #     "matched_skills": details.get('matched_skills', []),
-        #     "candidate_experience": details.get('candidate_experience', 'N/A'),
-        #     "required_experience": details.get('required_experience', 'N/A'),
-        #     "matched_roles": details.get('matched_roles', []),
-        #     "required_role": details.get('required_role', 'N/A'),
-        #     "candidate_location": details.get('candidate_location', 'N/A'),
-        #     "required_location": details.get('required_location', 'N/A'),
-        #     "matched_keywords": details.get('matched_keywords', []),
-        #     "overfit": details.get('overfit'),
-        #     "underfit": details.get('underfit'),
-        # })
-        candidate_scores_list.append(candidate_data)
-
-    
-    prompt = f"""Based on the following Job Description:
-{jd_content}
-
-And the following list of candidate scores and matching details:
-
-{json.dumps(candidate_scores_list, indent=2)}
-Re-evaluate the provided scores.
-
-Provide a concise JSON response that includes two top-level keys:
-
-"ranked_candidates": A list of candidates. Each item in the list should represent a candidate and include their "candidate_id", "name", "email", "total_score", "skill_score", and "project_score". Rank the candidates by the re-evaluated "total_score" in descending order.
-
-"candidate_summaries": A dictionary where each key is a "candidate_id" and the value is a short paragraph summarizing the strengths and weaknesses of that candidate based on the provided scores and matching details, highlighting aspects relevant to the job description.
-"""
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config={"response_mime_type": "application/json"},
-        )
-        return json.loads(response.text)
-    except Exception as e:
-        print(f"Error getting candidate scores from LLM: {e}")
-        return {"ranked_candidates": [{"error": "Failed to get LLM scores"}]}
\ No newline at end of file
+def get_candidate_scores_from_llm(jd_content: str, company=None, user=None, min_years=None):
+    """
+    Ranks candidates deterministically, then re-ranks only the top LLM_RERANK_TOP_K with the LLM
+    in token-budgeted chunks of compact profiles that are scored concurrently and merged.
+    """
+    ranked_candidates_with_details = find_matching_candidates(jd_content, company=company, user=user, min_years=min_years)
+    return rerank_candidates(jd_content, ranked_candidates_with_details)
@@ -4,7 +4,11 @@ import os
 import http.client
 import json
 import re
+import httpx
+from asgiref.sync import sync_to_async
 from .models import LinkedInProfile, Company
+from .gemini import agenerate_content, generate_content
+from .prompt_compaction import compact_inputs
 
 load_dotenv()
 
@@ -16,9 +20,13 @@ def extract_linkedin_id(url):
     match = re.search(r'linkedin\.com/in/([^/]+)', url)
     return match.group(1) if match else None
 
-def extract_jd_requirements(jd_content: str):
-    client = genai.Client(api_key=api_key)
-    prompt = f"""
+SEARCH_QUERY_MODEL = "gemini-1.5-flash"
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
+
+
+def search_query_prompt(jd_content: str) -> str:
+    jd_content = compact_inputs(SEARCH_QUERY_MODEL, 'search query', jd=jd_content)['jd']
+    return f"""
     # LinkedIn Profile Search Query Generator
 
 ## Role
@@ -122,9 +130,13 @@ site:linkedin.com/in/ intitle:("Marketing Manager" OR "Digital Marketing Manager
 
 ## Input to Process
 {jd_content} """
+
+
+def extract_jd_requirements(jd_content: str):
+    prompt = search_query_prompt(jd_content)
     try:
-        response = client.models.generate_content(
-            model="gemini-1.5-flash",
+        response = generate_content(
+            model=SEARCH_QUERY_MODEL,
             contents=prompt
         )
         print(response.text.strip())
@@ -133,6 +145,57 @@ site:linkedin.com/in/ intitle:("Marketing Manager" OR "Digital Marketing Manager
         print(f"Error extracting JD requirements: {e}")
         return None
 
+async def aextract_jd_requirements(jd_content: str):
+    """
+    Async counterpart of extract_jd_requirements using the async Gemini client.
+    """
+    try:
+        response = await agenerate_content(
+            model=SEARCH_QUERY_MODEL,
+            contents=search_query_prompt(jd_content)
+        )
+        return response.text.strip()
+    except Exception as e:
+        print(f"Error extracting JD requirements: {e}")
+        return None
+
+def store_search_results(data: dict, search_query: str, company):
+    """
+    Stores the organic LinkedIn results of a Serper response for a company.
+
+    Returns:
+        list of the stored profiles as dicts
+    """
+    results = []
+    for result in data.get('organic', []):
+        linkedin_id = extract_linkedin_id(result.get('link', ''))
+        if linkedin_id:
+            # Create or update LinkedIn profile in database
+            profile, created = LinkedInProfile.objects.update_or_create(
+                linkedin_id=linkedin_id,
+                company=company,
+                defaults={
+                    'title': result.get('title', ''),
+                    'subtitle': result.get('subtitle', ''),
+                    'link': result.get('link', ''),
+                    'snippet': result.get('snippet', ''),
+                    'position': result.get('position', 0),
+                    'search_query': search_query
+                }
+            )
+
+            results.append({
+                'linkedin_id': linkedin_id,
+                'title': profile.title,
+                'subtitle': profile.subtitle,
+                'link': profile.link,
+                'snippet': profile.snippet,
+                'position': profile.position,
+                'created_at': profile.created_at,
+                'updated_at': profile.updated_at
+            })
+    return results
+
 def search_and_store_profiles(jd_content: str, company=None):
     """
     Search for LinkedIn profiles based on job description and store results in database.
@@ -166,41 +229,40 @@ def search_and_store_profiles(jd_content: str, company=None):
         data = json.loads(response_data)
         
         # Process and store results
-        results = []
-        if 'organic' in data:
-            if not company:
-                return {'error': 'Company is required to store LinkedIn profiles'}
-
-            for result in data['organic']:
-                linkedin_id = extract_linkedin_id(result.get('link', ''))
-                if linkedin_id:
-                    # Create or update LinkedIn profile in database
-                    profile, created = LinkedInProfile.objects.update_or_create(
-                        linkedin_id=linkedin_id,
-                        company=company,
-                        defaults={
-                            'title': result.get('title', ''),
-                            'subtitle': result.get('subtitle', ''),
-                            'link': result.get('link', ''),
-                            'snippet': result.get('snippet', ''),
-                            'position': result.get('position', 0),
-                            'search_query': search_query
-                        }
-                    )
-                    
-                    results.append({
-                        'linkedin_id': linkedin_id,
-                        'title': profile.title,
-                        'subtitle': profile.subtitle,
-                        'link': profile.link,
-                        'snippet': profile.snippet,
-                        'position': profile.position,
-                        'created_at': profile.created_at,
-                        'updated_at': profile.updated_at
-                    })
-        
+        if 'organic' in data and not company:
+            return {'error': 'Company is required to store LinkedIn profiles'}
+        store_search_results(data, search_query, company)
+
         return data  # Return the complete Serper API response
         
     except Exception as e:
         print(f"Error in search_and_store_profiles: {str(e)}")
-        return {'error': f'Error processing request: {str(e)}'}
\ No newline at end of file
+        return {'error': f'Error processing request: {str(e)}'}
+
+async def asearch_and_store_profiles(jd_content: str, company=None):
+    """
+    Async counterpart of search_and_store_profiles: the Gemini and Serper calls are awaited
+    instead of blocking a worker thread, and only the database writes run in a thread.
+    """
+    search_query = await aextract_jd_requirements(jd_content)
+    if not search_query:
+        return {'error': 'Failed to generate search query'}
+
+    try:
+        headers = {
+            'X-API-KEY': os.getenv("SERPER_API_KEY"),
+            'Content-Type': 'application/json'
+        }
+        async with httpx.AsyncClient(timeout=30) as http:
+            response = await http.post(SERPER_SEARCH_URL, json={"q": search_query}, headers=headers)
+        data = response.json()
+
+        if 'organic' in data and not company:
+            return {'error': 'Company is required to store LinkedIn profiles'}
+        await sync_to_async(store_search_results)(data, search_query, company)
+
+        return data  # Return the complete Serper API response
+
+    except Exception as e:
+        print(f"Error in asearch_and_store_profiles: {str(e)}")
+        return {'error': f'Error processing request: {str(e)}'}
@@ -0,0 +1,527 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.db.models import prefetch_related_objects
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+
+from .models import AISummary, ActivityLog, Candidate
+from .JD_parse import calculate_total_experience, find_matching_candidates
+from .llm_rerank import build_ranked_output, iter_rerank_chunks, merge_chunk_results, prepare_rerank
+from .b_views import (
+    SCRAPINGDOG_PROFILE_URL, apply_linkedin_profile, apply_resume_data, scrapingdog_profile_params
+)
+from .b_resume_rank import aget_candidate_analysis, current_profile_hash
+from .JD_scrape import asearch_and_store_profiles
+from .profile_cache import clean_profile_data, get_fresh_profile, load_profile_payload, store_profile
+from .resume_store import aparse_stored_resume, cached_resume_data, release_upload, store_resume_file
+from .text_extraction import aextract_text
+
+# Summaries written by the search stream are keyed apart from the full per-candidate
+# analyses (plain md5 of the JD) so one never overwrites the other.
+SEARCH_SUMMARY_PREFIX = 'search:'
+SCRAPINGDOG_TIMEOUT = 60
+
+
+def search_summary_hash(jd_content: str) -> str:
+    return SEARCH_SUMMARY_PREFIX + hashlib.md5(jd_content.encode()).hexdigest()
+
+
+def sse_event(event: str, data) -> str:
+    """
+    Formats one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _authenticate(request):
+    """
+    Authenticates and parses a plain Django request the way the DRF views do
+    (token or session authentication, JSON/form/multipart bodies).
+
+    Returns:
+        (drf_request, hr_profile, error_response); error_response is None when the
+        user is authenticated and belongs to a company
+    """
+    drf_request = Request(
+        request,
+        parsers=[JSONParser(), FormParser(), MultiPartParser()],
+        authenticators=[TokenAuthentication(), SessionAuthentication()],
+    )
+    try:
+        user = drf_request.user
+    except exceptions.APIException as e:
+        return None, None, JsonResponse({'error': str(e.detail)}, status=e.status_code)
+    if not user or not user.is_authenticated:
+        return None, None, JsonResponse({'error': 'Authentication credentials were not provided or are invalid.'}, status=401)
+    hr_profile = getattr(user, 'hr_profile', None)
+    if hr_profile is None:
+        return None, None, JsonResponse({'error': 'User is not associated with a company.'}, status=403)
+    # Company is read here, in the worker thread, so async code never triggers the lazy query
+    hr_profile.company
+    return drf_request, hr_profile, None
+
+
+def _request_data(drf_request):
+    try:
+        return drf_request.data, None
+    except exceptions.ParseError as e:
+        return None, JsonResponse({'error': str(e.detail)}, status=400)
+
+
+def _parse_bool(value) -> bool:
+    # Form and query values arrive as strings: "false" and "0" must not count as true
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes', 'on')
+    return bool(value)
+
+
+def _keyword_results(ranked) -> list[dict]:
+    # One query for the experiences of every ranked candidate that does not have them loaded
+    prefetch_related_objects([candidate for candidate, _, _ in ranked], 'experiences')
+    return [
+        {
+            'candidate_id': candidate.id,
+            'name': candidate.name,
+            'email': candidate.email,
+            'total_score': round(score, 2),
+            'skill_score': details.get('skill_score'),
+            'project_score': None,
+            'roles': [exp.role for exp in candidate.experiences.all()],
+            'total_experience_years': round(calculate_total_experience(candidate), 2),
+        }
+        for candidate, score, details in ranked
+    ]
+
+
+def _save_summaries(summaries: dict, jd_hash: str, company, user):
+    candidates = Candidate.objects.filter(company=company, id__in=[int(key) for key in summaries])
+    for candidate in candidates:
+        summary_text = summaries.get(str(candidate.id))
+        if not summary_text:
+            continue
+        AISummary.objects.update_or_create(
+            candidate=candidate,
+            job_description_hash=jd_hash,
+            company=company,
+            profile_hash=current_profile_hash(candidate),
+            defaults={'summary_text': summary_text, 'created_by': user, 'is_stale': False},
+        )
+
+
+async def _stream_rerank(jd_content, profiles, anchors):
+    """
+    Runs the blocking chunked re-rank in a worker thread and yields (chunk, result) as each
+    chunk completes, without holding up the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    def worker():
+        try:
+            for item in iter_rerank_chunks(jd_content, profiles, anchors):
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            print(f"Error streaming LLM re-rank: {e}")
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    threading.Thread(target=worker, daemon=True).start()
+    while True:
+        item = await queue.get()
+        if item is done:
+            return
+        yield item
+
+
+async def _search_events(jd_content, user, company):
+    yield sse_event('status', {'stage': 'ranking'})
+    ranked = await sync_to_async(find_matching_candidates)(jd_content, company=company)
+    results = await sync_to_async(_keyword_results)(ranked)
+    yield sse_event('ranking', {'results': results})
+
+    top, profiles, anchors = await sync_to_async(prepare_rerank)(ranked)
+    if not top:
+        yield sse_event('done', {'results': []})
+        return
+
+    yield sse_event('status', {'stage': 'llm'})
+    jd_hash = search_summary_hash(jd_content)
+    chunk_results = []
+    # Anchor candidates are scored in every chunk; send their summary once
+    sent_summaries = set()
+    async for chunk, result in _stream_rerank(jd_content, profiles, anchors):
+        chunk_results.append((chunk, result))
+        if not result:
+            yield sse_event('chunk_error', {'candidate_ids': [profile['candidate_id'] for profile in chunk]})
+            continue
+        # Raw chunk scores; the calibrated ranking follows in the 'final' event
+        yield sse_event('scores', {
+            'scores': [dict(scores, candidate_id=candidate_id) for candidate_id, scores in result['scores'].items()],
+        })
+        for candidate_id, summary_text in result['summaries'].items():
+            if candidate_id in sent_summaries:
+                continue
+            sent_summaries.add(candidate_id)
+            yield sse_event('summary', {'candidate_id': candidate_id, 'summary': summary_text})
+        try:
+            await sync_to_async(_save_summaries)(result['summaries'], jd_hash, company, user)
+        except Exception as e:
+            print(f"Error saving streamed candidate summaries: {e}")
+
+    merged, _ = merge_chunk_results(chunk_results, [anchor['candidate_id'] for anchor in anchors])
+    ranked_output = build_ranked_output(top, merged)
+    yield sse_event('final', {'results': ranked_output, 'job_description_hash': jd_hash})
+    await sync_to_async(ActivityLog.objects.create)(
+        user=user,
+        company=company,
+        activity_type='JD_SEARCH',
+        details_json={'streamed': True, 'candidates_ranked': len(results), 'candidates_reranked': len(ranked_output)},
+    )
+    yield sse_event('done', {})
+
+
+@csrf_exempt
+@require_POST
+async def search_candidates_stream(request):
+    """
+    Streams a JD search over server-sent events.
+
+    Request body: {"query": "<job description>"}; authenticate with "Authorization: Token <key>".
+
+    Events, in order:
+    - ranking: the deterministic keyword ranking, sent as soon as it is computed
+    - scores / summary: LLM scores and summaries per re-ranked chunk as each one returns
+    - final: the calibrated ranking of the re-ranked candidates
+    - done
+    Serve through the ASGI application (skillsync.asgi) so events are not buffered.
+    """
+    drf_request, hr_profile, error = await sync_to_async(_authenticate)(request)
+    if error:
+        return error
+    data, error = await sync_to_async(_request_data)(drf_request)
+    if error:
+        return error
+    jd_content = (data.get('query') or '').strip()
+    if not jd_content:
+        return JsonResponse({'error': 'query is required.'}, status=400)
+
+    response = StreamingHttpResponse(_search_events(jd_content, drf_request.user, hr_profile.company), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# --- Async Sourcing & Analysis Endpoints ---
+# The resume upload, LinkedIn sourcing and AI analysis endpoints. Gemini, Serper and ScrapingDog
+# are awaited rather than blocking a worker thread, so one ASGI process can keep many calls in
+# flight; ORM work uses the async queryset API or runs in a thread via sync_to_async.
+
+@csrf_exempt
+@require_POST
+async def upload_resume_api(request):
+    """
+    Uploads a resume file, parses it with the async Gemini client, creates/updates a Candidate, and logs activity.
+    """
+    drf_request, hr_profile, error = await sync_to_async(_authenticate)(request)
+    if error:
+        return error
+    user, hr_company = drf_request.user, hr_profile.company
+
+    files = await sync_to_async(lambda: drf_request.FILES)()
+    if 'resume_file' not in files:
+        return JsonResponse({'error': 'No resume file provided'}, status=400)
+    resume_file = files['resume_file']
+
+    stored = None
+    try:
+        stored = await sync_to_async(store_resume_file)(resume_file)
+        extracted_data = await sync_to_async(cached_resume_data)(stored.content_hash)
+        if extracted_data is None:
+            resume_text = await aextract_text(stored.path)
+            if not resume_text:
+                await ActivityLog.objects.acreate(
+                    user=user,
+                    company=hr_company,
+                    activity_type='RESUME_UPLOAD_ERROR',
+                    details_json={'filename': resume_file.name, 'error': 'Could not extract text from the resume file.'}
+                )
+                return JsonResponse({'error': 'Could not read text from the resume. Upload a PDF, DOCX or TXT file.'}, status=422)
+            extracted_data = await aparse_stored_resume(stored, resume_text)
+        if not extracted_data or not extracted_data.personal_info or not extracted_data.personal_info.email:
+            await ActivityLog.objects.acreate(
+                user=user,
+                company=hr_company,
+                activity_type='RESUME_UPLOAD_ERROR',
+                details_json={'filename': resume_file.name, 'error': 'Failed to extract personal info or email.'}
+            )
+            return JsonResponse({'error': 'Failed to extract essential data (like email) from resume. Please check format.'}, status=422)
+
+        # A duplicate of a file this company already has is served without rebuilding the candidate
+        candidate = await Candidate.objects.filter(company=hr_company, resume_hash=stored.content_hash).afirst()
+        duplicate = candidate is not None
+        if duplicate:
+            created, skills_count = False, await candidate.candidateskill_set.acount()
+        else:
+            candidate, created, skills_count = await sync_to_async(apply_resume_data)(user, hr_company, extracted_data, stored)
+
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='RESUME_UPLOAD',
+            details_json={
+                'candidate_id': candidate.id,
+                'resume_filename': resume_file.name,
+                'resume_hash': stored.content_hash,
+                'is_new_candidate': created,
+                'duplicate_upload': duplicate,
+                'extracted_info': {
+                    'name': extracted_data.personal_info.name,
+                    'email': extracted_data.personal_info.email,
+                    'experience_count': len(extracted_data.professional_experience or []),
+                    'skills_count': skills_count,
+                    'projects_count': len(extracted_data.projects or [])
+                }
+            }
+        )
+        return JsonResponse({
+            'message': 'Resume uploaded and processed successfully',
+            'candidate_id': candidate.id,
+            'duplicate_upload': duplicate,
+            'extracted_data': extracted_data.dict()
+        })
+
+    except IntegrityError:
+        return JsonResponse({'error': 'A candidate with this email already exists for your company.'}, status=400)
+    except Exception as e:
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='RESUME_UPLOAD_ERROR',
+            details_json={'filename': resume_file.name, 'error_message': str(e)}
+        )
+        return JsonResponse({'error': f'An unexpected error occurred: {str(e)}'}, status=500)
+    finally:
+        # Attached or not, this upload is done with the file; an unused file is deleted
+        if stored is not None:
+            await sync_to_async(release_upload)(stored.content_hash)
+
+
+@csrf_exempt
+@require_POST
+async def linkedin_search_api(request):
+    """
+    Performs a LinkedIn candidate search with the async Gemini and Serper calls.
+    Required fields:
+    - query: The search query or job description to search for
+    """
+    drf_request, hr_profile, error = await sync_to_async(_authenticate)(request)
+    if error:
+        return error
+    user, hr_company = drf_request.user, hr_profile.company
+    data, error = await sync_to_async(_request_data)(drf_request)
+    if error:
+        return error
+
+    query = data.get('query')
+    if not query:
+        return JsonResponse({'error': 'Search query is required'}, status=400)
+
+    try:
+        search_results = await asearch_and_store_profiles(query, company=hr_company)
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='LINKEDIN_SEARCH',
+            details_json={
+                'search_query': query,
+                'results_count': len(search_results.get('organic', [])) if isinstance(search_results, dict) else 0
+            }
+        )
+        return JsonResponse(search_results, safe=False)
+
+    except Exception as e:
+        error_details = {
+            'error_message': str(e),
+            'error_type': type(e).__name__,
+            'search_query': query,
+        }
+        print("Error details:", error_details)
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='LINKEDIN_SEARCH_ERROR',
+            details_json=error_details
+        )
+        return JsonResponse({'error': f'An unexpected error occurred: {str(e)}'}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def scrape_and_analyze_linkedin_profile_api(request):
+    """
+    Scrapes a detailed LinkedIn profile through ScrapingDog with an async HTTP client and
+    creates/updates the Candidate record. Profiles scraped within SCRAPED_PROFILE_MAX_AGE are
+    served from the ScrapedProfile store; pass force_refresh=true to bypass it.
+    """
+    drf_request, hr_profile, error = await sync_to_async(_authenticate)(request)
+    if error:
+        return error
+    user, hr_company = drf_request.user, hr_profile.company
+    data, error = await sync_to_async(_request_data)(drf_request)
+    if error:
+        return error
+
+    linkedin_url = data.get('linkedin_url', '')
+    if not linkedin_url:
+        return JsonResponse({'error': 'LinkedIn URL is required'}, status=400)
+
+    try:
+        linkedin_id = linkedin_url.split('/in/')[-1].strip('/').split('?')[0]
+
+        force_refresh = _parse_bool(data.get('force_refresh', False))
+        cached_profile = None if force_refresh else await sync_to_async(get_fresh_profile)(linkedin_id)
+        from_cache = cached_profile is not None
+
+        if cached_profile:
+            profile_data = load_profile_payload(cached_profile)
+            profile_hash = cached_profile.content_hash
+        else:
+            scrapingdog_api_key = os.getenv("SCRAPINGDOG_API_KEY")
+            if not scrapingdog_api_key:
+                return JsonResponse({'error': 'ScrapingDog API Key not configured'}, status=500)
+
+            async with httpx.AsyncClient(timeout=SCRAPINGDOG_TIMEOUT) as http:
+                response = await http.get(SCRAPINGDOG_PROFILE_URL, params=scrapingdog_profile_params(scrapingdog_api_key, linkedin_id))
+            if response.status_code != 200:
+                return JsonResponse({'error': f'ScrapingDog API request failed with status code: {response.status_code}'}, status=503)
+
+            scraped_data = response.json()
+            if not scraped_data or not isinstance(scraped_data, list) or len(scraped_data) == 0:
+                return JsonResponse({'error': 'No valid data returned from ScrapingDog API'}, status=500)
+
+            profile_data = clean_profile_data(scraped_data[0])
+            cached_profile, _ = await sync_to_async(store_profile)(linkedin_id, profile_data)
+            profile_hash = cached_profile.content_hash
+
+        candidate, is_new, experience_refreshed = await sync_to_async(apply_linkedin_profile)(
+            user, hr_company, linkedin_url, profile_data, profile_hash
+        )
+
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='PROFILE_SCRAPE',
+            details_json={
+                'linkedin_url': linkedin_url,
+                'candidate_name': candidate.name,
+                'candidate_id': candidate.id,
+                'is_new_candidate': is_new,
+                'from_cache': from_cache,
+                'experience_refreshed': experience_refreshed,
+                'scraped_data': {
+                    'headline': profile_data.get('headline'),
+                    'location': profile_data.get('location'),
+                    'experience_count': len(profile_data.get('experience', [])),
+                    'education_count': len(profile_data.get('education', []))
+                }
+            }
+        )
+        return JsonResponse({
+            'message': 'LinkedIn profile scraped and processed successfully',
+            'candidate_id': candidate.id,
+            'is_new_candidate': is_new,
+            'from_cache': from_cache,
+            'scraped_data': profile_data
+        })
+
+    except httpx.HTTPError as e:
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='PROFILE_SCRAPE_ERROR',
+            details_json={'error_message': f'ScrapingDog API error: {str(e)}', 'linkedin_url': linkedin_url}
+        )
+        return JsonResponse({'error': f'Failed to connect to ScrapingDog API: {str(e)}'}, status=503)
+    except Exception as e:
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='PROFILE_SCRAPE_ERROR',
+            details_json={'error_message': str(e), 'linkedin_url': linkedin_url}
+        )
+        return JsonResponse({'error': f'An unexpected error occurred: {str(e)}'}, status=500)
+
+
+@csrf_exempt
+@require_POST
+async def generate_candidate_analysis(request):
+    """
+    Generates or retrieves an AI analysis comparing a candidate against a job description,
+    awaiting the Gemini call.
+
+    Required fields in request body:
+    - candidate_id: ID of the candidate to analyze
+    - job_description: The job description text to compare against
+    """
+    drf_request, hr_profile, error = await sync_to_async(_authenticate)(request)
+    if error:
+        return error
+    user, hr_company = drf_request.user, hr_profile.company
+    data, error = await sync_to_async(_request_data)(drf_request)
+    if error:
+        return error
+
+    candidate_id = data.get('candidate_id')
+    job_description = data.get('job_description')
+    if not candidate_id or not job_description:
+        return JsonResponse({'error': 'Both candidate_id and job_description are required'}, status=400)
+
+    try:
+        candidate = await Candidate.objects.filter(id=candidate_id, created_by=user).afirst()
+        if candidate is None:
+            return JsonResponse({'error': 'Candidate not found or not accessible'}, status=404)
+
+        analysis = await aget_candidate_analysis(candidate, job_description)
+        if not analysis:
+            return JsonResponse({'error': 'Failed to generate analysis'}, status=500)
+
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='AI_ANALYSIS_GENERATED',
+            details_json={
+                'candidate_id': candidate.id,
+                'candidate_name': candidate.name,
+                'analysis_id': analysis.id,
+                'score': analysis.score
+            }
+        )
+        return JsonResponse({
+            'analysis_id': analysis.id,
+            'candidate_name': candidate.name,
+            'summary': analysis.summary_text,
+            'score': analysis.score,
+            'details': analysis.details_json,
+            'created_at': analysis.created_at
+        })
+    except Exception as e:
+        await ActivityLog.objects.acreate(
+            user=user,
+            company=hr_company,
+            activity_type='AI_ANALYSIS_ERROR',
+            details_json={'error': str(e), 'candidate_id': candidate_id}
+        )
+        return JsonResponse({'error': f'An unexpected error occurred: {str(e)}'}, status=500)
@@ -4,8 +4,16 @@ from typing import List, Optional, Dict, Any
 import os # For API Key
 from dotenv import load_dotenv
 from django.utils import timezone
-from .models import AISummary, Candidate, Company
+from .models import AISummary, Candidate, CandidateSkill, Company
+from .change_log import profile_hash_stored
 import hashlib
+import json
+from asgiref.sync import sync_to_async
+from .gemini import agenerate_content, generate_content
+from .prompt_compaction import compact_inputs
+from .text_extraction import extract_text, file_digest
+from .single_flight import asingle_flight, single_flight
+from django.db import IntegrityError, transaction
 
 load_dotenv()
 
@@ -48,6 +56,147 @@ class CandidateAnalysisResponse(BaseModel):
 
 
 
+def compute_profile_hash(candidate: Candidate) -> str:
+    """
+    SHA-256 over everything an analysis is generated from: contact details, the resume
+    file's bytes (its content hash in the resume store), skills, experience and projects.
+    """
+    resume_digest = candidate.resume_hash or ''
+    if not resume_digest and candidate.resume_file_path and os.path.exists(candidate.resume_file_path):
+        resume_digest = file_digest(candidate.resume_file_path)
+    profile = {
+        'name': candidate.name,
+        'email': candidate.email,
+        'phone': candidate.phone,
+        'linkedin_url': candidate.linkedin_url,
+        'github_url': candidate.github_url,
+        'resume': resume_digest,
+        'skills': sorted(CandidateSkill.objects.filter(candidate_id=candidate.id).values_list('skill__skill_name', flat=True)),
+        'experience': sorted(candidate.experiences.values_list('role', 'company', 'start_date', 'end_date', 'description'), key=str),
+        'projects': sorted(candidate.projects.values_list('name', 'description'), key=str),
+    }
+    return hashlib.sha256(json.dumps(profile, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def refresh_profile_hash(candidate: Candidate) -> str:
+    """
+    Recomputes and stores the candidate's profile hash and marks summaries generated from
+    any other version of the profile stale. Called after a resume or profile is (re-)ingested.
+    A profile that changes back to an earlier version gets that version's summaries back.
+    """
+    profile_hash = compute_profile_hash(candidate)
+    Candidate.objects.filter(id=candidate.id).update(profile_hash=profile_hash)
+    candidate.profile_hash = profile_hash
+    profile_hash_stored(candidate.id)
+    summaries = AISummary.objects.filter(candidate_id=candidate.id)
+    summaries.filter(is_stale=False).exclude(profile_hash=profile_hash).update(is_stale=True)
+    summaries.filter(is_stale=True, profile_hash=profile_hash).update(is_stale=False)
+    return profile_hash
+
+
+def current_profile_hash(candidate: Candidate) -> str:
+    """
+    Returns the stored profile hash, recomputing it if a profile change cleared it
+    (see signals.candidate_profile_changed).
+    """
+    profile_hash = Candidate.objects.filter(id=candidate.id).values_list('profile_hash', flat=True).first()
+    return profile_hash or refresh_profile_hash(candidate)
+
+
+def find_cached_analysis(candidate: Candidate, jd_hash: str, company_id: int, profile_hash: str) -> Optional[AISummary]:
+    # Exact match on the (candidate, job_description_hash, company, profile_hash) unique index
+    return AISummary.objects.filter(
+        candidate_id=candidate.id,
+        job_description_hash=jd_hash,
+        company_id=company_id,
+        profile_hash=profile_hash,
+        is_stale=False,
+    ).first()
+
+
+def analysis_key(candidate_id: int, jd_hash: str, company_id: int, profile_hash: str) -> str:
+    return f"analysis:{candidate_id}:{jd_hash}:{company_id}:{profile_hash}"
+
+
+def save_analysis(candidate: Candidate, jd_hash: str, analysis: CandidateAnalysisResponse, company: Company = None, profile_hash: str = '') -> AISummary:
+    company = company or candidate.company
+    try:
+        with transaction.atomic():
+            return AISummary.objects.create(
+                candidate=candidate,
+                company=company,
+                created_by=candidate.created_by,
+                job_description_hash=jd_hash,
+                profile_hash=profile_hash,
+                summary_text=analysis.summary_assessment,
+                score=analysis.overall_suitability_score,
+                details_json=analysis.dict(),
+                created_at=timezone.now()
+            )
+    except IntegrityError:
+        # Stored by a worker that did not go through single_flight; keep that one
+        return find_cached_analysis(candidate, jd_hash, company.id, profile_hash)
+
+
+def candidate_resume_content(candidate: Candidate) -> str:
+    """
+    Returns the candidate's resume text, or a profile built from their database records
+    when no readable resume file is available.
+    """
+    resume_content = ""
+    if candidate.resume_file_path and os.path.exists(candidate.resume_file_path):
+        resume_content = extract_text(candidate.resume_file_path) or ""
+
+    # If resume content is empty, gather details from the database
+    if not resume_content:
+        try:
+            resume_content = f"Name: {candidate.name}\n"
+            resume_content += f"Email: {candidate.email}\n"
+            resume_content += f"Phone: {candidate.phone}\n"
+            resume_content += f"LinkedIn: {candidate.linkedin_url}\n"
+            resume_content += f"GitHub: {candidate.github_url}\n\n"
+
+            # Gather skills if present
+            if hasattr(candidate, 'skills'):
+                skills = candidate.skills.all()
+                resume_content += "Skills:\n"
+                for skill in skills:
+                    resume_content += f"- {skill.name}\n"
+
+            # Gather experiences if present
+            if hasattr(candidate, 'experiences'):
+                experiences = candidate.experiences.all()
+                resume_content += "\nExperience:\n"
+                for exp in experiences:
+                    # Use position instead of title if that's the field name
+                    position = getattr(exp, 'position', getattr(exp, 'title', 'N/A'))
+                    company = getattr(exp, 'company', 'N/A')
+                    start_date = getattr(exp, 'start_date', 'N/A')
+                    end_date = getattr(exp, 'end_date', 'N/A')
+                    description = getattr(exp, 'description', 'N/A')
+
+                    resume_content += f"- {position} at {company} ({start_date} - {end_date})\n"
+                    resume_content += f"  {description}\n"
+
+            # Gather education if present
+            if hasattr(candidate, 'education'):
+                education = candidate.education.all()
+                resume_content += "\nEducation:\n"
+                for edu in education:
+                    degree = getattr(edu, 'degree', 'N/A')
+                    field = getattr(edu, 'field', 'N/A')
+                    institution = getattr(edu, 'institution', 'N/A')
+                    start_date = getattr(edu, 'start_date', 'N/A')
+                    end_date = getattr(edu, 'end_date', 'N/A')
+
+                    resume_content += f"- {degree} in {field} from {institution} ({start_date} - {end_date})\n"
+        except Exception as e:
+            print(f"Error gathering candidate details from database: {str(e)}")
+            resume_content = ""
+    print(f"Resume content for {candidate.name}: {resume_content}")
+    return resume_content
+
+
 def generate_ai_summary(jd_content: str, resume_content: str, candidate: Candidate, company: Company) -> AISummary:
     """
     Generates an AI summary comparing a candidate's resume against a job description
@@ -64,34 +213,27 @@ def generate_ai_summary(jd_content: str, resume_content: str, candidate: Candida
     """
     # Generate a hash of the job description for caching
     jd_hash = hashlib.md5(jd_content.encode()).hexdigest()
+    # Analyses are versioned by the candidate's profile, so an edited profile gets a fresh one
+    profile_hash = current_profile_hash(candidate)
     
-    # Check if we already have an analysis for this candidate and JD
-    existing_summary = AISummary.objects.filter(
-        candidate=candidate,
-        job_description_hash=jd_hash
-    ).first()
+    # Check if we already have an analysis for this candidate, JD, company and profile version
+    existing_summary = find_cached_analysis(candidate, jd_hash, company.id, profile_hash)
     print("Existing Summary ",existing_summary)
     if existing_summary:
         return existing_summary
     
-    # Generate new analysis
-    analysis = extract_jd_requirements(jd_content, resume_content)
-    if not analysis:
-        raise ValueError("Failed to generate analysis")
-    
-    # Create and save the AI summary
-    summary = AISummary.objects.create(
-        candidate=candidate,
-        company=company,
-        created_by=candidate.created_by,
-        job_description_hash=jd_hash,
-        summary_text=analysis.summary_assessment,
-        score=analysis.overall_suitability_score,
-        details_json=analysis.dict(),
-        created_at=timezone.now()
+    # Generate new analysis; concurrent requests for the same candidate, JD and company share one LLM call
+    def compute():
+        analysis = extract_jd_requirements(jd_content, resume_content)
+        if not analysis:
+            raise ValueError("Failed to generate analysis")
+        return save_analysis(candidate, jd_hash, analysis, company=company, profile_hash=profile_hash)
+
+    return single_flight(
+        analysis_key(candidate.id, jd_hash, company.id, profile_hash),
+        lambda: find_cached_analysis(candidate, jd_hash, company.id, profile_hash),
+        compute,
     )
-    
-    return summary
 
 def get_candidate_analysis(candidate: Candidate, jd_content: str) -> Optional[AISummary]:
     """
@@ -111,72 +253,14 @@ def get_candidate_analysis(candidate: Candidate, jd_content: str) -> Optional[AI
         # Generate hash of the job description
         jd_hash = hashlib.md5(jd_content.encode()).hexdigest()
         
-        # Try to get existing analysis
-        summary = AISummary.objects.filter(
-            candidate=candidate,
-            job_description_hash=jd_hash
-        ).first()
+        # Try to get existing analysis for the candidate's current profile
+        summary = find_cached_analysis(candidate, jd_hash, candidate.company_id, current_profile_hash(candidate))
         
         if summary:
             return summary
             
-        # If no existing analysis, gather candidate details from the database
-        resume_content = ""
-        try:
-            if candidate.resume_file_path:
-                with open(candidate.resume_file_path, 'r', encoding='utf-8') as f:
-                    resume_content = f.read()
-        except Exception as e:
-            print(f"Error reading resume file: {str(e)}")
-            resume_content = ""
-        
-        # If resume content is empty, gather details from the database
-        if not resume_content:
-            try:
-                resume_content = f"Name: {candidate.name}\n"
-                resume_content += f"Email: {candidate.email}\n"
-                resume_content += f"Phone: {candidate.phone}\n"
-                resume_content += f"LinkedIn: {candidate.linkedin_url}\n"
-                resume_content += f"GitHub: {candidate.github_url}\n\n"
-                
-                # Gather skills if present
-                if hasattr(candidate, 'skills'):
-                    skills = candidate.skills.all()
-                    resume_content += "Skills:\n"
-                    for skill in skills:
-                        resume_content += f"- {skill.name}\n"
-                
-                # Gather experiences if present
-                if hasattr(candidate, 'experiences'):
-                    experiences = candidate.experiences.all()
-                    resume_content += "\nExperience:\n"
-                    for exp in experiences:
-                        # Use position instead of title if that's the field name
-                        position = getattr(exp, 'position', getattr(exp, 'title', 'N/A'))
-                        company = getattr(exp, 'company', 'N/A')
-                        start_date = getattr(exp, 'start_date', 'N/A')
-                        end_date = getattr(exp, 'end_date', 'N/A')
-                        description = getattr(exp, 'description', 'N/A')
-                        
-                        resume_content += f"- {position} at {company} ({start_date} - {end_date})\n"
-                        resume_content += f"  {description}\n"
-                
-                # Gather education if present
-                if hasattr(candidate, 'education'):
-                    education = candidate.education.all()
-                    resume_content += "\nEducation:\n"
-                    for edu in education:
-                        degree = getattr(edu, 'degree', 'N/A')
-                        field = getattr(edu, 'field', 'N/A')
-                        institution = getattr(edu, 'institution', 'N/A')
-                        start_date = getattr(edu, 'start_date', 'N/A')
-                        end_date = getattr(edu, 'end_date', 'N/A')
-                        
-                        resume_content += f"- {degree} in {field} from {institution} ({start_date} - {end_date})\n"
-            except Exception as e:
-                print(f"Error gathering candidate details from database: {str(e)}")
-                resume_content = ""
-        print(f"Resume content for {candidate.name}: {resume_content}")
+        # If no existing analysis, gather candidate details from the resume file or the database
+        resume_content = candidate_resume_content(candidate)
         # Generate new analysis
         return generate_ai_summary(
             jd_content=jd_content,
@@ -189,10 +273,13 @@ def get_candidate_analysis(candidate: Candidate, jd_content: str) -> Optional[AI
         print(f"Error in get_candidate_analysis: {str(e)}")
         return None
 
-def extract_jd_requirements(jd_content: str, resume_content: str):
-    client = genai.Client(api_key=api_key)
-    print("api" , api_key)
-    prompt = f"""
+ANALYSIS_MODEL = "gemini-1.5-flash"
+
+
+def analysis_prompt(jd_content: str, resume_content: str) -> str:
+    compacted = compact_inputs(ANALYSIS_MODEL, 'candidate analysis', jd=jd_content, resume=resume_content)
+    jd_content, resume_content = compacted['jd'], compacted['resume']
+    return f"""
     ou are an expert AI Talent Acquisition Assistant specializing in the IT industry. Your primary function is to conduct a comprehensive and unbiased analysis of a candidate's profile or resume against a specific Job Description (JD).
 
 **Objective:** Evaluate the candidate's suitability for the role and generate a structured JSON output detailing your findings. This will enable HR personnel to make informed decisions quickly.
@@ -284,9 +371,13 @@ Your entire response MUST be a single, valid JSON object. Do NOT include any int
   ]
 }}
     """
+
+
+def extract_jd_requirements(jd_content: str, resume_content: str):
+    prompt = analysis_prompt(jd_content, resume_content)
     try:
-        response = client.models.generate_content(
-            model="gemini-1.5-flash",
+        response = generate_content(
+            model=ANALYSIS_MODEL,
             contents=prompt,
             config={
                 "response_mime_type": "application/json",
@@ -300,3 +391,52 @@ Your entire response MUST be a single, valid JSON object. Do NOT include any int
         print(f"Error during resume extraction: {e}")
         print(f"Raw response: {response.text if 'response' in locals() else 'No response'}")
         return None
+
+
+async def aextract_jd_requirements(jd_content: str, resume_content: str):
+    """
+    Async counterpart of extract_jd_requirements using the async Gemini client.
+    """
+    try:
+        response = await agenerate_content(
+            model=ANALYSIS_MODEL,
+            contents=analysis_prompt(jd_content, resume_content),
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": CandidateAnalysisResponse,
+            },
+        )
+        return response.parsed
+    except Exception as e:
+        print(f"Error during candidate analysis: {e}")
+        return None
+
+
+async def aget_candidate_analysis(candidate: Candidate, jd_content: str) -> Optional[AISummary]:
+    """
+    Async counterpart of get_candidate_analysis: the LLM call is awaited and only the
+    database reads and writes run in a thread.
+    """
+    try:
+        jd_hash = hashlib.md5(jd_content.encode()).hexdigest()
+        profile_hash = await sync_to_async(current_profile_hash)(candidate)
+        summary = await sync_to_async(find_cached_analysis)(candidate, jd_hash, candidate.company_id, profile_hash)
+        if summary:
+            return summary
+
+        async def compute():
+            resume_content = await sync_to_async(candidate_resume_content)(candidate)
+            analysis = await aextract_jd_requirements(jd_content, resume_content)
+            if not analysis:
+                return None
+            return await sync_to_async(save_analysis)(candidate, jd_hash, analysis, profile_hash=profile_hash)
+
+        # Concurrent requests for the same candidate, JD and company share one LLM call
+        return await asingle_flight(
+            analysis_key(candidate.id, jd_hash, candidate.company_id, profile_hash),
+            lambda: find_cached_analysis(candidate, jd_hash, candidate.company_id, profile_hash),
+            compute,
+        )
+    except Exception as e:
+        print(f"Error in aget_candidate_analysis: {str(e)}")
+        return None
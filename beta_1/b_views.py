@@ -5,7 +5,7 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.db import IntegrityError # For handling unique_together errors
+from django.db import IntegrityError, transaction # For handling unique_together errors
 from dateutil import parser
 
 from rest_framework import status
@@ -43,7 +43,13 @@ from .permissions import IsCompanyUser
 # )
 
 # Import your AI analysis functions (ensure these exist in your b_resume_rank.py)
-from .b_resume_rank import get_candidate_analysis
+from .b_resume_rank import refresh_profile_hash
+from .identity import email_taken, resolve_candidate
+from .skill_dictionary import attach_candidate_skills
+from .resume_store import attach_resume
+from .prompt_compaction import compaction_totals
+from .rate_limit import get_rate_controller
+from .warmup import boot_warmup_enabled, start_warmup, warmup_status
 
 # --- Company Management Views ---
 # Accessible by admin or specific roles to create/list companies
@@ -290,312 +296,131 @@ def candidate_detail_update_status(request, pk):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-# --- Sourcing & Analysis Endpoints ---
+# --- Candidate ingestion helpers (shared by the sync views here and the async views in b_async_views.py) ---
 
-@api_view(['POST'])
-@authentication_classes([TokenAuthentication, SessionAuthentication])
-@permission_classes([IsAuthenticated, IsCompanyUser])
-def upload_resume_api(request):
-    """
-    Uploads a resume file, parses it using resume_parse.py, creates/updates a Candidate, and logs activity.
-    """
-    user = request.user
-    hr_company = user.hr_profile.company
+SCRAPINGDOG_PROFILE_URL = "https://api.scrapingdog.com/linkedin"
 
-    if 'resume_file' not in request.FILES:
-        return Response({'error': 'No resume file provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-    resume_file = request.FILES['resume_file']
+def scrapingdog_profile_params(api_key: str, linkedin_id: str) -> dict:
+    return {
+        "api_key": api_key,
+        "type": "profile",
+        "linkId": linkedin_id,
+        "private": "true"
+    }
 
-    try:
-        # 1. Save the file
-        company_media_path = os.path.join('media', 'resumes', str(hr_company.id))
-        os.makedirs(company_media_path, exist_ok=True)
-        file_path = os.path.join(company_media_path, resume_file.name)
-        with open(file_path, 'wb+') as destination:
-            for chunk in resume_file.chunks():
-                destination.write(chunk)
-
-        # 2. Extract text content from the file
-        # You'll need to implement text extraction based on file type (PDF, DOCX, etc.)
-        # For now, assuming text content is available
-        resume_text = resume_file.read().decode('utf-8')
-
-        # 3. Parse resume details using resume_parse.py
-        from .resume_parse import extract_resume_details
-        extracted_data = extract_resume_details(resume_text)
-        if not extracted_data or not extracted_data.personal_info.email:
-            ActivityLog.objects.create(
-                user=user,
-                company=hr_company,
-                activity_type='RESUME_UPLOAD_ERROR',
-                details_json={'filename': resume_file.name, 'error': 'Failed to extract personal info or email.'}
-            )
-            return Response({'error': 'Failed to extract essential data (like email) from resume. Please check format.'}, 
-                          status=status.HTTP_422_UNPROCESSABLE_ENTITY)
-
-        # 4. Create/Update Candidate record
-        candidate, created = Candidate.objects.update_or_create(
-            company=hr_company,
-            email=extracted_data.personal_info.email,
-            defaults={
-                'name': extracted_data.personal_info.name,
-                'phone': extracted_data.personal_info.phone or '',
-                'linkedin_url': extracted_data.personal_info.linkedin_url,
-                'resume_file_path': file_path,
-                'status': 'NEW',
-                'last_status_update': timezone.now()
-            }
-        )
 
-        # 5. Update Experience records
-        candidate.experiences.all().delete()
-        for exp in extracted_data.professional_experience or []:
-            start_date = parser.parse(exp.start_date).date() if exp.start_date else None
-            end_date = parser.parse(exp.end_date).date() if exp.end_date else None
-            Experience.objects.create(
-                candidate=candidate,
-                role=exp.role or '',
-                company=exp.company or '',
-                start_date=start_date,
-                end_date=end_date,
-                description='\n'.join(exp.responsibilities) if exp.responsibilities else ''
-            )
-
-        # 6. Update Skills
-        candidate.candidateskill_set.all().delete()
-        if extracted_data.technical_skills:
-            all_skills = []
-            if extracted_data.technical_skills.technical_skills:
-                all_skills.extend(extracted_data.technical_skills.technical_skills)
-            if extracted_data.technical_skills.frameworks_libraries:
-                all_skills.extend(extracted_data.technical_skills.frameworks_libraries)
-            if extracted_data.technical_skills.tools:
-                all_skills.extend(extracted_data.technical_skills.tools)
-            
-            for skill_name in all_skills:
-                skill_obj, _ = Skill.objects.get_or_create(skill_name=skill_name.strip())
-                CandidateSkill.objects.get_or_create(candidate=candidate, skill=skill_obj)
-
-        # 7. Update Projects
-        candidate.projects.all().delete()
-        for proj in extracted_data.projects or []:
-            Project.objects.create(
-                    candidate=candidate,
-                name=proj.project_name or '',
-                description=proj.description or ''
-            )
-
-        # Log activity
-        ActivityLog.objects.create(
-            user=user,
-            company=hr_company,
-            activity_type='RESUME_UPLOAD',
-            details_json={
-                'candidate_id': candidate.id,
-                'resume_filename': resume_file.name,
-                'is_new_candidate': created,
-                'extracted_info': {
-                    'name': extracted_data.personal_info.name,
-                    'email': extracted_data.personal_info.email,
-                    'experience_count': len(extracted_data.professional_experience or []),
-                    'skills_count': len(all_skills) if 'all_skills' in locals() else 0,
-                    'projects_count': len(extracted_data.projects or [])
-                }
-            }
-        )
+@transaction.atomic
+def apply_resume_data(user, hr_company, extracted_data, stored):
+    """
+    Creates or updates the Candidate described by a parsed resume, points it at the
+    StoredResume it was parsed from and replaces its experience, skills and projects,
+    in one transaction so the candidate is logged as changed once.
 
-        return Response(
-            {
-                'message': 'Resume uploaded and processed successfully',
-                'candidate_id': candidate.id,
-                'extracted_data': extracted_data.dict()
-            },
-            status=status.HTTP_200_OK
+    Returns:
+        (candidate, created, skills_count)
+    """
+    # Create/Update Candidate record, matched on LinkedIn id, email or phone
+    personal_info = extracted_data.personal_info
+    candidate = resolve_candidate(
+        hr_company,
+        linkedin_url=personal_info.linkedin_url,
+        email=personal_info.email,
+        phone=personal_info.phone,
+    )
+    created = candidate is None
+    if created:
+        candidate = Candidate(company=hr_company, email=personal_info.email, created_by=user)
+    elif not candidate.email and not email_taken(hr_company, personal_info.email, candidate):
+        candidate.email = personal_info.email
+    candidate.name = personal_info.name
+    candidate.phone = personal_info.phone or ''
+    candidate.linkedin_url = personal_info.linkedin_url
+    candidate.status = 'NEW'
+    candidate.last_status_update = timezone.now()
+    attach_resume(candidate, stored)
+
+    # Update Experience records
+    candidate.experiences.all().delete()
+    for exp in extracted_data.professional_experience or []:
+        start_date = parser.parse(exp.start_date).date() if exp.start_date else None
+        end_date = parser.parse(exp.end_date).date() if exp.end_date else None
+        Experience.objects.create(
+            candidate=candidate,
+            role=exp.role or '',
+            company=exp.company or '',
+            start_date=start_date,
+            end_date=end_date,
+            description='\n'.join(exp.responsibilities) if exp.responsibilities else ''
         )
 
-    except IntegrityError:
-        return Response({'error': 'A candidate with this email already exists for your company.'}, 
-                       status=status.HTTP_400_BAD_REQUEST)
-    except Exception as e:
-        ActivityLog.objects.create(
-            user=user,
-            company=hr_company,
-            activity_type='RESUME_UPLOAD_ERROR',
-            details_json={'filename': resume_file.name, 'error_message': str(e)}
+    # Update Skills, resolved to canonical skills so spelling variants share one row
+    candidate.candidateskill_set.all().delete()
+    all_skills = []
+    if extracted_data.technical_skills:
+        if extracted_data.technical_skills.technical_skills:
+            all_skills.extend(extracted_data.technical_skills.technical_skills)
+        if extracted_data.technical_skills.frameworks_libraries:
+            all_skills.extend(extracted_data.technical_skills.frameworks_libraries)
+        if extracted_data.technical_skills.tools:
+            all_skills.extend(extracted_data.technical_skills.tools)
+
+        attach_candidate_skills(candidate, all_skills)
+
+    # Update Projects
+    candidate.projects.all().delete()
+    for proj in extracted_data.projects or []:
+        Project.objects.create(
+            candidate=candidate,
+            name=proj.project_name or '',
+            description=proj.description or ''
         )
-        return Response({'error': f'An unexpected error occurred: {str(e)}'}, 
-                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # Summaries generated from the previous version of this candidate are now stale
+    refresh_profile_hash(candidate)
+    return candidate, created, len(all_skills)
 
-@api_view(['POST'])
-@authentication_classes([TokenAuthentication, SessionAuthentication])
-@permission_classes([IsAuthenticated, IsCompanyUser])
-def linkedin_search_api(request):
-    """
-    Performs a LinkedIn candidate search using JD_scrape.py functionality.
-    Required fields:
-    - query: The search query or job description to search for
-    """
-    user = request.user
-    hr_company = user.hr_profile.company
 
-    try:
-        # Get query from request data
-        query = request.data.get('query')
-        if not query:
-            return Response(
-                {'error': 'Search query is required'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        # Use JD_scrape.py functionality
-        from .JD_scrape import search_and_store_profiles
-        search_results = search_and_store_profiles(query, company=hr_company)
-
-        # Log search activity
-        ActivityLog.objects.create(
-            user=user,
-            company=hr_company,
-            activity_type='LINKEDIN_SEARCH',
-            details_json={
-                'search_query': query,
-                'results_count': len(search_results.get('organic', [])) if isinstance(search_results, dict) else 0
-            }
-        )
+# --- Sourcing & Analysis Endpoints ---
 
-        # Return the search results
-        return Response(search_results, status=status.HTTP_200_OK)
+@transaction.atomic
+def apply_linkedin_profile(user, hr_company, linkedin_url, profile_data, profile_hash):
+    """
+    Creates or updates the Candidate for a scraped LinkedIn profile. Experience and skills are
+    rebuilt only when the profile content changed since it was last applied.
 
-    except Exception as e:
-        # Log the error with more details
-        error_details = {
-            'error_message': str(e),
-            'error_type': type(e).__name__,
-            'search_query': query if 'query' in locals() else None,
-            'search_results_type': type(search_results).__name__ if 'search_results' in locals() else None
-        }
-        print("Error details:", error_details)
-        
-        ActivityLog.objects.create(
-            user=user,
+    Returns:
+        (candidate, is_new, experience_refreshed)
+    """
+    # Resolve an existing candidate by normalized LinkedIn id or email in one indexed lookup
+    email = profile_data.get('emailAddress')
+    candidate = resolve_candidate(hr_company, linkedin_url=linkedin_url, email=email)
+    is_new = candidate is None
+    if is_new:
+        candidate = Candidate.objects.create(
             company=hr_company,
-            activity_type='LINKEDIN_SEARCH_ERROR',
-            details_json=error_details
-        )
-        return Response(
-            {'error': f'An unexpected error occurred: {str(e)}'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            name=profile_data.get('fullName', 'N/A'),
+            email=email or '',
+            phone='',
+            linkedin_url=linkedin_url,
+            status='NEW',
+            last_status_update=timezone.now(),
+            created_by=user
         )
 
-
-@api_view(['POST'])
-@authentication_classes([TokenAuthentication, SessionAuthentication])
-@permission_classes([IsAuthenticated, IsCompanyUser])
-def scrape_and_analyze_linkedin_profile_api(request):
-    """
-    Scrapes a detailed LinkedIn profile using ScrapingDog API.
-    Creates/updates Candidate record.
-    """
-    user = request.user
-    hr_company = user.hr_profile.company
-
-    try:
-        data = json.loads(request.body.decode('utf-8'))
-        linkedin_url = data.get('linkedin_url', '')
-
-        if not linkedin_url:
-            return Response({'error': 'LinkedIn URL is required'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Extract LinkedIn ID from URL
-        linkedin_id = linkedin_url.split('/in/')[-1].strip('/').split('?')[0]
-
-        # Call ScrapingDog API
-        scrapingdog_api_key = os.getenv("SCRAPINGDOG_API_KEY")
-        if not scrapingdog_api_key:
-            return Response({'error': 'ScrapingDog API Key not configured'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        url = "https://api.scrapingdog.com/linkedin"
-        params = {
-            "api_key": scrapingdog_api_key,
-            "type": "profile",
-            "linkId": linkedin_id,
-            "private": "true"
-        }
-
-        response = requests.get(url, params=params)
-        print(response)
-        if response.status_code != 200:
-            return Response({'error': f'ScrapingDog API request failed with status code: {response.status_code}'}, 
-                          status=status.HTTP_503_SERVICE_UNAVAILABLE)
-
-        scraped_data = response.json()
-        if not scraped_data or not isinstance(scraped_data, list) or len(scraped_data) == 0:
-            return Response({'error': 'No valid data returned from ScrapingDog API'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # Get the first profile from the list
-        profile_data = scraped_data[0]
-
-        # Remove unwanted fields
-        if 'activities' in profile_data:
-            del profile_data['activities']
-        if 'people_also_viewed' in profile_data:
-            del profile_data['people_also_viewed']
-        if 'similar_profiles' in profile_data:
-            del profile_data['similar_profiles']
-
-        # Try to find existing candidate by LinkedIn URL first
-        try:
-            candidate = Candidate.objects.get(company=hr_company, linkedin_url=linkedin_url)
-            is_new = False
-        except Candidate.DoesNotExist:
-            # If not found by LinkedIn URL, try to find by name
-            try:
-                candidate = Candidate.objects.get(company=hr_company, name=profile_data.get('fullName', 'N/A'))
-                is_new = False
-            except Candidate.DoesNotExist:
-                # If not found by name, try to find by email (if available)
-                email = profile_data.get('emailAddress')
-                if email:
-                    try:
-                        candidate = Candidate.objects.get(company=hr_company, email=email)
-                        is_new = False
-                    except Candidate.DoesNotExist:
-                        # Create new candidate if not found by email
-                        candidate = Candidate.objects.create(
-                            company=hr_company,
-                            name=profile_data.get('fullName', 'N/A'),
-                            phone='',
-                            linkedin_url=linkedin_url,
-                            status='NEW',
-                            last_status_update=timezone.now(),
-                            created_by=user
-                        )
-                        is_new = True
-                else:
-                    # Create new candidate if no email to check
-                    candidate = Candidate.objects.create(
-                        company=hr_company,
-                        name=profile_data.get('fullName', 'N/A'),
-                        phone='',
-                        linkedin_url=linkedin_url,
-                        status='NEW',
-                        last_status_update=timezone.now(),
-                        created_by=user
-                    )
-                    is_new = True
-
-        # Update candidate details
-        candidate.name = profile_data.get('fullName', candidate.name)
-        candidate.linkedin_url = linkedin_url
-        if not candidate.phone:  # Only update phone if it's empty
-            candidate.phone = ''
-        if candidate.status == 'NEW':  # Only update status if it's NEW
-            candidate.status = 'NEW'
-            candidate.last_status_update = timezone.now()
-        candidate.save()
-
-        # Update related Experience
+    # Update candidate details
+    candidate.name = profile_data.get('fullName', candidate.name)
+    candidate.linkedin_url = linkedin_url
+    if not candidate.phone:  # Only update phone if it's empty
+        candidate.phone = ''
+    if candidate.status == 'NEW':  # Only update status if it's NEW
+        candidate.status = 'NEW'
+        candidate.last_status_update = timezone.now()
+    candidate.save()
+
+    # Update related Experience and skills only when the profile content changed since it was last applied
+    experience_refreshed = candidate.linkedin_profile_hash != profile_hash
+    if experience_refreshed:
         candidate.experiences.all().delete()  # Clear existing experiences
         for exp in profile_data.get('experience', []):
             # Parse dates
@@ -621,53 +446,20 @@ def scrape_and_analyze_linkedin_profile_api(request):
                 description=exp.get('summary', '')
             )
 
-        # Log profile scrape activity
-        ActivityLog.objects.create(
-            user=user,
-            company=hr_company,
-            activity_type='PROFILE_SCRAPE',
-            details_json={
-                'linkedin_url': linkedin_url,
-                'candidate_name': candidate.name,
-                'candidate_id': candidate.id,
-                'is_new_candidate': is_new,
-                'scraped_data': {
-                    'headline': profile_data.get('headline'),
-                    'location': profile_data.get('location'),
-                    'experience_count': len(profile_data.get('experience', [])),
-                    'education_count': len(profile_data.get('education', []))
-                }
-                }
-            )
+        # LinkedIn skills are a list of names or {"name": ...} objects depending on the profile
+        linkedin_skills = [
+            skill.get('name') if isinstance(skill, dict) else skill
+            for skill in profile_data.get('skills') or []
+        ]
+        attach_candidate_skills(candidate, [name for name in linkedin_skills if isinstance(name, str)])
 
-        return Response(
-            {
-                'message': 'LinkedIn profile scraped and processed successfully',
-                'candidate_id': candidate.id,
-                'is_new_candidate': is_new,
-                'scraped_data': profile_data
-            },
-            status=status.HTTP_200_OK
-        )
+        candidate.linkedin_profile_hash = profile_hash
+        candidate.save(update_fields=['linkedin_profile_hash', 'updated_at'])
+
+    # Summaries generated from the previous version of this candidate are now stale
+    refresh_profile_hash(candidate)
+    return candidate, is_new, experience_refreshed
 
-    except requests.exceptions.RequestException as e:
-        ActivityLog.objects.create(
-            user=user,
-            company=hr_company,
-            activity_type='PROFILE_SCRAPE_ERROR',
-            details_json={'error_message': f'ScrapingDog API error: {str(e)}', 'linkedin_url': linkedin_url}
-        )
-        return Response({'error': f'Failed to connect to ScrapingDog API: {str(e)}'}, 
-                       status=status.HTTP_503_SERVICE_UNAVAILABLE)
-    except Exception as e:
-        ActivityLog.objects.create(
-            user=user,
-            company=hr_company,
-            activity_type='PROFILE_SCRAPE_ERROR',
-            details_json={'error_message': str(e), 'linkedin_url': linkedin_url}
-        )
-        return Response({'error': f'An unexpected error occurred: {str(e)}'}, 
-                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # --- Dashboard / Reporting Views ---
 @api_view(['GET'])
@@ -713,78 +505,30 @@ def hr_dashboard_summary(request):
     }, status=status.HTTP_200_OK)
 
 
-@api_view(['POST'])
+@api_view(['GET'])
 @authentication_classes([TokenAuthentication, SessionAuthentication])
-@permission_classes([IsAuthenticated, IsCompanyUser])
-def generate_candidate_analysis(request):
+@permission_classes([IsAuthenticated, IsAdminUser])
+def llm_metrics(request):
     """
-    Generates or retrieves an AI analysis comparing a candidate against a job description.
-    
-    Required fields in request body:
-    - candidate_id: ID of the candidate to analyze
-    - job_description: The job description text to compare against
-    
-    Returns:
-    - AI analysis summary including match score and detailed breakdown
+    Gemini throughput and queue depth from the shared rate-limit controller, plus the
+    prompt compaction savings, for this worker process. Requires admin privileges.
     """
-    try:
-        candidate_id = request.data.get('candidate_id')
-        print(candidate_id)
-        job_description = request.data.get('job_description')
-        if not candidate_id or not job_description:
-            return Response(
-                {'error': 'Both candidate_id and job_description are required'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        try:
-            candidate = Candidate.objects.get(
-                id=candidate_id,
-                created_by=request.user
-            )
-        except Candidate.DoesNotExist:
-            return Response(
-                {'error': 'Candidate not found or not accessible'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        analysis = get_candidate_analysis(candidate, job_description)
-        print("Analysis result:", analysis)
-        print(analysis)
-        if not analysis:
-            return Response(
-                {'error': 'Failed to generate analysis'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-        ActivityLog.objects.create(
-            user=request.user,
-            company=request.user.hr_profile.company,
-            activity_type='AI_ANALYSIS_GENERATED',
-            details_json={
-                'candidate_id': candidate.id,
-                'candidate_name': candidate.name,
-                'analysis_id': analysis.id,
-                'score': analysis.score
-            }
-        )
-        return Response({
-            'analysis_id': analysis.id,
-            'candidate_name': candidate.name,
-            'summary': analysis.summary_text,
-            'score': analysis.score,
-            'details': analysis.details_json,
-            'created_at': analysis.created_at
-        }, status=status.HTTP_200_OK)
-    except Exception as e:
-        ActivityLog.objects.create(
-            user=request.user,
-            company=request.user.hr_profile.company,
-            activity_type='AI_ANALYSIS_ERROR',
-            details_json={
-                'error': str(e),
-                'candidate_id': candidate_id if 'candidate_id' in locals() else None
-            }
-        )
-        return Response(
-            {'error': f'An unexpected error occurred: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    return Response({
+        'gemini': get_rate_controller().metrics(),
+        'prompt_compaction': compaction_totals(),
+    }, status=status.HTTP_200_OK)
 
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def readiness(request):
+    """
+    Readiness probe for the load balancer: 200 once this worker's caches are warm
+    (skill dictionary, recent compiled JDs, full-text index, feature arrays), 503 while they are loading.
+    """
+    if boot_warmup_enabled():
+        # A worker forked while its parent was warming up starts its own warm-up here
+        start_warmup()
+    warmup = warmup_status()
+    return Response(warmup, status=status.HTTP_200_OK if warmup['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .batch_backends import FAILED, RUNNING, get_batch_backend
+from .b_resume_rank import (
+    ANALYSIS_MODEL, CandidateAnalysisResponse, analysis_prompt, candidate_resume_content, current_profile_hash
+)
+from .models import AISummary, AnalysisBatchItem, AnalysisBatchJob, Candidate
+
+# Same output schema as the online analysis (generate_candidate_analysis_async)
+RESPONSE_SCHEMA = CandidateAnalysisResponse.model_json_schema()
+
+
+def item_key(item: AnalysisBatchItem) -> str:
+    return f"item-{item.id}"
+
+
+def create_job(company, jd_content: str, user=None, candidate_ids=None, backend: str = None) -> AnalysisBatchJob:
+    """
+    Creates an offline analysis job for a company's candidates against a job description.
+    Candidates that already have a current analysis for this JD get no item.
+
+    Args:
+        company: The Company whose candidates are analysed
+        jd_content: The job description text
+        user: User starting the job
+        candidate_ids: Optional subset of the company's candidates
+        backend: Dotted path of the batch backend (default settings.ANALYSIS_BATCH_BACKEND)
+
+    Returns:
+        The new AnalysisBatchJob
+    """
+    jd_hash = hashlib.md5(jd_content.encode()).hexdigest()
+    job = AnalysisBatchJob.objects.create(
+        company=company,
+        created_by=user,
+        jd_content=jd_content,
+        job_description_hash=jd_hash,
+        model=ANALYSIS_MODEL,
+        backend=backend or settings.ANALYSIS_BATCH_BACKEND,
+    )
+    analysed = set(
+        AISummary.objects.filter(company=company, job_description_hash=jd_hash, is_stale=False)
+        .values_list('candidate_id', 'profile_hash')
+    )
+    candidates = Candidate.objects.filter(company=company).order_by('id')
+    if candidate_ids:
+        candidates = candidates.filter(id__in=candidate_ids)
+    items = []
+    for candidate in candidates.iterator():
+        profile_hash = current_profile_hash(candidate)
+        if (candidate.id, profile_hash) not in analysed:
+            items.append(AnalysisBatchItem(job=job, candidate=candidate, profile_hash=profile_hash))
+    AnalysisBatchItem.objects.bulk_create(items, batch_size=500)
+    return job
+
+
+def build_request(job: AnalysisBatchJob, item: AnalysisBatchItem) -> dict:
+    prompt = analysis_prompt(job.jd_content, candidate_resume_content(item.candidate))
+    return {
+        'key': item_key(item),
+        'request': {
+            'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+            'generation_config': {
+                'response_mime_type': 'application/json',
+                'response_json_schema': RESPONSE_SCHEMA,
+            },
+        },
+    }
+
+
+def submit_pending(job: AnalysisBatchJob, backend, chunk_size: int = None) -> int:
+    """
+    Writes the job's pending items to JSONL files of chunk_size requests and submits each.
+    Items are marked SUBMITTED with the submission id as soon as it is accepted, so a
+    restart only rebuilds the chunk that was in flight.
+
+    Returns:
+        Number of items submitted
+    """
+    chunk_size = chunk_size or settings.ANALYSIS_BATCH_CHUNK_SIZE
+    job_dir = os.path.join(settings.ANALYSIS_BATCH_DIR, f"job-{job.id}")
+    os.makedirs(job_dir, exist_ok=True)
+    submitted = 0
+    while True:
+        chunk = list(job.items.filter(status='PENDING').select_related('candidate').order_by('id')[:chunk_size])
+        if not chunk:
+            return submitted
+        path = os.path.join(job_dir, f"input-{chunk[0].id}-{chunk[-1].id}.jsonl")
+        with open(path + '.tmp', 'w') as f:
+            for item in chunk:
+                # The prompt is built from the profile as it is now
+                item.profile_hash = current_profile_hash(item.candidate)
+                f.write(json.dumps(build_request(job, item)) + '\n')
+        os.replace(path + '.tmp', path)
+
+        remote_id = backend.submit(path, job.model)
+        for item in chunk:
+            item.status, item.remote_batch_id, item.error = 'SUBMITTED', remote_id, ''
+        AnalysisBatchItem.objects.bulk_update(chunk, ['status', 'remote_batch_id', 'profile_hash', 'error'], batch_size=500)
+        submitted += len(chunk)
+        print(f"Batch job {job.id}: submitted {len(chunk)} requests as {remote_id}")
+
+
+def _collect_submission(job: AnalysisBatchJob, backend, remote_id: str, state: str) -> tuple[int, int]:
+    items = {
+        item_key(item): item
+        for item in job.items.filter(status='SUBMITTED', remote_batch_id=remote_id).select_related('candidate')
+    }
+    summaries, finished = [], []
+    if state != FAILED:
+        for key, text, error in backend.results(remote_id):
+            item = items.pop(key, None)
+            if item is None:
+                continue
+            try:
+                if error:
+                    raise ValueError(error)
+                analysis = CandidateAnalysisResponse.model_validate_json(text)
+            except Exception as e:
+                item.status, item.error = 'FAILED', str(e)[:2000]
+                finished.append(item)
+                continue
+            candidate = item.candidate
+            summaries.append(AISummary(
+                candidate=candidate,
+                company=job.company,
+                created_by_id=candidate.created_by_id,
+                job_description_hash=job.job_description_hash,
+                profile_hash=item.profile_hash,
+                summary_text=analysis.summary_assessment,
+                score=analysis.overall_suitability_score,
+                details_json=analysis.dict(),
+                # The profile changed while the job was running
+                is_stale=candidate.profile_hash is not None and candidate.profile_hash != item.profile_hash,
+            ))
+            item.status, item.error = 'DONE', ''
+            finished.append(item)
+    for item in items.values():
+        item.status, item.error = 'FAILED', 'Batch submission failed' if state == FAILED else 'Missing from batch output'
+        finished.append(item)
+
+    # Summaries and item states are committed together: a crash here redoes only this submission
+    with transaction.atomic():
+        AISummary.objects.bulk_create(summaries, batch_size=500, ignore_conflicts=True)
+        AnalysisBatchItem.objects.bulk_update(finished, ['status', 'error'], batch_size=500)
+    return len(summaries), len(finished) - len(summaries)
+
+
+def collect_results(job: AnalysisBatchJob, backend) -> tuple[int, int]:
+    """
+    Polls every submission of the job that is still running and bulk-writes the AISummary
+    rows of those that finished.
+
+    Returns:
+        (items done, items failed) in this pass
+    """
+    done = failed = 0
+    remote_ids = job.items.filter(status='SUBMITTED').values_list('remote_batch_id', flat=True).distinct()
+    for remote_id in list(remote_ids):
+        state = backend.status(remote_id)
+        if state == RUNNING:
+            continue
+        submission_done, submission_failed = _collect_submission(job, backend, remote_id, state)
+        print(f"Batch job {job.id}: {remote_id} finished, {submission_done} analyses stored, {submission_failed} failed")
+        done += submission_done
+        failed += submission_failed
+    return done, failed
+
+
+def retry_failed(job: AnalysisBatchJob) -> int:
+    """
+    Puts the job's failed items back in the queue. Returns how many were reset.
+    """
+    return job.items.filter(status='FAILED').update(status='PENDING', remote_batch_id='', error='')
+
+
+def job_progress(job: AnalysisBatchJob) -> dict:
+    """
+    Returns the number of the job's items in each status.
+    """
+    counts = {status: 0 for status, _ in AnalysisBatchItem.STATUS_CHOICES}
+    for row in job.items.values('status').order_by().annotate(count=Count('id')):
+        counts[row['status']] = row['count']
+    return counts
+
+
+def run_job(job: AnalysisBatchJob, chunk_size: int = None, poll_interval: float = None, wait: bool = True) -> AnalysisBatchJob:
+    """
+    Submits a job's pending items and collects results until nothing is in flight. Every
+    step is checkpointed on the items, so run_job can be called again on a job that was
+    interrupted and only the unfinished work is redone.
+
+    Args:
+        job: The AnalysisBatchJob to run or resume
+        chunk_size: Requests per submitted file (default settings.ANALYSIS_BATCH_CHUNK_SIZE)
+        poll_interval: Seconds between polls (default settings.ANALYSIS_BATCH_POLL_INTERVAL)
+        wait: Keep polling until every submission finished; otherwise poll once and return
+
+    Returns:
+        The job, COMPLETED once no item is pending or in flight
+    """
+    poll_interval = settings.ANALYSIS_BATCH_POLL_INTERVAL if poll_interval is None else poll_interval
+    backend = get_batch_backend(job.backend)
+    if job.status != 'RUNNING':
+        job.status = 'RUNNING'
+        job.save(update_fields=['status', 'updated_at'])
+    try:
+        submit_pending(job, backend, chunk_size)
+        while True:
+            collect_results(job, backend)
+            if not job.items.filter(status__in=['PENDING', 'SUBMITTED']).exists():
+                job.status = 'COMPLETED'
+                job.save(update_fields=['status', 'updated_at'])
+                return job
+            if not wait:
+                return job
+            time.sleep(poll_interval)
+    except Exception as e:
+        print(f"Error running batch job {job.id}: {e}")
+        job.status = 'FAILED'
+        job.save(update_fields=['status', 'updated_at'])
+        raise
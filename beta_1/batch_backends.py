@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import uuid
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Normalized submission states
+RUNNING = 'RUNNING'
+SUCCEEDED = 'SUCCEEDED'
+FAILED = 'FAILED'
+
+
+class BatchBackend:
+    """
+    Runs a JSONL file of generate_content requests offline. Each input line is
+    {"key": ..., "request": {"contents": ..., "generation_config": ...}}.
+    """
+
+    def submit(self, input_path: str, model: str) -> str:
+        """Submits the file and returns the backend's id for the submission."""
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> str:
+        """Returns RUNNING, SUCCEEDED or FAILED."""
+        raise NotImplementedError
+
+    def results(self, batch_id: str):
+        """Yields (key, response_text, error) for every request of a succeeded submission."""
+        raise NotImplementedError
+
+
+class LocalFakeBackend(BatchBackend):
+    """
+    Completes every submission immediately with a canned, valid analysis, writing the
+    output next to the input. For tests and dry runs; it never calls Gemini.
+    """
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(settings.ANALYSIS_BATCH_DIR, 'fake', f"{batch_id}.jsonl")
+
+    def submit(self, input_path: str, model: str) -> str:
+        batch_id = uuid.uuid4().hex
+        os.makedirs(os.path.dirname(self._output_path(batch_id)), exist_ok=True)
+        with open(input_path) as source, open(self._output_path(batch_id), 'w') as output:
+            for line in source:
+                key = json.loads(line)['key']
+                analysis = {
+                    'summary_assessment': f"Offline analysis for {key}",
+                    'overall_suitability_score': 50.0,
+                    'job_title_from_jd': '',
+                    'education_and_certification_match': {},
+                }
+                output.write(json.dumps({'key': key, 'response': {'text': json.dumps(analysis)}}) + '\n')
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        return SUCCEEDED if os.path.exists(self._output_path(batch_id)) else FAILED
+
+    def results(self, batch_id: str):
+        with open(self._output_path(batch_id)) as f:
+            for line in f:
+                row = json.loads(line)
+                yield row['key'], row['response']['text'], None
+
+
+class GeminiBatchBackend(BatchBackend):
+    """
+    Gemini Batch API: the JSONL file is uploaded through the Files API and the results are
+    downloaded from the job's output file once it finishes.
+    """
+    STATES = {
+        'JOB_STATE_SUCCEEDED': SUCCEEDED,
+        'JOB_STATE_PARTIALLY_SUCCEEDED': SUCCEEDED,
+        'JOB_STATE_FAILED': FAILED,
+        'JOB_STATE_CANCELLED': FAILED,
+        'JOB_STATE_EXPIRED': FAILED,
+    }
+
+    def __init__(self):
+        from .gemini import get_client
+        self.client = get_client()
+
+    def submit(self, input_path: str, model: str) -> str:
+        uploaded = self.client.files.upload(
+            file=input_path,
+            config={'display_name': os.path.basename(input_path), 'mime_type': 'jsonl'},
+        )
+        job = self.client.batches.create(
+            model=model,
+            src=uploaded.name,
+            config={'display_name': os.path.basename(input_path)},
+        )
+        return job.name
+
+    def status(self, batch_id: str) -> str:
+        job = self.client.batches.get(name=batch_id)
+        return self.STATES.get(job.state.name, RUNNING)
+
+    def results(self, batch_id: str):
+        job = self.client.batches.get(name=batch_id)
+        content = self.client.files.download(file=job.dest.file_name)
+        for line in content.decode().splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get('error'):
+                yield row.get('key'), None, json.dumps(row['error'])
+                continue
+            try:
+                parts = row['response']['candidates'][0]['content']['parts']
+                yield row.get('key'), ''.join(part.get('text', '') for part in parts), None
+            except (KeyError, IndexError, TypeError) as e:
+                yield row.get('key'), None, f"Unexpected response: {e}"
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_batch_backend(path: str = None) -> BatchBackend:
+    """
+    Returns the backend at dotted path (default settings.ANALYSIS_BATCH_BACKEND).
+    """
+    path = path or settings.ANALYSIS_BATCH_BACKEND
+    if path not in _backends:
+        with _backends_lock:
+            if path not in _backends:
+                _backends[path] = import_string(path)()
+    return _backends[path]
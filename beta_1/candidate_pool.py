@@ -0,0 +1,99 @@
+import datetime
+
+from django.conf import settings
+from django.db.models import (
+    DateField, DurationField, Exists, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+)
+from django.db.models.functions import Coalesce
+
+from .fulltext import NOT_SEARCHED, match_keywords
+from .models import Candidate, CandidateSkill, Experience
+from .semantic_search import semantic_search
+
+
+def experience_duration():
+    """
+    Subquery of a candidate's total time in dated roles (an open role runs to today), the
+    SQL counterpart of JD_parse.calculate_total_experience. NULL when no role has a start date.
+    """
+    duration = ExpressionWrapper(
+        Coalesce(F('end_date'), Value(datetime.date.today(), output_field=DateField())) - F('start_date'),
+        output_field=DurationField(),
+    )
+    total = (
+        Experience.objects.filter(candidate=OuterRef('pk'), start_date__isnull=False)
+        .order_by().values('candidate').annotate(total=Sum(duration)).values('total')
+    )
+    return Subquery(total, output_field=DurationField())
+
+
+def required_skill_ids(compiled_jd) -> set[int]:
+    # Canonical skill ids that count towards at least one required JD skill
+    return {skill_id for _, weights in compiled_jd.skill_weights for skill_id, weight in weights.items() if weight > 0}
+
+
+def retrieval_candidate_ids(company, jd_content: str, compiled_jd=None, keyword_hits=NOT_SEARCHED) -> set[int] | None:
+    """
+    Returns the ids a ranking is narrowed to when semantic retrieval is on
+    (settings.SEMANTIC_RETRIEVAL_TOP_K), else None: the company's semantically closest
+    candidates to the JD, plus every candidate holding a required skill or matching a JD
+    keyword in the full-text index, so strong lexical matches the embedder ranks low are
+    never dropped. Pass keyword_hits when the ranking already searched the index.
+    """
+    if not settings.SEMANTIC_RETRIEVAL_TOP_K:
+        return None
+    semantic_hits = semantic_search(company, jd_content)
+    if not semantic_hits:
+        return None
+    candidate_ids = {candidate_id for candidate_id, _ in semantic_hits}
+    if compiled_jd is not None:
+        skill_ids = required_skill_ids(compiled_jd)
+        if skill_ids:
+            candidate_ids.update(
+                CandidateSkill.objects.filter(candidate__company=company, skill_id__in=skill_ids)
+                .values_list('candidate_id', flat=True)
+            )
+        if keyword_hits is NOT_SEARCHED:
+            keyword_hits = match_keywords(compiled_jd.keywords, compiled_jd.project_keywords, company=company)
+        if keyword_hits is None:
+            # Without the full-text index keyword matches cannot be told apart: rank the whole pool
+            return None
+        candidate_ids.update(keyword_hits)
+    return candidate_ids
+
+
+def scope_company(company=None, user=None):
+    """
+    Returns the company a ranking is scoped to: company, else the HR user's company, else None.
+    """
+    if company is not None:
+        return company
+    hr_profile = getattr(user, 'hr_profile', None) if user is not None else None
+    return hr_profile.company if hr_profile is not None else None
+
+
+def candidate_pool(company, compiled_jd=None, min_years: float | None = None, require_skill_match: bool | None = None):
+    """
+    Returns the queryset of a company's candidates worth ranking, with every filter in SQL:
+    statuses in settings.RANKING_EXCLUDED_STATUSES are left out, min_years keeps candidates
+    with at least that much dated experience, and require_skill_match keeps candidates holding
+    at least one skill that counts towards a required JD skill.
+
+    Args:
+        company: The Company (or id) whose candidates are ranked
+        compiled_jd: CompiledJD, needed for require_skill_match
+        min_years: Optional minimum years of experience
+        require_skill_match: Defaults to settings.RANKING_REQUIRE_SKILL_MATCH
+    """
+    pool = Candidate.objects.filter(company=company)
+    if settings.RANKING_EXCLUDED_STATUSES:
+        pool = pool.exclude(status__in=settings.RANKING_EXCLUDED_STATUSES)
+    if min_years:
+        pool = pool.annotate(experience_duration=experience_duration()).filter(
+            experience_duration__gte=datetime.timedelta(days=min_years * 365.25)
+        )
+    if require_skill_match is None:
+        require_skill_match = settings.RANKING_REQUIRE_SKILL_MATCH
+    if require_skill_match and compiled_jd is not None and compiled_jd.skills:
+        pool = pool.filter(Exists(CandidateSkill.objects.filter(candidate=OuterRef('pk'), skill_id__in=required_skill_ids(compiled_jd))))
+    return pool
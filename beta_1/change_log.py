@@ -0,0 +1,180 @@
+import datetime
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Candidate, CandidateChange, IndexCursor, RankingSnapshot
+
+# A candidate never moves between companies, so its company id can be cached for the
+# related-row signals (Experience, Project, CandidateSkill) that only know candidate_id.
+_company_ids = {}
+_company_ids_lock = threading.Lock()
+COMPANY_ID_CACHE_SIZE = 10000
+
+
+def _company_id_for(candidate_id):
+    company_id = _company_ids.get(candidate_id)
+    if company_id is None:
+        company_id = Candidate.objects.filter(id=candidate_id).values_list('company_id', flat=True).first()
+        if company_id is not None:
+            with _company_ids_lock:
+                if len(_company_ids) >= COMPANY_ID_CACHE_SIZE:
+                    _company_ids.clear()
+                _company_ids[candidate_id] = company_id
+    return company_id
+
+
+# Per thread (Django connections are): what was already written in the open transaction
+_transaction_state = threading.local()
+
+
+def _first_in_transaction(key) -> bool:
+    """
+    True unless key was already seen in the current transaction, in a savepoint that is
+    still open. Savepoints released or rolled back since, and calls outside a transaction,
+    always count as first.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return True
+    seen = getattr(_transaction_state, 'seen', None)
+    # The clearing callback is gone once the transaction committed or rolled back
+    if seen is None or not any(func == seen.clear for _, func, _ in connection.run_on_commit):
+        seen = _transaction_state.seen = {}
+        transaction.on_commit(seen.clear)
+    savepoints = tuple(connection.savepoint_ids)
+    seen_at = seen.get(key)
+    if seen_at is not None and savepoints[:len(seen_at)] == seen_at:
+        return False
+    seen[key] = savepoints
+    return True
+
+
+def _forget_in_transaction(key):
+    seen = getattr(_transaction_state, 'seen', None)
+    if seen is not None:
+        seen.pop(key, None)
+
+
+def record_candidate_change(candidate_id, company_id=None, deleted=False):
+    """
+    Appends an entry to the candidate change log read by the derived indexes
+    (semantic vectors, ranking features). Consumers keep their own cursor on the log id.
+    A candidate is logged once per transaction however many of its rows change, so
+    multi-row writes such as a resume import should run in transaction.atomic.
+    """
+    if not _first_in_transaction(('change', candidate_id, deleted)):
+        return None
+    if company_id is None:
+        company_id = _company_id_for(candidate_id)
+        if company_id is None:
+            return None
+    else:
+        with _company_ids_lock:
+            _company_ids[candidate_id] = company_id
+    return CandidateChange.objects.create(company_id=company_id, candidate_id=candidate_id, deleted=deleted)
+
+
+def clear_profile_hash(candidate_id):
+    """
+    Drops the candidate's stored profile hash after a profile change; AI analyses are keyed
+    on it and it is recomputed on the next analysis lookup. Runs once per transaction,
+    until profile_hash_stored records a fresh hash.
+    """
+    if _first_in_transaction(('profile', candidate_id)):
+        Candidate.objects.filter(id=candidate_id, profile_hash__isnull=False).update(profile_hash=None)
+
+
+def profile_hash_stored(candidate_id):
+    """
+    Called after a fresh profile hash was stored, so a later change in the same
+    transaction clears it again.
+    """
+    _forget_in_transaction(('profile', candidate_id))
+
+
+def pending_changes(company_id, after_id: int) -> tuple[set[int], set[int], int]:
+    """
+    Collapses the log entries after a consumer's cursor.
+    Pass company_id=None to read the log of every company.
+
+    Returns:
+        (changed_candidate_ids, deleted_candidate_ids, last_change_id)
+    """
+    changed, deleted = set(), set()
+    last_id = after_id
+    changes = CandidateChange.objects.filter(id__gt=after_id)
+    if company_id is not None:
+        changes = changes.filter(company_id=company_id)
+    for change_id, candidate_id, is_deleted in changes.order_by('id').values_list('id', 'candidate_id', 'deleted'):
+        last_id = change_id
+        if is_deleted:
+            changed.discard(candidate_id)
+            deleted.add(candidate_id)
+        else:
+            deleted.discard(candidate_id)
+            changed.add(candidate_id)
+    return changed, deleted, last_id
+
+
+def latest_change_id(company_id=None) -> int:
+    changes = CandidateChange.objects.all()
+    if company_id is not None:
+        changes = changes.filter(company_id=company_id)
+    return changes.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def get_cursor(name: str) -> int:
+    """
+    Returns the last change-log id applied by a database-backed consumer.
+    """
+    return IndexCursor.objects.filter(name=name).values_list('last_change_id', flat=True).first() or 0
+
+
+def set_cursor(name: str, last_change_id: int):
+    IndexCursor.objects.update_or_create(name=name, defaults={'last_change_id': last_change_id})
+
+
+def _file_cursor(directory: str, company_id) -> int | None:
+    # Change-log cursor in the meta.json of a file-based consumer, None if it has no files
+    try:
+        with open(os.path.join(directory, str(company_id), 'meta.json')) as f:
+            return json.load(f).get('last_change_id', 0)
+    except (OSError, ValueError):
+        return None
+
+
+def prune_changes() -> int:
+    """
+    Deletes the change-log entries every consumer has applied: per company, those up to the
+    lowest cursor of the database consumers (IndexCursor), the semantic vector index and
+    feature store files, and today's ranking snapshots (older ones are rescored in full).
+    A consumer without an index yet builds it from scratch and holds nothing back. Each
+    company's newest entry is kept, so latest_change_id still reports its position.
+
+    Returns:
+        Number of entries deleted
+    """
+    global_cursors = list(IndexCursor.objects.values_list('last_change_id', flat=True))
+    today = timezone.make_aware(datetime.datetime.combine(datetime.date.today(), datetime.time.min))
+    deleted = 0
+    latest_ids = CandidateChange.objects.order_by().values('company_id').annotate(latest=Max('id')).values_list('company_id', 'latest')
+    for company_id, latest_id in latest_ids:
+        cursors = list(global_cursors)
+        for directory in (settings.EMBEDDING_INDEX_DIR, settings.FEATURE_STORE_DIR):
+            cursor = _file_cursor(directory, company_id)
+            if cursor is not None:
+                cursors.append(cursor)
+        cursors.extend(
+            RankingSnapshot.objects.filter(company_id=company_id, created_at__gte=today)
+            .values_list('last_change_id', flat=True)
+        )
+        upto = min(cursors, default=latest_id)
+        count, _ = CandidateChange.objects.filter(company_id=company_id, id__lte=upto, id__lt=latest_id).delete()
+        deleted += count
+    return deleted
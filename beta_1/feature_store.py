@@ -0,0 +1,502 @@
+import datetime
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .candidate_pool import retrieval_candidate_ids
+from .change_log import latest_change_id, pending_changes
+from .models import Candidate, CandidateSkill, Experience
+from .semantic_search import _FileLock
+
+YEAR_DAYS = 365.25
+# Bump when the packed layout changes so stores written by older code are rebuilt
+FORMAT_VERSION = 1
+# Rows per id__in query when reading changed candidates
+QUERY_CHUNK_SIZE = 500
+
+# Column name and dtype, in file order
+ARRAYS = (
+    ('candidate_ids', np.int64),
+    ('skill_indptr', np.int64),
+    ('skill_ids', np.int32),
+    ('closed_days', np.int64),
+    ('open_roles', np.int32),
+    ('open_start_sum', np.int64),
+    ('role_indptr', np.int64),
+    ('role_ids', np.int32),
+    ('location_ids', np.int32),
+)
+_DTYPES = dict(ARRAYS)
+
+
+def _take_csr(indptr: np.ndarray, values: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # The CSR rows `rows`, in that order, as a new (indptr, values) pair
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    new_indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_indptr[1:])
+    positions = np.repeat(starts - new_indptr[:-1], lengths) + np.arange(new_indptr[-1], dtype=np.int64)
+    return new_indptr, values[positions]
+
+
+def _concat_csr(parts) -> tuple[np.ndarray, np.ndarray]:
+    indptrs, values, offset = [np.zeros(1, dtype=np.int64)], [], 0
+    for indptr, part_values in parts:
+        indptrs.append(indptr[1:] + offset)
+        values.append(part_values)
+        offset += len(part_values)
+    return np.concatenate(indptrs), np.concatenate(values) if values else np.zeros(0, dtype=np.int32)
+
+
+def _vocab_matches(vocab: list, needle: str | None) -> tuple[np.ndarray, np.ndarray]:
+    # Per vocabulary entry: equal to needle, and containing it, case-insensitively
+    exact = np.zeros(len(vocab), dtype=bool)
+    partial = np.zeros(len(vocab), dtype=bool)
+    if needle:
+        for index, value in enumerate(vocab):
+            value_lower = value.lower()
+            exact[index] = value_lower == needle
+            partial[index] = needle in value_lower
+    return exact, partial
+
+
+class CompanyFeatures:
+    """
+    One generation of a company's packed candidate features, sorted by candidate id. The
+    arrays are read-only views into a memory-mapped file, so every worker process shares the
+    same pages and nothing is copied to read them.
+
+        candidate_ids                     (n,) int64
+        skill_indptr, skill_ids           CSR of canonical skill ids per candidate
+        closed_days                       days in dated roles that have ended
+        open_roles, open_start_sum        dated roles still open and the sum of their start
+                                          ordinals, so experience is exact on any day
+        role_indptr, role_ids             CSR of experience roles, ids into roles
+        location_ids                      id into locations, -1 for none
+    """
+
+    def __init__(self, buffer, meta: dict):
+        self.generation = meta['generation']
+        self.last_change_id = meta['last_change_id']
+        self.roles = meta['roles']
+        self.locations = meta['locations']
+        for name, (offset, count) in meta['arrays'].items():
+            dtype = _DTYPES[name]
+            setattr(self, name, buffer[offset:offset + count * np.dtype(dtype).itemsize].view(dtype))
+
+    def __len__(self):
+        return len(self.candidate_ids)
+
+    def rows_of(self, candidate_ids) -> np.ndarray:
+        """
+        Returns the rows of the given candidate ids that are in the store, in the given order.
+        """
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        rows = np.searchsorted(self.candidate_ids, candidate_ids)
+        found = rows < len(self.candidate_ids)
+        found[found] = self.candidate_ids[rows[found]] == candidate_ids[found]
+        return rows[found]
+
+    def experience_years(self, rows: np.ndarray, today: datetime.date | None = None) -> np.ndarray:
+        # An open role runs to today, as in JD_parse.calculate_total_experience
+        today_ordinal = (today or datetime.date.today()).toordinal()
+        days = self.closed_days[rows] + self.open_roles[rows] * today_ordinal - self.open_start_sum[rows]
+        return days / YEAR_DAYS
+
+    def best_skill_weights(self, weights: dict[int, float], rows: np.ndarray) -> np.ndarray:
+        """
+        Returns, per row, the weight of the candidate skill that best satisfies one required
+        skill ({skill_id: weight}, from CompiledJD.skill_weights), 0 without a match.
+        """
+        best = np.zeros(len(rows), dtype=np.float64)
+        if not weights or not len(rows):
+            return best
+        size = max(max(weights) + 1, int(self.skill_ids.max(initial=0)) + 1)
+        lookup = np.zeros(size, dtype=np.float64)
+        lookup[list(weights)] = list(weights.values())
+        indptr, skill_ids = _take_csr(self.skill_indptr, self.skill_ids, rows)
+        matched = lookup[skill_ids]
+        non_empty = indptr[:-1] < indptr[1:]
+        if non_empty.any():
+            best[non_empty] = np.maximum.reduceat(matched, indptr[:-1][non_empty])
+        return best
+
+    def role_ids_of(self, row: int) -> np.ndarray:
+        return self.role_ids[self.role_indptr[row]:self.role_indptr[row + 1]]
+
+
+class CandidateFeatureStore:
+    """
+    The feature files of one company.
+
+    Files in `directory`:
+        features-<generation>.bin  every array of ARRAYS back to back, 8-byte aligned
+        meta.json                  generation, array offsets, role and location vocabularies,
+                                   change-log cursor
+    A published generation is never written to: an update writes the next one and swaps
+    meta.json, and workers remap when they see the new meta. Older files are unlinked, which
+    leaves mappings still held by other workers valid.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.features = None
+        self._lock = threading.RLock()
+        self._meta_mtime = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _file_lock(self):
+        return _FileLock(self._path('store.lock'))
+
+    def load(self) -> CompanyFeatures | None:
+        """
+        Maps the current generation, remapping if another process published a newer one.
+        Returns None if the company has no usable store yet.
+        """
+        with self._lock:
+            meta_path = self._path('meta.json')
+            for _ in range(3):
+                if not os.path.exists(meta_path):
+                    return None
+                mtime = os.stat(meta_path).st_mtime_ns
+                if self.features is not None and mtime == self._meta_mtime:
+                    return self.features
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                if meta.get('format') != FORMAT_VERSION:
+                    return None
+                if self.features is not None and meta['generation'] == self.features.generation:
+                    self._meta_mtime = mtime
+                    return self.features
+                try:
+                    buffer = np.memmap(self._path(meta['file']), dtype=np.uint8, mode='r')
+                except FileNotFoundError:
+                    # Replaced by a newer generation between reading meta and mapping it
+                    continue
+                self.features = CompanyFeatures(buffer, meta)
+                self._meta_mtime = mtime
+                return self.features
+            return self.features
+
+    def _write(self, columns: dict, roles: list, locations: list, last_change_id: int) -> CompanyFeatures:
+        generation = (self.features.generation if self.features is not None else 0) + 1
+        file_name = f'features-{generation}.bin'
+        tmp_path = self._path(file_name + '.tmp')
+        arrays = {}
+        position = 0
+        with open(tmp_path, 'wb') as f:
+            for name, dtype in ARRAYS:
+                data = np.ascontiguousarray(columns[name], dtype=dtype)
+                padding = -position % 8
+                f.write(b'\0' * padding)
+                position += padding
+                arrays[name] = [position, len(data)]
+                f.write(data.tobytes())
+                position += data.nbytes
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(file_name))
+        meta = {
+            'format': FORMAT_VERSION,
+            'generation': generation,
+            'file': file_name,
+            'count': len(columns['candidate_ids']),
+            'arrays': arrays,
+            'roles': roles,
+            'locations': locations,
+            'last_change_id': last_change_id,
+        }
+        tmp_path = self._path('meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._path('meta.json'))
+        for path in glob.glob(self._path('features-*.bin')):
+            if os.path.basename(path) != file_name:
+                os.remove(path)
+        self._meta_mtime = os.stat(self._path('meta.json')).st_mtime_ns
+        self.features = CompanyFeatures(np.memmap(self._path(file_name), dtype=np.uint8, mode='r'), meta)
+        return self.features
+
+    def _apply(self, company_id, changed_ids, removed_ids, last_change_id: int, rebuild: bool = False) -> CompanyFeatures:
+        # Carries unchanged rows over from the current generation and reads only changed ones
+        current = None if rebuild else self.features
+        roles = list(current.roles) if current is not None else []
+        locations = list(current.locations) if current is not None else []
+        new_rows = _read_candidates(company_id, None if rebuild else changed_ids)
+        columns = _pack(new_rows, roles, locations)
+        if current is not None and len(current):
+            drop = np.fromiter(set(changed_ids) | set(removed_ids), dtype=np.int64)
+            keep = np.nonzero(~np.isin(current.candidate_ids, drop))[0]
+            kept_skills = _take_csr(current.skill_indptr, current.skill_ids, keep)
+            kept_roles = _take_csr(current.role_indptr, current.role_ids, keep)
+            merged = {
+                name: np.concatenate([getattr(current, name)[keep], columns[name]])
+                for name in ('candidate_ids', 'closed_days', 'open_roles', 'open_start_sum', 'location_ids')
+            }
+            merged['skill_indptr'], merged['skill_ids'] = _concat_csr([kept_skills, (columns['skill_indptr'], columns['skill_ids'])])
+            merged['role_indptr'], merged['role_ids'] = _concat_csr([kept_roles, (columns['role_indptr'], columns['role_ids'])])
+            columns = merged
+        order = np.argsort(columns['candidate_ids'], kind='stable')
+        for name in ('candidate_ids', 'closed_days', 'open_roles', 'open_start_sum', 'location_ids'):
+            columns[name] = columns[name][order]
+        columns['skill_indptr'], columns['skill_ids'] = _take_csr(columns['skill_indptr'], columns['skill_ids'], order)
+        columns['role_indptr'], columns['role_ids'] = _take_csr(columns['role_indptr'], columns['role_ids'], order)
+        return self._write(columns, roles, locations, last_change_id)
+
+    def rebuild(self, company_id) -> CompanyFeatures:
+        """
+        Writes a fresh generation from every candidate of the company.
+        """
+        with self._lock, self._file_lock():
+            self.load()
+            return self._apply(company_id, (), (), latest_change_id(company_id), rebuild=True)
+
+    def sync(self, company_id) -> CompanyFeatures:
+        """
+        Brings the store up to date with the candidate change log, re-reading only candidates
+        written since its cursor. Runs under the store's file lock, so concurrent workers
+        apply each change once and the cursor never passes data that was not read.
+        """
+        with self._lock:
+            features = self.load()
+            if features is not None and features.last_change_id == latest_change_id(company_id):
+                return features
+            with self._file_lock():
+                features = self.load()
+                if features is None:
+                    return self._apply(company_id, (), (), latest_change_id(company_id), rebuild=True)
+                changed, deleted, last_id = pending_changes(company_id, features.last_change_id)
+                if last_id == features.last_change_id:
+                    return features
+                return self._apply(company_id, changed, deleted, last_id)
+
+
+def _chunks(ids):
+    ids = sorted(ids)
+    for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+        yield ids[start:start + QUERY_CHUNK_SIZE]
+
+
+def _read_candidates(company_id, candidate_ids=None) -> dict[int, dict]:
+    """
+    Reads the ranking features of a company's candidates, all of them when candidate_ids is None.
+
+    Returns:
+        {candidate_id: {'skills', 'closed_days', 'open_roles', 'open_start_sum', 'roles', 'location'}}
+    """
+    if candidate_ids is None:
+        filters = [{'company_id': company_id}]
+    else:
+        filters = [{'company_id': company_id, 'id__in': chunk} for chunk in _chunks(candidate_ids)]
+    rows = {}
+    for candidate_filter in filters:
+        for candidate_id, linkedin_url in Candidate.objects.filter(**candidate_filter).order_by().values_list('id', 'linkedin_url'):
+            # Candidates have no location field; score_candidate compares against the LinkedIn URL
+            rows[candidate_id] = {
+                'skills': [], 'closed_days': 0, 'open_roles': 0, 'open_start_sum': 0, 'roles': [], 'location': linkedin_url,
+            }
+        related_filter = {f'candidate__{key}': value for key, value in candidate_filter.items()}
+        for candidate_id, skill_id in CandidateSkill.objects.filter(**related_filter).order_by('id').values_list('candidate_id', 'skill_id'):
+            if candidate_id in rows:
+                rows[candidate_id]['skills'].append(skill_id)
+        experiences = Experience.objects.filter(**related_filter).order_by('id').values_list('candidate_id', 'role', 'start_date', 'end_date')
+        for candidate_id, role, start_date, end_date in experiences:
+            row = rows.get(candidate_id)
+            if row is None:
+                continue
+            row['roles'].append(role or '')
+            if start_date and end_date:
+                row['closed_days'] += (end_date - start_date).days
+            elif start_date:
+                row['open_roles'] += 1
+                row['open_start_sum'] += start_date.toordinal()
+    return rows
+
+
+def _pack(rows: dict[int, dict], roles: list, locations: list) -> dict:
+    # Columns of freshly read rows; new role and location strings are appended to the vocabularies
+    role_index = {role: index for index, role in enumerate(roles)}
+    location_index = {location: index for index, location in enumerate(locations)}
+
+    def intern(value, index, vocab):
+        if value not in index:
+            index[value] = len(vocab)
+            vocab.append(value)
+        return index[value]
+
+    candidate_ids = sorted(rows)
+    skill_indptr, skill_ids, role_indptr, role_ids, location_ids = [0], [], [0], [], []
+    for candidate_id in candidate_ids:
+        row = rows[candidate_id]
+        skill_ids.extend(row['skills'])
+        skill_indptr.append(len(skill_ids))
+        role_ids.extend(intern(role, role_index, roles) for role in row['roles'])
+        role_indptr.append(len(role_ids))
+        location_ids.append(-1 if row['location'] is None else intern(row['location'], location_index, locations))
+    return {
+        'candidate_ids': np.array(candidate_ids, dtype=np.int64),
+        'skill_indptr': np.array(skill_indptr, dtype=np.int64),
+        'skill_ids': np.array(skill_ids, dtype=np.int32),
+        'closed_days': np.array([rows[c]['closed_days'] for c in candidate_ids], dtype=np.int64),
+        'open_roles': np.array([rows[c]['open_roles'] for c in candidate_ids], dtype=np.int32),
+        'open_start_sum': np.array([rows[c]['open_start_sum'] for c in candidate_ids], dtype=np.int64),
+        'role_indptr': np.array(role_indptr, dtype=np.int64),
+        'role_ids': np.array(role_ids, dtype=np.int32),
+        'location_ids': np.array(location_ids, dtype=np.int32),
+    }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_feature_store(company_id) -> CandidateFeatureStore:
+    with _stores_lock:
+        store = _stores.get(company_id)
+        if store is None:
+            store = CandidateFeatureStore(os.path.join(settings.FEATURE_STORE_DIR, str(company_id)))
+            _stores[company_id] = store
+    return store
+
+
+def sync_company_features(company_id) -> CompanyFeatures:
+    """
+    Returns a company's current feature arrays, applying change-log entries written since
+    they were last published.
+    """
+    return get_feature_store(company_id).sync(company_id)
+
+
+def _score_row(compiled_jd, candidate, skill_weights, years, role_matches, location, keyword_hits):
+    # score_candidate, on one row of precomputed features
+    details = {}
+    if compiled_jd.skills:
+        matched = {skill: round(weight, 3) for skill, weight in skill_weights.items()}
+        skill_score = (sum(matched.values()) / len(compiled_jd.skills)) * 30
+        details['matched_skills'] = list(matched)
+        details['skill_match_weights'] = matched
+    else:
+        skill_score = 30
+        details['matched_skills'] = []
+    score = skill_score
+    details['skill_score'] = skill_score
+
+    required = compiled_jd.experience_years
+    if required is not None:
+        exp_diff = years - required
+        exp_score = 25 if abs(exp_diff) <= 1 else 15 if abs(exp_diff) <= 3 else 5
+        if exp_diff > 5:
+            exp_score -= 5
+            details['overfit'] = True
+        elif exp_diff < -3:
+            exp_score -= 5
+            details['underfit'] = True
+        details['candidate_experience'] = f"{years:.2f} years"
+        details['required_experience'] = f"{required} years"
+    else:
+        exp_score = 25
+        details['candidate_experience'] = f"{years:.2f} years"
+        details['required_experience'] = "N/A"
+    score += exp_score
+    details['experience_score'] = exp_score
+
+    matched_roles, exact_role = role_matches
+    role_score = 20 if exact_role else 10 if matched_roles else 0
+    details['matched_roles'] = matched_roles
+    details['role_score'] = role_score
+    details['required_role'] = compiled_jd.role
+    score += role_score
+
+    candidate_location, location_score = location
+    details['candidate_location'] = candidate_location
+    details['location_score'] = location_score
+    details['required_location'] = compiled_jd.location
+    score += location_score
+
+    keyword_score = 0
+    matched_keywords, matched_project_keywords = [], []
+    if compiled_jd.keywords or compiled_jd.project_keywords:
+        hits = keyword_hits.get(candidate.id, {})
+        matched_keywords = hits.get('keywords', [])
+        matched_project_keywords = hits.get('project_keywords', [])
+        total_keywords = len(compiled_jd.keywords) + len(compiled_jd.project_keywords)
+        keyword_score = ((len(matched_keywords) + len(matched_project_keywords)) / total_keywords) * 15
+        details['keyword_relevance'] = hits.get('relevance', 0.0)
+    details['matched_keywords'] = matched_keywords
+    details['matched_project_keywords'] = matched_project_keywords
+    details['keyword_score'] = keyword_score
+    details['required_keywords'] = compiled_jd.requirements.keywords
+    details['required_project_keywords'] = compiled_jd.requirements.project_keywords
+    score += keyword_score
+
+    details['total_score'] = score
+    return score, details
+
+
+def rank_with_features(company, compiled_jd, jd_content: str, pool) -> list[tuple]:
+    """
+    Ranking backend that scores from the company's memory-mapped feature arrays instead of
+    loading skills and experiences per candidate: best skill weights, experience years and
+    role/location matches are computed over whole columns, and only the candidate rows are
+    fetched. Takes the same arguments as ranking_snapshots.rank_with_snapshot.
+
+    Returns:
+        [(candidate, score, details)] best first, as JD_parse.find_matching_candidates
+    """
+    from .JD_parse import score_pool, sort_ranking
+    from .fulltext import match_keywords
+
+    keyword_hits = match_keywords(compiled_jd.keywords, compiled_jd.project_keywords, company=company)
+    if keyword_hits is None:
+        # Without the full-text index score_candidate falls back to substring matching
+        return sort_ranking(score_pool(compiled_jd, pool, company=company))
+
+    features = sync_company_features(company.id)
+    pool_ids = np.fromiter(pool.values_list('id', flat=True), dtype=np.int64)
+    retrieved_ids = retrieval_candidate_ids(company, jd_content, compiled_jd, keyword_hits)
+    if retrieved_ids is not None:
+        pool_ids = pool_ids[np.isin(pool_ids, np.fromiter(retrieved_ids, dtype=np.int64))]
+    rows = features.rows_of(pool_ids)
+    candidate_ids = features.candidate_ids[rows]
+
+    best_weights = [features.best_skill_weights(weights, rows) for _, weights in compiled_jd.skill_weights]
+    years = features.experience_years(rows)
+    role_exact, role_partial = _vocab_matches(features.roles, compiled_jd.role_lower)
+    location_exact, location_partial = _vocab_matches(features.locations, compiled_jd.location_lower)
+
+    candidates = Candidate.objects.in_bulk(candidate_ids.tolist())
+    ranking = []
+    for position, (row, candidate_id) in enumerate(zip(rows.tolist(), candidate_ids.tolist())):
+        candidate = candidates.get(candidate_id)
+        if candidate is None:
+            continue
+        skill_weights = {
+            skill: float(weights[position])
+            for (skill, _), weights in zip(compiled_jd.skill_weights, best_weights) if weights[position] > 0
+        }
+        role_ids = features.role_ids_of(row)
+        matched_roles = [features.roles[role_id] for role_id in role_ids.tolist() if role_partial[role_id]]
+        exact_role = bool(role_exact[role_ids].any()) if len(role_ids) else False
+        location_id = int(features.location_ids[row])
+        candidate_location = features.locations[location_id] if location_id >= 0 else None
+        location_score = 0
+        if location_id >= 0 and candidate_location:
+            location_score = 10 if location_exact[location_id] else 5 if location_partial[location_id] else 0
+        score, details = _score_row(
+            compiled_jd, candidate, skill_weights, float(years[position]),
+            (matched_roles, exact_role), (candidate_location, location_score), keyword_hits,
+        )
+        ranking.append((candidate, score, details))
+
+    # Candidates written after the arrays were synced are scored from the database
+    missing = set(pool_ids.tolist()) - set(candidate_ids.tolist())
+    if missing:
+        ranking += score_pool(compiled_jd, pool.filter(id__in=missing), company=company, keyword_hits=keyword_hits)
+    return sort_ranking(ranking)
@@ -0,0 +1,248 @@
+import os
+import re
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .change_log import get_cursor, latest_change_id, pending_changes, set_cursor
+from .keyword_matcher import JDKeywordMatcher
+from .models import Candidate, IndexCursor
+from .text_extraction import extract_text
+
+FTS_TABLE = 'beta_1_candidate_fts'
+CURSOR_NAME = 'fulltext'
+# SQLite caps a compound SELECT at 500 terms
+MAX_UNION_TERMS = 200
+# Default for keyword_hits arguments: the callee runs match_keywords itself
+NOT_SEARCHED = object()
+
+
+def resume_text_for(candidate: Candidate) -> str:
+    """
+    Returns the plain text of a candidate's stored resume, or '' if there is none.
+    """
+    if not candidate.resume_file_path or not os.path.exists(candidate.resume_file_path):
+        return ''
+    return extract_text(candidate.resume_file_path) or ''
+
+
+def candidate_document(candidate: Candidate) -> dict:
+    """
+    Builds the searchable fields of a candidate, one entry per index column.
+    """
+    experiences = list(candidate.experiences.all())
+    projects = list(candidate.projects.all())
+    return {
+        'skills': ' '.join(cs.skill.skill_name for cs in candidate.candidateskill_set.all()),
+        'roles': ' '.join(exp.role or '' for exp in experiences),
+        'experience': '\n'.join(f"{exp.company or ''} {exp.description or ''}" for exp in experiences),
+        'projects': '\n'.join(f"{p.name or ''} {p.description or ''}" for p in projects),
+        'resume': resume_text_for(candidate),
+    }
+
+
+def _empty_hits():
+    return {'keywords': [], 'project_keywords': [], 'relevance': 0.0}
+
+
+class FullTextBackend:
+    """
+    Interface of a full-text backend. `search` returns, per candidate id, the JD keywords and
+    project keywords found in the candidate's profile and a relevance score (higher is better).
+    """
+
+    def is_built(self) -> bool:
+        return True
+
+    def sync(self):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, keywords, project_keywords, company_id=None) -> dict[int, dict]:
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(FullTextBackend):
+    """
+    SQLite FTS5 index over skills, roles, experience, projects and resume text, ranked by BM25.
+    Kept current from the candidate change log that the model signals write. Until the first
+    rebuild has run, match_keywords searches with DatabaseBackend instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _index(self, candidate_ids):
+        candidates = (
+            Candidate.objects.filter(id__in=candidate_ids)
+            .prefetch_related('candidateskill_set__skill', 'experiences', 'projects')
+        )
+        with connection.cursor() as cursor:
+            for candidate in candidates:
+                doc = candidate_document(candidate)
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [candidate.id])
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, company_id, skills, roles, experience, projects, resume) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    [candidate.id, candidate.company_id, doc['skills'], doc['roles'], doc['experience'], doc['projects'], doc['resume']],
+                )
+
+    def _remove(self, candidate_ids):
+        with connection.cursor() as cursor:
+            for candidate_id in candidate_ids:
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [candidate_id])
+
+    def rebuild(self):
+        with self._lock:
+            last_id = latest_change_id()
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            candidate_ids = list(Candidate.objects.values_list('id', flat=True))
+            for start in range(0, len(candidate_ids), 500):
+                self._index(candidate_ids[start:start + 500])
+            set_cursor(CURSOR_NAME, last_id)
+
+    def is_built(self) -> bool:
+        # The cursor row is written once a full rebuild has finished
+        return IndexCursor.objects.filter(name=CURSOR_NAME).exists()
+
+    def sync(self):
+        """
+        Applies the changes logged since the last sync. Building the index from scratch is left
+        to rebuild (rebuild_fulltext_index or the warm-up), never done on a search.
+        """
+        if not self.is_built():
+            return
+        with self._lock:
+            cursor_id = get_cursor(CURSOR_NAME)
+            changed, deleted, last_id = pending_changes(None, cursor_id)
+            if last_id == cursor_id:
+                return
+            self._remove(deleted)
+            self._index(changed)
+            set_cursor(CURSOR_NAME, last_id)
+
+    @staticmethod
+    def _phrase(term: str) -> str | None:
+        if not re.search(r'\w', term or ''):
+            return None
+        return '"' + term.replace('"', '""') + '"'
+
+    def search(self, keywords, project_keywords, company_id=None) -> dict[int, dict]:
+        # One (label, kind, fts query) per keyword; project keywords only look at projects and resume
+        terms = []
+        for kw in keywords or []:
+            phrase = self._phrase(kw)
+            if phrase:
+                terms.append((kw, 'keywords', phrase))
+        for kw in project_keywords or []:
+            phrase = self._phrase(kw)
+            if phrase:
+                terms.append((kw, 'project_keywords', '{projects resume} : ' + phrase))
+
+        hits = {}
+        for start in range(0, len(terms), MAX_UNION_TERMS):
+            chunk = terms[start:start + MAX_UNION_TERMS]
+            selects, params = [], []
+            for position, (_, _, query) in enumerate(chunk):
+                select = f"SELECT rowid, {position}, bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+                params.append(query)
+                if company_id is not None:
+                    select += " AND company_id = %s"
+                    params.append(company_id)
+                selects.append(select)
+            with connection.cursor() as cursor:
+                cursor.execute(' UNION ALL '.join(selects), params)
+                rows = cursor.fetchall()
+            for candidate_id, position, rank in rows:
+                label, kind, _ = chunk[position]
+                entry = hits.setdefault(candidate_id, _empty_hits())
+                entry[kind].append(label)
+                # FTS5 bm25() is lower-is-better; flip it so relevance is higher-is-better
+                entry['relevance'] -= rank
+        return hits
+
+
+class DatabaseBackend(FullTextBackend):
+    """
+    Portable fallback: the pool's skills, roles, experience and projects are loaded in a few
+    prefetch queries and each candidate is scanned once by an Aho-Corasick automaton of all
+    the terms. Relevance is the number of matched terms.
+    """
+
+    def search(self, keywords, project_keywords, company_id=None) -> dict[int, dict]:
+        matcher = JDKeywordMatcher(keywords, project_keywords)
+        candidates = Candidate.objects.only('id').prefetch_related('candidateskill_set__skill', 'experiences', 'projects')
+        if company_id is not None:
+            candidates = candidates.filter(company_id=company_id)
+        hits = {}
+        for candidate in candidates.iterator(chunk_size=500):
+            text = '\n'.join([
+                '\n'.join(cs.skill.skill_name for cs in candidate.candidateskill_set.all()),
+                '\n'.join(f"{exp.role or ''}\n{exp.description or ''}" for exp in candidate.experiences.all()),
+            ])
+            project_text = '\n'.join(f"{p.name or ''}\n{p.description or ''}" for p in candidate.projects.all())
+            matched_keywords, matched_project_keywords = matcher.match(text, project_text)
+            if matched_keywords or matched_project_keywords:
+                hits[candidate.id] = {
+                    'keywords': matched_keywords,
+                    'project_keywords': matched_project_keywords,
+                    'relevance': float(len(matched_keywords) + len(matched_project_keywords)),
+                }
+        return hits
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _fts_table_exists() -> bool:
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def get_fulltext_backend() -> FullTextBackend:
+    """
+    Returns the configured backend; by default FTS5 on SQLite and the portable backend elsewhere.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.FULLTEXT_BACKEND:
+                    _backend = import_string(settings.FULLTEXT_BACKEND)()
+                elif connection.vendor == 'sqlite' and _fts_table_exists():
+                    _backend = SQLiteFTSBackend()
+                else:
+                    _backend = DatabaseBackend()
+    return _backend
+
+
+def match_keywords(keywords, project_keywords=None, company=None) -> dict[int, dict]:
+    """
+    Finds which JD keywords and project keywords each candidate matches, in one pass over the index.
+
+    Args:
+        keywords: JDRequirements.keywords
+        project_keywords: JDRequirements.project_keywords
+        company: Optional Company (or id) to restrict the search to
+
+    Returns:
+        {candidate_id: {'keywords': [...], 'project_keywords': [...], 'relevance': float}}
+        for candidates with at least one match, or None if the index could not be queried
+    """
+    if not keywords and not project_keywords:
+        return {}
+    backend = get_fulltext_backend()
+    try:
+        if not backend.is_built():
+            # The index is built off the request path; scan the database until it exists
+            backend = DatabaseBackend()
+        backend.sync()
+        return backend.search(keywords, project_keywords, company_id=getattr(company, 'id', company))
+    except Exception as e:
+        print(f"Error in full-text keyword search: {e}")
+        return None
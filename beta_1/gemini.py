@@ -0,0 +1,68 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+from google import genai
+
+load_dotenv()
+
+api_key = os.getenv("GEMINI_API")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    """
+    Returns the process-wide Gemini client. Sharing one client lets concurrent calls,
+    sync or through `client.aio`, reuse its connection pool instead of opening one per call.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = genai.Client(api_key=api_key)
+    return _client
+
+
+def generate_content(model: str, contents, config=None, priority: int = None):
+    """
+    client.models.generate_content through the shared rate-limit controller: the call waits
+    for quota and concurrency, and 429s and transient errors are retried with backoff.
+
+    Args:
+        model: Gemini model name
+        contents: Prompt contents
+        config: Optional generation config
+        priority: rate_limit.INTERACTIVE or rate_limit.BATCH (default: the current llm_priority)
+    """
+    from .rate_limit import get_rate_controller
+    return get_rate_controller().call(
+        model, contents,
+        lambda: get_client().models.generate_content(model=model, contents=contents, config=config),
+        priority,
+    )
+
+
+async def agenerate_content(model: str, contents, config=None, priority: int = None):
+    """
+    Async counterpart of generate_content, through client.aio.
+    """
+    from .rate_limit import get_rate_controller
+    return await get_rate_controller().acall(
+        model, contents,
+        lambda: get_client().aio.models.generate_content(model=model, contents=contents, config=config),
+        priority,
+    )
+
+
+def embed_content(model: str, contents, config=None, priority: int = None):
+    """
+    client.models.embed_content through the shared rate-limit controller.
+    """
+    from .rate_limit import get_rate_controller
+    return get_rate_controller().call(
+        model, contents,
+        lambda: get_client().models.embed_content(model=model, contents=contents, config=config),
+        priority,
+    )
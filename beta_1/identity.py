@@ -0,0 +1,171 @@
+import re
+from urllib.parse import unquote
+
+from django.db.models import Q
+
+from .models import Candidate, CandidateIdentity
+
+# Lookup priority when several identity keys point at different candidates.
+KIND_PRIORITY = ('LINKEDIN', 'EMAIL', 'PHONE')
+
+LINKEDIN_ID_PATTERN = re.compile(r'linkedin\.com/in/([^/?#]+)', re.IGNORECASE)
+
+
+def normalize_linkedin_id(value: str | None) -> str | None:
+    """
+    Returns the canonical LinkedIn id for a profile URL or a bare id.
+    "https://www.linkedin.com/in/John-Doe/?trk=x" and "john-doe" both become "john-doe".
+    """
+    if not value:
+        return None
+    value = value.strip()
+    match = LINKEDIN_ID_PATTERN.search(value)
+    if match:
+        value = match.group(1)
+    elif '/' in value or '.' in value:
+        return None
+    value = unquote(value).strip().strip('/').lower()
+    return value or None
+
+
+def normalize_email(value: str | None) -> str | None:
+    if not value:
+        return None
+    value = value.strip().lower()
+    return value if '@' in value else None
+
+
+def normalize_phone(value: str | None) -> str | None:
+    """
+    Keeps digits only and compares on the last 10, so "+91 98765-43210" and "9876543210" match.
+    """
+    if not value:
+        return None
+    digits = re.sub(r'\D', '', value)
+    if len(digits) < 7:
+        return None
+    return digits[-10:]
+
+
+def identity_keys(linkedin_url: str | None = None, email: str | None = None, phone: str | None = None) -> list[tuple[str, str]]:
+    """
+    Builds the normalized (kind, value) keys for a profile, in lookup priority order.
+    """
+    keys = []
+    for kind, value in (
+        ('LINKEDIN', normalize_linkedin_id(linkedin_url)),
+        ('EMAIL', normalize_email(email)),
+        ('PHONE', normalize_phone(phone)),
+    ):
+        if value:
+            keys.append((kind, value))
+    return keys
+
+
+def _keys_query(keys) -> Q:
+    query = Q()
+    for kind, value in keys:
+        query |= Q(kind=kind, value=value)
+    return query
+
+
+def resolve_candidate(company, linkedin_url: str | None = None, email: str | None = None, phone: str | None = None) -> Candidate | None:
+    """
+    Finds the existing candidate for an incoming profile with a single indexed query. A miss
+    falls back to the email column, for candidates whose email identity row is missing, so a
+    new candidate is never created with an email the company already uses.
+
+    Args:
+        company: The Company whose candidate pool is searched
+        linkedin_url: LinkedIn profile URL or id
+        email: Email address
+        phone: Phone number in any format
+
+    Returns:
+        The matching Candidate (LinkedIn id beats email beats phone), or None
+    """
+    keys = identity_keys(linkedin_url, email, phone)
+    if not keys:
+        return None
+    matches = {
+        identity.kind: identity.candidate
+        for identity in CandidateIdentity.objects.filter(company=company).filter(_keys_query(keys)).select_related('candidate')
+    }
+    for kind in KIND_PRIORITY:
+        if kind in matches:
+            return matches[kind]
+    email = normalize_email(email)
+    if email:
+        return Candidate.objects.filter(company=company, email__iexact=email).order_by('id').first()
+    return None
+
+
+def email_taken(company, email: str | None, candidate: Candidate | None = None) -> bool:
+    """
+    True when another candidate of the company already has email, so saving it on candidate
+    would break the (company, email) uniqueness. A profile matched on LinkedIn id or phone
+    keeps its own email in that case rather than taking the other candidate's.
+    """
+    email = normalize_email(email)
+    if not email:
+        return False
+    others = Candidate.objects.filter(company=company, email__iexact=email)
+    if candidate is not None and candidate.pk:
+        others = others.exclude(pk=candidate.pk)
+    return others.exists()
+
+
+def resolve_candidates_batch(company, profiles: list[dict]) -> list[Candidate | None]:
+    """
+    Resolves many incoming profiles at once for bulk imports.
+
+    Args:
+        company: The Company whose candidate pool is searched
+        profiles: Dicts with optional 'linkedin_url', 'email' and 'phone' keys
+
+    Returns:
+        A list aligned with profiles holding the matching Candidate or None
+    """
+    profile_keys = [
+        identity_keys(profile.get('linkedin_url'), profile.get('email'), profile.get('phone'))
+        for profile in profiles
+    ]
+    all_keys = {key for keys in profile_keys for key in keys}
+    owners = {}
+    if all_keys:
+        # Chunk the OR-clause so very large imports stay under SQLite's expression depth limit
+        all_keys = list(all_keys)
+        for start in range(0, len(all_keys), 500):
+            chunk = all_keys[start:start + 500]
+            for identity in CandidateIdentity.objects.filter(company=company).filter(_keys_query(chunk)).select_related('candidate'):
+                owners[(identity.kind, identity.value)] = identity.candidate
+
+    resolved = []
+    for keys in profile_keys:
+        # keys are already in priority order
+        resolved.append(next((owners[key] for key in keys if key in owners), None))
+    return resolved
+
+
+def sync_candidate_identities(candidate: Candidate):
+    """
+    Makes the identity rows of a candidate match its current LinkedIn URL, email and phone.
+    Keys already owned by another candidate of the same company are left with that candidate.
+    """
+    wanted = set(identity_keys(candidate.linkedin_url, candidate.email, candidate.phone))
+    existing = {
+        (identity.kind, identity.value): identity.id
+        for identity in CandidateIdentity.objects.filter(candidate=candidate)
+    }
+    stale_ids = [identity_id for key, identity_id in existing.items() if key not in wanted]
+    if stale_ids:
+        CandidateIdentity.objects.filter(id__in=stale_ids).delete()
+    missing = wanted - set(existing)
+    if missing:
+        CandidateIdentity.objects.bulk_create(
+            [
+                CandidateIdentity(company_id=candidate.company_id, candidate=candidate, kind=kind, value=value)
+                for kind, value in missing
+            ],
+            ignore_conflicts=True,
+        )
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from .keyword_matcher import JDKeywordMatcher
+from .models import JobDescription
+from .single_flight import single_flight
+from .skill_dictionary import dictionary_version
+from .skill_matcher import get_skill_matcher
+
+# Bump when JD_parse.score_candidate changes so stored rankings are recomputed
+SCORING_VERSION = 1
+
+
+def jd_content_hash(jd_content: str) -> str:
+    return hashlib.sha256(jd_content.strip().encode()).hexdigest()
+
+
+def _tokens(text: str | None) -> frozenset[str]:
+    return frozenset(re.findall(r'[\w+#]+', text.lower())) if text else frozenset()
+
+
+class CompiledJD:
+    """
+    JDRequirements prepared once for scoring many candidates: every required skill's match
+    weights over canonical skill ids, the role and location lowercased, and one keyword
+    automaton for the keywords and project keywords. Built against one SkillMatcher;
+    stale once the skill dictionary version moves.
+    """
+
+    def __init__(self, requirements, content_hash: str | None = None, matcher=None):
+        self.requirements = requirements
+        self.content_hash = content_hash
+        self.matcher = matcher or get_skill_matcher()
+
+        self.skills = list(requirements.skills or [])
+        # (required skill, {skill_id: weight}) with synonyms and spelling variants resolved
+        self.skill_weights = [(skill, self.matcher.match_weights(skill)) for skill in self.skills]
+        self.experience_years = requirements.experience_years
+        self.role = requirements.role
+        self.role_lower = requirements.role.lower() if requirements.role else None
+        self.role_tokens = _tokens(requirements.role)
+        self.location = requirements.location
+        self.location_lower = requirements.location.lower() if requirements.location else None
+        self.keywords = list(requirements.keywords or [])
+        self.project_keywords = list(requirements.project_keywords or [])
+        self.keyword_matcher = JDKeywordMatcher(self.keywords, self.project_keywords)
+        # Changes only when the requirements or what their skills resolve to change
+        self.fingerprint = hashlib.sha256(json.dumps(
+            [SCORING_VERSION, requirements.model_dump(), [(skill, sorted(weights.items())) for skill, weights in self.skill_weights]],
+            sort_keys=True, default=str,
+        ).encode()).hexdigest()
+
+    def is_current(self) -> bool:
+        return self.matcher.version == dictionary_version()
+
+    def match_skills(self, candidate_skill_ids) -> dict[str, float]:
+        """
+        Returns {required skill: weight} of the required skills the candidate's canonical
+        skill ids satisfy, each weighted by its best-matching candidate skill.
+        """
+        matched = {}
+        for skill, weights in self.skill_weights:
+            best = max((weights.get(skill_id, 0.0) for skill_id in candidate_skill_ids), default=0.0)
+            if best > 0:
+                matched[skill] = best
+        return matched
+
+
+def _load_requirements(content_hash: str):
+    from .JD_parse import JDRequirements
+    requirements = JobDescription.objects.filter(content_hash=content_hash).values_list('requirements', flat=True).first()
+    if requirements is None:
+        return None
+    try:
+        return JDRequirements.model_validate(requirements)
+    except Exception as e:
+        print(f"Error loading saved JD requirements for {content_hash[:12]}: {e}")
+        return None
+
+
+def get_jd_requirements(jd_content: str):
+    """
+    Returns the JDRequirements of a job description, extracting them with the LLM only the
+    first time the text is seen; concurrent searches for a new JD share one call.
+
+    Returns:
+        JDRequirements, or None if extraction failed
+    """
+    from .JD_parse import extract_jd_requirements
+    content_hash = jd_content_hash(jd_content)
+
+    def compute():
+        requirements = extract_jd_requirements(jd_content)
+        if requirements:
+            try:
+                JobDescription.objects.update_or_create(
+                    content_hash=content_hash,
+                    defaults={'content': jd_content.strip(), 'requirements': requirements.model_dump()},
+                )
+            except IntegrityError:
+                pass
+        return requirements
+
+    return single_flight(f"jd-requirements:{content_hash}", lambda: _load_requirements(content_hash), compute)
+
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def compile_jd(jd_content: str, record_use: bool = True) -> CompiledJD | None:
+    """
+    Returns the CompiledJD of a job description from the in-process cache, loading the saved
+    requirements (or extracting them) on a miss. Records the search on the JobDescription
+    so recently used JDs can be found again.
+
+    Args:
+        jd_content: The job description text
+        record_use: False when preloading, so warming the cache does not count as a search
+
+    Returns:
+        CompiledJD, or None if the requirements could not be extracted
+    """
+    content_hash = jd_content_hash(jd_content)
+    with _compiled_lock:
+        compiled = _compiled.get(content_hash)
+        if compiled is not None:
+            _compiled.move_to_end(content_hash)
+    if compiled is None or not compiled.is_current():
+        requirements = get_jd_requirements(jd_content)
+        if not requirements:
+            return None
+        compiled = CompiledJD(requirements, content_hash=content_hash)
+        with _compiled_lock:
+            _compiled[content_hash] = compiled
+            while len(_compiled) > settings.COMPILED_JD_CACHE_SIZE:
+                _compiled.popitem(last=False)
+    if record_use:
+        JobDescription.objects.filter(content_hash=content_hash).update(
+            use_count=F('use_count') + 1, last_used_at=timezone.now()
+        )
+    return compiled
@@ -0,0 +1,86 @@
+from collections import deque
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed list of patterns, matched case-insensitively as
+    substrings: one pass over a text finds every pattern in it, however many there are.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in (pattern or '').lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                    self._goto[state][char] = next_state
+                state = next_state
+            if state:
+                self._output[state] += (index,)
+
+        # Failure links breadth-first; each state also reports the patterns of its failure chain
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find(self, text: str | None) -> set[int]:
+        """
+        Returns the indexes of the patterns that occur in text.
+        """
+        found = set()
+        if not text or len(self._goto) == 1:
+            return found
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class JDKeywordMatcher:
+    """
+    Matches a JD's keywords and project keywords with one automaton. Keywords count anywhere
+    in a candidate's profile, project keywords only in their projects.
+    """
+
+    def __init__(self, keywords, project_keywords=None):
+        self.keywords = list(keywords or [])
+        self.project_keywords = list(project_keywords or [])
+        self.automaton = KeywordAutomaton(self.keywords + self.project_keywords)
+
+    def match(self, text: str, project_text: str = '') -> tuple[list[str], list[str]]:
+        """
+        Scans each text once.
+
+        Args:
+            text: The candidate's profile text outside projects
+            project_text: The candidate's project names and descriptions
+
+        Returns:
+            (matched keywords, matched project keywords), each in JD order
+        """
+        found = self.automaton.find(text)
+        project_found = self.automaton.find(project_text)
+        offset = len(self.keywords)
+        keywords = [keyword for index, keyword in enumerate(self.keywords) if index in found or index in project_found]
+        project_keywords = [keyword for index, keyword in enumerate(self.project_keywords) if offset + index in project_found]
+        return keywords, project_keywords
@@ -0,0 +1,226 @@
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+
+from .gemini import generate_content
+from .prompt_compaction import estimate_tokens
+
+RERANK_MODEL = "gemini-2.0-flash"
+DESCRIPTION_CHARS = 300
+PROJECT_CHARS = 200
+MAX_SKILLS = 30
+MAX_PROJECTS = 5
+
+
+def _trim(text: str | None, limit: int) -> str:
+    text = ' '.join((text or '').split())
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def compact_candidate_profile(candidate, score: float, details: dict) -> dict:
+    """
+    Builds the pre-trimmed profile sent to the LLM: no contact details, descriptions
+    cut to a few hundred characters, and the deterministic score as a hint. Expects the
+    candidate's experiences, projects and skills prefetched (prepare_rerank).
+    """
+    experiences = []
+    for exp in candidate.experiences.all():
+        start = exp.start_date.isoformat() if exp.start_date else '?'
+        end = exp.end_date.isoformat() if exp.end_date else 'present'
+        experiences.append({
+            'role': exp.role,
+            'company': exp.company,
+            'period': f"{start}..{end}",
+            'summary': _trim(exp.description, DESCRIPTION_CHARS),
+        })
+    return {
+        'candidate_id': candidate.id,
+        'name': candidate.name,
+        'keyword_score': round(score, 1),
+        'total_experience': details.get('candidate_experience'),
+        'skills': [cs.skill.skill_name for cs in candidate.candidateskill_set.all()][:MAX_SKILLS],
+        'experience': experiences,
+        'projects': [
+            {'name': project.name, 'summary': _trim(project.description, PROJECT_CHARS)}
+            for project in list(candidate.projects.all())[:MAX_PROJECTS]
+        ],
+    }
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def chunk_profiles(profiles: list[dict], anchors: list[dict], token_budget: int) -> list[list[dict]]:
+    """
+    Splits profiles into chunks whose JSON fits token_budget. Every chunk also carries the
+    anchor profiles so scores from different chunks can be calibrated against each other.
+    """
+    anchor_ids = {anchor['candidate_id'] for anchor in anchors}
+    anchor_tokens = sum(estimate_tokens(_dumps(anchor)) for anchor in anchors)
+    chunks, current, current_tokens = [], [], anchor_tokens
+    for profile in profiles:
+        if profile['candidate_id'] in anchor_ids:
+            continue
+        tokens = estimate_tokens(_dumps(profile))
+        if current and current_tokens + tokens > token_budget:
+            chunks.append(anchors + current)
+            current, current_tokens = [], anchor_tokens
+        current.append(profile)
+        current_tokens += tokens
+    if current or not chunks:
+        chunks.append(anchors + current)
+    return chunks
+
+
+def rerank_chunk(jd_content: str, chunk: list[dict]) -> dict | None:
+    """
+    Asks the LLM to score one chunk of candidates.
+
+    Returns:
+        {"scores": {candidate_id: {...}}, "summaries": {candidate_id: str}} or None on failure
+    """
+    prompt = f"""Based on the following Job Description:
+{jd_content}
+
+Evaluate these candidates (compact JSON; keyword_score is a 0-100 pre-ranking hint):
+{_dumps(chunk)}
+
+Respond with a JSON object with two keys:
+"ranked_candidates": a list with one item per candidate containing "candidate_id", "total_score", "skill_score" and "project_score", each score on a 0-100 scale, ranked by "total_score" descending.
+"candidate_summaries": an object mapping each "candidate_id" to a short paragraph on the candidate's strengths and weaknesses for this job.
+"""
+    try:
+        response = generate_content(
+            model=RERANK_MODEL,
+            contents=prompt,
+            config={"response_mime_type": "application/json"},
+        )
+        data = json.loads(response.text)
+        scores = {}
+        for item in data.get('ranked_candidates', []):
+            try:
+                scores[int(item['candidate_id'])] = {
+                    'total_score': float(item.get('total_score') or 0),
+                    'skill_score': item.get('skill_score'),
+                    'project_score': item.get('project_score'),
+                }
+            except (KeyError, TypeError, ValueError):
+                continue
+        summaries = {str(key): value for key, value in (data.get('candidate_summaries') or {}).items()}
+        return {'scores': scores, 'summaries': summaries}
+    except Exception as e:
+        print(f"Error re-ranking candidate chunk with LLM: {e}")
+        return None
+
+
+def iter_rerank_chunks(jd_content: str, profiles: list[dict], anchors: list[dict]):
+    """
+    Sends token-budgeted chunks to the LLM concurrently and yields (chunk, result)
+    as each one completes; result is None for a failed chunk.
+    """
+    chunks = chunk_profiles(profiles, anchors, settings.LLM_RERANK_CHUNK_TOKENS)
+    with ThreadPoolExecutor(max_workers=max(1, min(settings.LLM_RERANK_CONCURRENCY, len(chunks)))) as executor:
+        futures = {executor.submit(rerank_chunk, jd_content, chunk): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def merge_chunk_results(chunk_results, anchor_ids) -> tuple[dict[int, dict], dict[str, str]]:
+    """
+    Merges per-chunk LLM scores into one scale.
+
+    Each chunk scored the same anchor candidates, so the difference between a chunk's anchor
+    scores and the anchors' mean across chunks is that chunk's bias; it is subtracted from
+    every score in the chunk before merging.
+    """
+    successful = [result for _, result in chunk_results if result]
+    anchor_means = {}
+    for anchor_id in anchor_ids:
+        values = [result['scores'][anchor_id]['total_score'] for result in successful if anchor_id in result['scores']]
+        if values:
+            anchor_means[anchor_id] = sum(values) / len(values)
+
+    merged, summaries = {}, {}
+    for result in successful:
+        deltas = [
+            result['scores'][anchor_id]['total_score'] - mean
+            for anchor_id, mean in anchor_means.items()
+            if anchor_id in result['scores']
+        ]
+        offset = sum(deltas) / len(deltas) if deltas else 0.0
+        for candidate_id, scores in result['scores'].items():
+            if candidate_id in anchor_means:
+                calibrated = anchor_means[candidate_id]
+            else:
+                calibrated = max(0.0, min(100.0, scores['total_score'] - offset))
+            merged[candidate_id] = dict(scores, total_score=round(calibrated, 2))
+        summaries.update(result['summaries'])
+    return merged, summaries
+
+
+def prepare_rerank(ranked_candidates):
+    """
+    Picks the top-K candidates and builds their compact profiles and calibration anchors.
+
+    Returns:
+        (top, profiles, anchors) where top is the [(candidate, score, details)] slice
+    """
+    top = list(ranked_candidates[:settings.LLM_RERANK_TOP_K])
+    # Candidates carried over from a ranking snapshot come without prefetched relations
+    prefetch_related_objects([candidate for candidate, _, _ in top], 'experiences', 'projects', 'candidateskill_set__skill')
+    profiles = [compact_candidate_profile(candidate, score, details) for candidate, score, details in top]
+    anchors = profiles[:settings.LLM_RERANK_ANCHORS] if len(profiles) > settings.LLM_RERANK_ANCHORS else []
+    return top, profiles, anchors
+
+
+def build_ranked_output(top, merged: dict[int, dict]) -> list[dict]:
+    """
+    Combines merged LLM scores with the deterministic ranking, best first;
+    candidates without an LLM score keep their keyword score.
+    """
+    ranked = []
+    for candidate, score, details in top:
+        llm_scores = merged.get(candidate.id)
+        ranked.append({
+            'candidate_id': candidate.id,
+            'name': candidate.name,
+            'email': candidate.email,
+            'total_score': llm_scores['total_score'] if llm_scores else round(score, 2),
+            'skill_score': llm_scores['skill_score'] if llm_scores else details.get('skill_score'),
+            'project_score': llm_scores['project_score'] if llm_scores else None,
+        })
+    ranked.sort(key=lambda item: item['total_score'], reverse=True)
+    return ranked
+
+
+def rerank_candidates(jd_content: str, ranked_candidates, on_chunk=None) -> dict:
+    """
+    Re-ranks the top keyword-ranked candidates with the LLM.
+
+    Args:
+        jd_content: The job description text
+        ranked_candidates: [(candidate, score, details)] ordered best first
+        on_chunk: Optional callback(chunk_scores, chunk_summaries) for each completed chunk
+
+    Returns:
+        {"ranked_candidates": [...], "candidate_summaries": {...}} in the shape the search views expect;
+        candidates whose chunk failed keep their keyword score
+    """
+    top, profiles, anchors = prepare_rerank(ranked_candidates)
+    if not top:
+        return {"ranked_candidates": [], "candidate_summaries": {}}
+
+    chunk_results = []
+    for chunk, result in iter_rerank_chunks(jd_content, profiles, anchors):
+        chunk_results.append((chunk, result))
+        if on_chunk and result:
+            on_chunk(result['scores'], result['summaries'])
+
+    if not any(result for _, result in chunk_results):
+        return {"ranked_candidates": [{"error": "Failed to get LLM scores"}]}
+
+    merged, summaries = merge_chunk_results(chunk_results, [anchor['candidate_id'] for anchor in anchors])
+    return {"ranked_candidates": build_ranked_output(top, merged), "candidate_summaries": summaries}
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from beta_1.batch_analysis import create_job, job_progress, retry_failed, run_job
+from beta_1.models import AnalysisBatchJob, Company
+
+
+class Command(BaseCommand):
+    help = "Re-analyses a company's candidate pool against a job description through the offline batch backend. Resumable with --job."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="Company id; required when starting a job.")
+        parser.add_argument('--jd-file', help="Path to the job description text; starts a new job.")
+        parser.add_argument('--user', help="Username recorded on the job.")
+        parser.add_argument('--candidate', type=int, action='append', help="Candidate id; repeat for several. Defaults to the whole pool.")
+        parser.add_argument('--job', type=int, help="Resume an existing job instead of starting one.")
+        parser.add_argument('--backend', help="Dotted path of the batch backend, e.g. beta_1.batch_backends.LocalFakeBackend.")
+        parser.add_argument('--chunk-size', type=int, help="Requests per submitted JSONL file.")
+        parser.add_argument('--poll-interval', type=float, help="Seconds between polls of running submissions.")
+        parser.add_argument('--retry-failed', action='store_true', help="Queue the job's failed items again.")
+        parser.add_argument('--no-wait', action='store_true', help="Submit and poll once instead of waiting for every submission.")
+
+    def handle(self, *args, **options):
+        if options['job']:
+            try:
+                job = AnalysisBatchJob.objects.get(id=options['job'])
+            except AnalysisBatchJob.DoesNotExist:
+                raise CommandError(f"Batch job {options['job']} does not exist")
+            if options['backend']:
+                job.backend = options['backend']
+                job.save(update_fields=['backend', 'updated_at'])
+        else:
+            if not options['company'] or not options['jd_file']:
+                raise CommandError("--company and --jd-file are required to start a job (or pass --job to resume one)")
+            try:
+                company = Company.objects.get(id=options['company'])
+                user = User.objects.get(username=options['user']) if options['user'] else None
+            except (Company.DoesNotExist, User.DoesNotExist) as e:
+                raise CommandError(str(e))
+            with open(options['jd_file']) as f:
+                jd_content = f.read()
+            job = create_job(company, jd_content, user=user, candidate_ids=options['candidate'], backend=options['backend'])
+            self.stdout.write(f"Started batch job {job.id} with {job.items.count()} candidates to analyse")
+
+        if options['retry_failed']:
+            self.stdout.write(f"Re-queued {retry_failed(job)} failed items")
+
+        run_job(job, chunk_size=options['chunk_size'], poll_interval=options['poll_interval'], wait=not options['no_wait'])
+        progress = job_progress(job)
+        summary = ', '.join(f"{count} {status.lower()}" for status, count in progress.items())
+        if job.status == 'COMPLETED':
+            self.stdout.write(self.style.SUCCESS(f"Batch job {job.id} completed: {summary}"))
+        else:
+            self.stdout.write(f"Batch job {job.id} still running: {summary}. Resume with --job {job.id}.")
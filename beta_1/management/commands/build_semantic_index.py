@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from beta_1.models import Company
+from beta_1.semantic_search import rebuild_company_index, sync_company_index
+
+
+class Command(BaseCommand):
+    help = "Builds (or incrementally syncs) the per-company candidate embedding index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, action='append', help="Company id; repeat for several. Defaults to all companies.")
+        parser.add_argument('--rebuild', action='store_true', help="Re-embed every candidate instead of applying pending changes.")
+
+    def handle(self, *args, **options):
+        companies = Company.objects.all()
+        if options['company']:
+            companies = companies.filter(id__in=options['company'])
+        for company in companies:
+            if options['rebuild']:
+                count = rebuild_company_index(company.id)
+                self.stdout.write(f"{company.name}: indexed {count} candidates")
+            else:
+                sync_company_index(company.id)
+                self.stdout.write(f"{company.name}: index synced")
+        self.stdout.write(self.style.SUCCESS("Semantic index ready."))
@@ -0,0 +1,76 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from beta_1.change_log import clear_profile_hash, record_candidate_change
+from beta_1.models import Candidate, CandidateSkill, Skill, SkillAlias
+from beta_1.skill_dictionary import DEFAULT_ALIASES, bump_dictionary_version, normalize_skill_name
+
+
+class Command(BaseCommand):
+    help = "Merges Skill rows that differ only by case/whitespace (or a seeded alias) and backfills SkillAlias."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-aliases', action='store_true', help="Also merge the built-in alias spellings (python3 -> python, k8s -> kubernetes, ...).")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be merged without writing anything.")
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for skill in Skill.objects.order_by('id'):
+            groups[normalize_skill_name(skill.skill_name)].append(skill)
+
+        if options['seed_aliases']:
+            for alias, canonical in DEFAULT_ALIASES.items():
+                if alias in groups and canonical in groups and alias != canonical:
+                    groups[canonical].extend(groups.pop(alias))
+
+        merges = {name: skills for name, skills in groups.items() if len(skills) > 1}
+        for name, skills in merges.items():
+            self.stdout.write(f"{name}: keeping #{skills[0].id} '{skills[0].skill_name}', merging {[s.skill_name for s in skills[1:]]}")
+        if options['dry_run']:
+            self.stdout.write(f"{len(merges)} skill groups would be merged.")
+            return
+
+        merged_count = 0
+        moved_candidate_ids = set()
+        with transaction.atomic():
+            for name, skills in groups.items():
+                keep, duplicates = skills[0], skills[1:]
+                aliases = {name} | {normalize_skill_name(s.skill_name) for s in duplicates}
+                for duplicate in duplicates:
+                    moved_candidate_ids.update(CandidateSkill.objects.filter(skill=duplicate).values_list('candidate_id', flat=True))
+                    # Candidates that already have the kept skill just lose the duplicate link
+                    has_keep = CandidateSkill.objects.filter(skill=keep).values('candidate_id')
+                    CandidateSkill.objects.filter(skill=duplicate, candidate_id__in=has_keep).delete()
+                    CandidateSkill.objects.filter(skill=duplicate).update(skill=keep)
+                    SkillAlias.objects.filter(skill=duplicate).update(skill=keep)
+                    duplicate.delete()
+                    merged_count += 1
+
+                stripped_name = ' '.join(keep.skill_name.split())
+                if stripped_name != keep.skill_name:
+                    keep.skill_name = stripped_name
+                    keep.save(update_fields=['skill_name'])
+
+                for alias in aliases:
+                    SkillAlias.objects.update_or_create(alias=alias[:100], defaults={'skill': keep})
+
+            if options['seed_aliases']:
+                for alias, canonical in DEFAULT_ALIASES.items():
+                    canonical_skill = groups.get(canonical)
+                    if canonical_skill:
+                        SkillAlias.objects.update_or_create(alias=alias, defaults={'skill': canonical_skill[0]})
+
+            # The skill moves above are bulk updates without signals: log the candidates whose
+            # skills changed so their derived indexes, snapshots and analysis keys are refreshed
+            candidates = Candidate.objects.filter(id__in=moved_candidate_ids).values_list('id', 'company_id')
+            for candidate_id, company_id in candidates.iterator():
+                record_candidate_change(candidate_id, company_id)
+                clear_profile_hash(candidate_id)
+
+        # The alias moves above are bulk updates without signals: tell every process
+        bump_dictionary_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Merged {merged_count} duplicate skills into {len(groups)} canonical skills; {len(moved_candidate_ids)} candidates updated."
+        ))
@@ -0,0 +1,129 @@
+import os
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from beta_1.b_views import apply_resume_data
+from beta_1.identity import resolve_candidates_batch
+from beta_1.models import ActivityLog, Company
+from beta_1.resume_parse import extract_resume_details_batch
+from beta_1.resume_store import cached_resume_data, release_upload, save_resume_data, store_resume_file
+from beta_1.text_extraction import extract_text
+
+RESUME_EXTENSIONS = {'.pdf', '.docx', '.txt'}
+
+
+class Command(BaseCommand):
+    help = "Imports a folder of resumes for a company, parsing new files with batched LLM calls."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Resume files or directories (searched recursively for PDF, DOCX and TXT).")
+        parser.add_argument('--company', type=int, required=True, help="Company id the candidates belong to.")
+        parser.add_argument('--user', required=True, help="Username recorded as the creator of new candidates.")
+        parser.add_argument('--dry-run', action='store_true', help="Parse and report new/updated candidates without writing them.")
+
+    def _resume_paths(self, paths):
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    for name in sorted(names):
+                        if os.path.splitext(name)[1].lower() in RESUME_EXTENSIONS:
+                            yield os.path.join(root, name)
+            elif os.path.isfile(path):
+                yield path
+            else:
+                self.stderr.write(f"Skipping {path}: not found")
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(id=options['company'])
+            user = User.objects.get(username=options['user'])
+        except (Company.DoesNotExist, User.DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        stored_files = []
+        try:
+            self._import(company, user, options, stored_files)
+        finally:
+            # Each stored copy holds its file until here; files no candidate uses are deleted
+            for _, stored in stored_files:
+                release_upload(stored.content_hash)
+
+    def _import(self, company, user, options, stored_files):
+        # 1. Store every file by content hash; identical files were parsed before
+        parsed = {}
+        for path in self._resume_paths(options['paths']):
+            with open(path, 'rb') as f:
+                stored = store_resume_file(File(f, name=os.path.basename(path)))
+            stored_files.append((path, stored))
+            parsed.setdefault(stored.content_hash, cached_resume_data(stored.content_hash))
+
+        # 2. Extract the text of the rest and parse it in batches
+        pending = {}
+        for path, stored in stored_files:
+            if parsed[stored.content_hash] is None and stored.content_hash not in pending:
+                text = extract_text(stored.path)
+                if text:
+                    pending[stored.content_hash] = text
+                else:
+                    self.stderr.write(f"{path}: no text could be extracted")
+        self.stdout.write(f"{len(stored_files)} files, {len(pending)} to parse")
+        for content_hash, data in zip(pending, extract_resume_details_batch(list(pending.values()))):
+            if data:
+                save_resume_data(content_hash, data)
+            parsed[content_hash] = data
+
+        # Several copies of one file are imported once
+        importable, importable_hashes = [], set()
+        for path, stored in stored_files:
+            data = parsed[stored.content_hash]
+            if stored.content_hash in importable_hashes:
+                continue
+            if data and data.personal_info and data.personal_info.email:
+                importable.append((path, stored, data))
+                importable_hashes.add(stored.content_hash)
+            else:
+                self.stderr.write(f"{path}: not imported, no personal info or email was extracted")
+
+        # 3. Match the parsed resumes to existing candidates in one pass
+        existing = resolve_candidates_batch(company, [
+            {
+                'linkedin_url': data.personal_info.linkedin_url,
+                'email': data.personal_info.email,
+                'phone': data.personal_info.phone,
+            }
+            for _, _, data in importable
+        ])
+        new_count = sum(candidate is None for candidate in existing)
+        self.stdout.write(f"{len(importable)} resumes parsed: {new_count} new candidates, {len(importable) - new_count} updates")
+        if options['dry_run']:
+            # Nothing is attached to a candidate, so releasing drops the files this run stored
+            return
+
+        # 4. Create or update the candidates; files already applied to their candidate are skipped
+        imported = 0
+        for (path, stored, data), candidate in zip(importable, existing):
+            if candidate is not None and candidate.resume_hash == stored.content_hash:
+                continue
+            try:
+                with transaction.atomic():
+                    apply_resume_data(user, company, data, stored)
+                imported += 1
+            except Exception as e:
+                self.stderr.write(f"{path}: {e}")
+
+        ActivityLog.objects.create(
+            user=user,
+            company=company,
+            activity_type='RESUME_UPLOAD',
+            details_json={
+                'bulk_import': True,
+                'files': len(stored_files),
+                'parsed_with_llm': len(pending),
+                'imported': imported,
+                'new_candidates': new_count,
+            }
+        )
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} resumes."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from beta_1.change_log import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Deletes candidate change-log entries that every index and ranking snapshot has already applied."
+
+    def handle(self, *args, **options):
+        deleted = prune_changes()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} change-log entries."))
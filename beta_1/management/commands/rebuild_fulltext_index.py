@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from beta_1.fulltext import get_fulltext_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the candidate full-text index from scratch."
+
+    def handle(self, *args, **options):
+        backend = get_fulltext_backend()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Full-text index rebuilt ({type(backend).__name__})."))
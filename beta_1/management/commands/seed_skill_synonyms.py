@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from beta_1.models import SkillSynonym
+from beta_1.skill_dictionary import canonical_skill_id
+from beta_1.skill_matcher import DEFAULT_SYNONYMS
+
+
+class Command(BaseCommand):
+    help = "Adds the built-in skill synonym edges (e.g. javascript ~ typescript) for skills that exist."
+
+    def handle(self, *args, **options):
+        created = 0
+        for name, related_name, weight in DEFAULT_SYNONYMS:
+            skill_id = canonical_skill_id(name)
+            related_skill_id = canonical_skill_id(related_name)
+            if skill_id is None or related_skill_id is None or skill_id == related_skill_id:
+                self.stdout.write(f"Skipping {name} ~ {related_name}: skill not found")
+                continue
+            _, was_created = SkillSynonym.objects.update_or_create(
+                skill_id=skill_id,
+                related_skill_id=related_skill_id,
+                defaults={'weight': weight},
+            )
+            created += int(was_created)
+        self.stdout.write(self.style.SUCCESS(f"Added {created} skill synonyms."))
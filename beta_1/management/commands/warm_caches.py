@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from beta_1.warmup import warm_caches
+
+
+class Command(BaseCommand):
+    help = "Preloads the skill dictionary, recently searched JDs, the full-text index and per-company feature arrays."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jds', type=int, help="Recent JDs to compile. Defaults to settings.WARMUP_RECENT_JDS.")
+        parser.add_argument('--companies', type=int, help="Companies whose feature arrays are built. Defaults to settings.WARMUP_COMPANIES.")
+
+    def handle(self, *args, **options):
+        status = warm_caches(recent_jds=options['jds'], companies=options['companies'])
+        for name, step in status['steps'].items():
+            if 'error' in step:
+                self.stdout.write(self.style.ERROR(f"{name}: failed after {step['seconds']}s: {step['error']}"))
+            else:
+                self.stdout.write(f"{name}: {step['count']} loaded in {step['seconds']}s")
+        self.stdout.write(self.style.SUCCESS("Caches warm."))
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0002_alter_company_size"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidate",
+            name="linkedin_profile_hash",
+            field=models.CharField(
+                blank=True,
+                help_text="Content hash of the scraped LinkedIn profile last applied to this candidate.",
+                max_length=64,
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ScrapedProfile",
+            fields=[
+                (
+                    "linkedin_id",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                (
+                    "payload",
+                    models.BinaryField(
+                        help_text="zlib-compressed JSON profile returned by ScrapingDog."
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the canonical JSON profile.",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "fetched_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="When the profile was last fetched from ScrapingDog.",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Scraped Profiles",
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.1 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_identities(apps, schema_editor):
+    from beta_1.identity import identity_keys
+
+    Candidate = apps.get_model("beta_1", "Candidate")
+    CandidateIdentity = apps.get_model("beta_1", "CandidateIdentity")
+    rows = []
+    for candidate in Candidate.objects.order_by("id").iterator():
+        for kind, value in identity_keys(candidate.linkedin_url, candidate.email, candidate.phone):
+            rows.append(
+                CandidateIdentity(
+                    company_id=candidate.company_id,
+                    candidate_id=candidate.id,
+                    kind=kind,
+                    value=value,
+                )
+            )
+    CandidateIdentity.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0003_scrapedprofile_candidate_linkedin_profile_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CandidateIdentity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("LINKEDIN", "LinkedIn ID"),
+                            ("EMAIL", "Email"),
+                            ("PHONE", "Phone"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(
+                        help_text="Normalized key: canonical LinkedIn id, lowercased email or digits-only phone.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "candidate",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="identities",
+                        to="beta_1.candidate",
+                    ),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="candidate_identities",
+                        to="beta_1.company",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Candidate Identities",
+                "unique_together": {("company", "kind", "value")},
+            },
+        ),
+        migrations.RunPython(backfill_identities, migrations.RunPython.noop),
+    ]
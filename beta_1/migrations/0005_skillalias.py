@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0004_candidateidentity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SkillAlias",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "alias",
+                    models.CharField(
+                        help_text="Normalized (casefolded, whitespace-collapsed) spelling of a skill.",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "skill",
+                    models.ForeignKey(
+                        help_text="The canonical skill this spelling resolves to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="aliases",
+                        to="beta_1.skill",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Skill Aliases",
+            },
+        ),
+    ]
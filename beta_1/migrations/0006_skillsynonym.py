@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0005_skillalias"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SkillSynonym",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "weight",
+                    models.FloatField(
+                        default=0.5,
+                        help_text="Credit (0-1) given when related_skill stands in for skill.",
+                    ),
+                ),
+                (
+                    "related_skill",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="beta_1.skill",
+                    ),
+                ),
+                (
+                    "skill",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="synonyms",
+                        to="beta_1.skill",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("skill", "related_skill")},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0006_skillsynonym"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CandidateChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "candidate_id",
+                    models.BigIntegerField(
+                        help_text="Not a foreign key so deletions stay in the log."
+                    ),
+                ),
+                ("deleted", models.BooleanField(default=False)),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="beta_1.company",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["company", "id"], name="beta_1_candchg_company_id_idx"
+                    )
+                ],
+            },
+        ),
+    ]
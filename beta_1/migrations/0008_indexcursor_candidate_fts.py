@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:30
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+
+def create_candidate_fts(apps, schema_editor):
+    # FTS5 virtual table for SQLite deployments; other databases use the fallback backend
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS beta_1_candidate_fts USING fts5("
+            "company_id UNINDEXED, skills, roles, experience, projects, resume, "
+            "tokenize='porter unicode61')"
+        )
+    except OperationalError:
+        # SQLite built without FTS5
+        pass
+
+
+def drop_candidate_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS beta_1_candidate_fts")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0007_candidatechange"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexCursor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        help_text="Consumer of the candidate change log, e.g. 'fulltext'.",
+                        max_length=100,
+                        unique=True,
+                    ),
+                ),
+                ("last_change_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_candidate_fts, drop_candidate_fts),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0008_indexcursor_candidate_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ComputationLease",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        help_text="Identity of the computation, e.g. 'analysis:<candidate>:<jd hash>:<company>'.",
+                        max_length=255,
+                        unique=True,
+                    ),
+                ),
+                (
+                    "owner",
+                    models.CharField(
+                        help_text="Random token of the worker holding the lease.",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        help_text="After this the lease is considered abandoned and can be taken over."
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+    ]
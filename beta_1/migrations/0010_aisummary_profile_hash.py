@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+def mark_existing_summaries_stale(apps, schema_editor):
+    # Summaries created before profile hashing cannot be tied to a profile version
+    AISummary = apps.get_model("beta_1", "AISummary")
+    AISummary.objects.update(is_stale=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0009_computationlease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="candidate",
+            name="profile_hash",
+            field=models.CharField(
+                blank=True,
+                help_text="Content hash of the candidate's profile and resume; cleared when they change and recomputed on demand.",
+                max_length=64,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="aisummary",
+            name="profile_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Candidate.profile_hash the summary was generated from.",
+                max_length=64,
+            ),
+        ),
+        migrations.AddField(
+            model_name="aisummary",
+            name="is_stale",
+            field=models.BooleanField(
+                default=False,
+                help_text="Set when the candidate's profile changed after the summary was generated.",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="aisummary",
+            unique_together={("candidate", "job_description_hash", "company", "profile_hash")},
+        ),
+        migrations.RunPython(mark_existing_summaries_stale, migrations.RunPython.noop),
+    ]
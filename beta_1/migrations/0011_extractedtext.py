@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0010_aisummary_profile_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExtractedText",
+            fields=[
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the source file's bytes.",
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("text", models.TextField(blank=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        help_text="Document type the text was extracted as: pdf, docx or txt.",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "pages",
+                    models.IntegerField(
+                        default=0, help_text="Pages read; 1 for DOCX and TXT."
+                    ),
+                ),
+                (
+                    "truncated",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Whether extraction stopped at the page or character cap.",
+                    ),
+                ),
+                ("extractor", models.CharField(blank=True, max_length=20)),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Extracted Texts",
+            },
+        ),
+    ]
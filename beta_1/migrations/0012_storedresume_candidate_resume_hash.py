@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beta_1", "0011_extractedtext"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredResume",
+            fields=[
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="SHA-256 of the resume file's bytes.",
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "path",
+                    models.CharField(
+                        help_text="Location in the sharded store: <root>/<hash[:2]>/<hash[2:4]>/<hash><ext>.",
+                        max_length=512,
+                    ),
+                ),
+                ("size", models.BigIntegerField(default=0)),
+                ("original_name", models.CharField(blank=True, max_length=255)),
+                (
+                    "ref_count",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Number of candidates whose resume is this file.",
+                    ),
+                ),
+                (
+                    "parsed_data",
+                    models.JSONField(
+                        blank=True,
+                        help_text="ResumeData parsed from this file, reused for duplicate uploads.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Stored Resumes",
+            },
+        ),
+        migrations.AddField(
+            model_name="candidate",
+            name="resume_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="SHA-256 of the resume file in the content-addressed store (see StoredResume).",
+                max_length=64,
+                null=True,
+            ),
+        ),
+    ]
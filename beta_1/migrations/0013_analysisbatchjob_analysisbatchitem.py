@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beta_1', '0012_storedresume_candidate_resume_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisBatchJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jd_content', models.TextField()),
+                ('job_description_hash', models.CharField(max_length=128)),
+                ('model', models.CharField(max_length=100)),
+                ('backend', models.CharField(help_text='Dotted path of the beta_1.batch_backends backend the job runs on.', max_length=255)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='RUNNING', max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_batch_jobs', to='beta_1.company')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analysis_batch_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalysisBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile_hash', models.CharField(help_text='Candidate.profile_hash the prompt was built from.', max_length=64)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SUBMITTED', 'Submitted'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('remote_batch_id', models.CharField(blank=True, help_text='Backend id of the submission carrying this item.', max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analysis_batch_items', to='beta_1.candidate')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='beta_1.analysisbatchjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'status'], name='beta_1_anal_job_id_2fd702_idx')],
+                'unique_together': {('job', 'candidate')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beta_1', '0013_analysisbatchjob_analysisbatchitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobDescription',
+            fields=[
+                ('content_hash', models.CharField(help_text='SHA-256 of the job description text, stripped.', max_length=64, primary_key=True, serialize=False)),
+                ('content', models.TextField()),
+                ('requirements', models.JSONField(help_text='JDRequirements extracted from the text by the LLM.')),
+                ('use_count', models.IntegerField(default=0, help_text='Number of searches run with this job description.')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Job Descriptions',
+                'indexes': [models.Index(fields=['-last_used_at'], name='beta_1_jobd_last_us_cdc923_idx')],
+            },
+        ),
+    ]
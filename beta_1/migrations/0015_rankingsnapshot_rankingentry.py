@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beta_1', '0014_jobdescription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_description_hash', models.CharField(help_text='JobDescription.content_hash of the ranked JD.', max_length=64)),
+                ('fingerprint', models.CharField(help_text='CompiledJD.fingerprint the scores were computed with; a different one forces a full re-rank.', max_length=64)),
+                ('last_change_id', models.BigIntegerField(default=0, help_text='Candidate change log id the snapshot is current up to.')),
+                ('candidate_count', models.IntegerField(default=0)),
+                ('rescored_count', models.IntegerField(default=0, help_text='Candidates scored for this snapshot; the rest were carried over from the previous one.')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_snapshots', to='beta_1.company')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RankingEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('keyword_relevance', models.FloatField(default=0.0)),
+                ('details_json', models.JSONField(default=dict, help_text='Sub-scores and matches from JD_parse.score_candidate.')),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_entries', to='beta_1.candidate')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='beta_1.rankingsnapshot')),
+            ],
+            options={
+                'verbose_name_plural': 'Ranking Entries',
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rankingsnapshot',
+            index=models.Index(fields=['company', 'job_description_hash', '-created_at'], name='beta_1_rank_company_83d2b4_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='rankingentry',
+            unique_together={('snapshot', 'candidate')},
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beta_1', '0015_rankingsnapshot_rankingentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillDictionaryVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0, help_text='Bumped whenever a Skill, SkillAlias or SkillSynonym changes; processes rebuild their skill caches when it moves.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
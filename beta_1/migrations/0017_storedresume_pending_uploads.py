@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beta_1', '0016_skilldictionaryversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedresume',
+            name='pending_uploads',
+            field=models.IntegerField(default=0, help_text='Uploads of this file that are still being processed; the file is kept while any are.'),
+        ),
+    ]
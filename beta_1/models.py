@@ -62,6 +62,9 @@ class Candidate(models.Model):
     linkedin_url = models.URLField(blank=True, null=True)
     github_url = models.URLField(blank=True, null=True)
     resume_file_path = models.CharField(max_length=512, blank=True, null=True)
+    resume_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True, help_text="SHA-256 of the resume file in the content-addressed store (see StoredResume).")
+    linkedin_profile_hash = models.CharField(max_length=64, blank=True, null=True, help_text="Content hash of the scraped LinkedIn profile last applied to this candidate.")
+    profile_hash = models.CharField(max_length=64, blank=True, null=True, help_text="Content hash of the candidate's profile and resume; cleared when they change and recomputed on demand.")
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_candidates')
@@ -73,6 +76,54 @@ class Candidate(models.Model):
     def __str__(self):
         return f"{self.name} ({self.company.name}) - {self.status}"
 
+class CandidateIdentity(models.Model):
+    KIND_CHOICES = [
+        ('LINKEDIN', 'LinkedIn ID'),
+        ('EMAIL', 'Email'),
+        ('PHONE', 'Phone'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='candidate_identities')
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='identities')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    value = models.CharField(max_length=255, help_text="Normalized key: canonical LinkedIn id, lowercased email or digits-only phone.")
+
+    class Meta:
+        unique_together = (('company', 'kind', 'value'),)
+        verbose_name_plural = "Candidate Identities"
+
+    def __str__(self):
+        return f"{self.kind}:{self.value} -> {self.candidate_id}"
+
+class CandidateChange(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='+')
+    candidate_id = models.BigIntegerField(help_text="Not a foreign key so deletions stay in the log.")
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['company', 'id'], name='beta_1_candchg_company_id_idx')]
+
+    def __str__(self):
+        return f"Candidate {self.candidate_id} {'deleted' if self.deleted else 'changed'} at {self.created_at}"
+
+class IndexCursor(models.Model):
+    name = models.CharField(max_length=100, unique=True, help_text="Consumer of the candidate change log, e.g. 'fulltext'.")
+    last_change_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_change_id}"
+
+class ComputationLease(models.Model):
+    key = models.CharField(max_length=255, unique=True, help_text="Identity of the computation, e.g. 'analysis:<candidate>:<jd hash>:<company>'.")
+    owner = models.CharField(max_length=64, help_text="Random token of the worker holding the lease.")
+    expires_at = models.DateTimeField(help_text="After this the lease is considered abandoned and can be taken over.")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} ({self.owner})"
+
 class Experience(models.Model):
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='experiences')
     role = models.CharField(max_length=255)
@@ -90,6 +141,34 @@ class Skill(models.Model):
     def __str__(self):
         return self.skill_name
 
+class SkillAlias(models.Model):
+    alias = models.CharField(max_length=100, unique=True, help_text="Normalized (casefolded, whitespace-collapsed) spelling of a skill.")
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='aliases', help_text="The canonical skill this spelling resolves to.")
+
+    class Meta:
+        verbose_name_plural = "Skill Aliases"
+
+    def __str__(self):
+        return f"{self.alias} -> {self.skill.skill_name}"
+
+class SkillSynonym(models.Model):
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='synonyms')
+    related_skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+')
+    weight = models.FloatField(default=0.5, help_text="Credit (0-1) given when related_skill stands in for skill.")
+
+    class Meta:
+        unique_together = (('skill', 'related_skill'),)
+
+    def __str__(self):
+        return f"{self.skill.skill_name} ~ {self.related_skill.skill_name} ({self.weight})"
+
+class SkillDictionaryVersion(models.Model):
+    version = models.BigIntegerField(default=0, help_text="Bumped whenever a Skill, SkillAlias or SkillSynonym changes; processes rebuild their skill caches when it moves.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Skill dictionary v{self.version}"
+
 class CandidateSkill(models.Model):
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE)
     skill = models.ForeignKey(Skill, on_delete=models.CASCADE)
@@ -116,16 +195,64 @@ class AISummary(models.Model):
     summary_text = models.TextField()
     score = models.FloatField(blank=True, null=True)
     details_json = models.JSONField(default=dict, blank=True, null=True)
+    profile_hash = models.CharField(max_length=64, default='', blank=True, help_text="Candidate.profile_hash the summary was generated from.")
+    is_stale = models.BooleanField(default=False, help_text="Set when the candidate's profile changed after the summary was generated.")
     created_at = models.DateTimeField(default=timezone.now)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_summaries')
 
     class Meta:
-        unique_together = (('candidate', 'job_description_hash', 'company'),)
+        unique_together = (('candidate', 'job_description_hash', 'company', 'profile_hash'),)
         verbose_name_plural = "AI Summaries"
 
     def __str__(self):
         return f"Summary for {self.candidate.name} ({self.job_description_hash})"
 
+class AnalysisBatchJob(models.Model):
+    STATUS_CHOICES = [
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='analysis_batch_jobs')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='analysis_batch_jobs')
+    jd_content = models.TextField()
+    job_description_hash = models.CharField(max_length=128)
+    model = models.CharField(max_length=100)
+    backend = models.CharField(max_length=255, help_text="Dotted path of the beta_1.batch_backends backend the job runs on.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RUNNING')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Batch analysis #{self.id} ({self.company.name}, {self.status})"
+
+class AnalysisBatchItem(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SUBMITTED', 'Submitted'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    job = models.ForeignKey(AnalysisBatchJob, on_delete=models.CASCADE, related_name='items')
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='analysis_batch_items')
+    profile_hash = models.CharField(max_length=64, help_text="Candidate.profile_hash the prompt was built from.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    remote_batch_id = models.CharField(max_length=255, blank=True, help_text="Backend id of the submission carrying this item.")
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('job', 'candidate'),)
+        indexes = [models.Index(fields=['job', 'status'])]
+
+    def __str__(self):
+        return f"Job #{self.job_id} candidate {self.candidate_id}: {self.status}"
+
 class LinkedInProfile(models.Model):
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='linkedin_search_results')
     linkedin_id = models.CharField(max_length=255, primary_key=True)
@@ -146,6 +273,98 @@ class LinkedInProfile(models.Model):
     def __str__(self):
         return f"{self.title} ({self.linkedin_id})"
 
+class ScrapedProfile(models.Model):
+    linkedin_id = models.CharField(max_length=255, primary_key=True)
+    payload = models.BinaryField(help_text="zlib-compressed JSON profile returned by ScrapingDog.")
+    content_hash = models.CharField(max_length=64, help_text="SHA-256 of the canonical JSON profile.")
+    fetched_at = models.DateTimeField(default=timezone.now, help_text="When the profile was last fetched from ScrapingDog.")
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Scraped Profiles"
+
+    def __str__(self):
+        return f"{self.linkedin_id} ({self.content_hash[:12]})"
+
+class ExtractedText(models.Model):
+    content_hash = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of the source file's bytes.")
+    text = models.TextField(blank=True)
+    kind = models.CharField(max_length=10, help_text="Document type the text was extracted as: pdf, docx or txt.")
+    pages = models.IntegerField(default=0, help_text="Pages read; 1 for DOCX and TXT.")
+    truncated = models.BooleanField(default=False, help_text="Whether extraction stopped at the page or character cap.")
+    extractor = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Extracted Texts"
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.kind}, {self.pages} pages)"
+
+class StoredResume(models.Model):
+    content_hash = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of the resume file's bytes.")
+    path = models.CharField(max_length=512, help_text="Location in the sharded store: <root>/<hash[:2]>/<hash[2:4]>/<hash><ext>.")
+    size = models.BigIntegerField(default=0)
+    original_name = models.CharField(max_length=255, blank=True)
+    ref_count = models.IntegerField(default=0, help_text="Number of candidates whose resume is this file.")
+    pending_uploads = models.IntegerField(default=0, help_text="Uploads of this file that are still being processed; the file is kept while any are.")
+    parsed_data = models.JSONField(blank=True, null=True, help_text="ResumeData parsed from this file, reused for duplicate uploads.")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Stored Resumes"
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.original_name}, {self.ref_count} refs)"
+
+class JobDescription(models.Model):
+    content_hash = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 of the job description text, stripped.")
+    content = models.TextField()
+    requirements = models.JSONField(help_text="JDRequirements extracted from the text by the LLM.")
+    use_count = models.IntegerField(default=0, help_text="Number of searches run with this job description.")
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['-last_used_at'])]
+        verbose_name_plural = "Job Descriptions"
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.requirements.get('role') or 'no role'})"
+
+class RankingSnapshot(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='ranking_snapshots')
+    job_description_hash = models.CharField(max_length=64, help_text="JobDescription.content_hash of the ranked JD.")
+    fingerprint = models.CharField(max_length=64, help_text="CompiledJD.fingerprint the scores were computed with; a different one forces a full re-rank.")
+    last_change_id = models.BigIntegerField(default=0, help_text="Candidate change log id the snapshot is current up to.")
+    candidate_count = models.IntegerField(default=0)
+    rescored_count = models.IntegerField(default=0, help_text="Candidates scored for this snapshot; the rest were carried over from the previous one.")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['company', 'job_description_hash', '-created_at'])]
+
+    def __str__(self):
+        return f"Ranking of {self.job_description_hash[:12]} for {self.company.name} at {self.created_at}"
+
+class RankingEntry(models.Model):
+    snapshot = models.ForeignKey(RankingSnapshot, on_delete=models.CASCADE, related_name='entries')
+    candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='ranking_entries')
+    rank = models.IntegerField()
+    score = models.FloatField()
+    keyword_relevance = models.FloatField(default=0.0)
+    details_json = models.JSONField(default=dict, help_text="Sub-scores and matches from JD_parse.score_candidate.")
+
+    class Meta:
+        ordering = ['rank']
+        unique_together = (('snapshot', 'candidate'),)
+        verbose_name_plural = "Ranking Entries"
+
+    def __str__(self):
+        return f"#{self.rank} {self.candidate_id} ({self.score:.1f})"
+
 class CandidateStatusLog(models.Model):
     candidate = models.ForeignKey(Candidate, on_delete=models.CASCADE, related_name='status_history')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='candidate_status_logs')
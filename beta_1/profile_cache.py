@@ -0,0 +1,81 @@
+import hashlib
+import json
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ScrapedProfile
+
+# Fields ScrapingDog returns that we never use; they also churn between fetches
+# and would otherwise change the content hash on every scrape.
+UNWANTED_PROFILE_FIELDS = ('activities', 'people_also_viewed', 'similar_profiles')
+
+
+def clean_profile_data(profile_data: dict) -> dict:
+    """
+    Returns a copy of a scraped profile without the noisy fields we discard.
+    """
+    return {key: value for key, value in profile_data.items() if key not in UNWANTED_PROFILE_FIELDS}
+
+
+def compute_content_hash(profile_data: dict) -> str:
+    """
+    Hashes the canonical JSON form of a profile so key order does not matter.
+    """
+    canonical = json.dumps(profile_data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def load_profile_payload(entry: ScrapedProfile) -> dict:
+    """
+    Decompresses and decodes the stored profile payload.
+    """
+    return json.loads(zlib.decompress(bytes(entry.payload)).decode('utf-8'))
+
+
+def get_fresh_profile(linkedin_id: str, max_age: int | None = None) -> ScrapedProfile | None:
+    """
+    Returns the cached profile for a LinkedIn id if it was fetched within max_age seconds.
+
+    Args:
+        linkedin_id: The LinkedIn public id (the part after /in/)
+        max_age: Maximum age in seconds, defaults to settings.SCRAPED_PROFILE_MAX_AGE
+
+    Returns:
+        ScrapedProfile instance, or None if missing or expired
+    """
+    if max_age is None:
+        max_age = settings.SCRAPED_PROFILE_MAX_AGE
+    if max_age <= 0:
+        return None
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    return ScrapedProfile.objects.filter(linkedin_id=linkedin_id, fetched_at__gte=cutoff).first()
+
+
+def store_profile(linkedin_id: str, profile_data: dict) -> tuple[ScrapedProfile, bool]:
+    """
+    Stores a freshly scraped profile, rewriting the payload only when its content changed.
+
+    Returns:
+        (ScrapedProfile, changed) where changed is False if the stored hash already matched
+    """
+    content_hash = compute_content_hash(profile_data)
+    now = timezone.now()
+    entry = ScrapedProfile.objects.filter(linkedin_id=linkedin_id).first()
+    if entry and entry.content_hash == content_hash:
+        entry.fetched_at = now
+        entry.save(update_fields=['fetched_at', 'updated_at'])
+        return entry, False
+
+    payload = zlib.compress(json.dumps(profile_data, separators=(',', ':'), default=str).encode('utf-8'))
+    entry, _ = ScrapedProfile.objects.update_or_create(
+        linkedin_id=linkedin_id,
+        defaults={
+            'payload': payload,
+            'content_hash': content_hash,
+            'fetched_at': now,
+        }
+    )
+    return entry, True
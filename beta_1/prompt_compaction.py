@@ -0,0 +1,220 @@
+import re
+import threading
+
+from django.conf import settings
+
+# Pages of extracted PDF text are separated by form feeds (see text_extract_worker.py)
+PAGE_BREAK = '\f'
+# Lines this close to the top or bottom of a page are header/footer candidates
+EDGE_LINES = 2
+# Only runs of this many consecutive lines repeated verbatim are deduplicated, so a bullet
+# that recurs under a second employer is kept
+DEDUPE_BLOCK_LINES = 4
+# A repeated block needs at least one line this long (section titles, single skills are short)
+MIN_DEDUPE_CHARS = 20
+TRUNCATION_MARKER = '[... truncated ...]'
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Short enough that years and phone numbers on a line of their own are not mistaken for one
+_PAGE_NUMBER = re.compile(r'^(page\s*)?\d{1,3}(\s*(of|/)\s*\d{1,3})?$', re.IGNORECASE)
+_HORIZONTAL_SPACE = re.compile(r'[ \t\xa0\u2000-\u200b\u3000]+')
+
+_totals = {'calls': 0, 'bytes_before': 0, 'bytes_after': 0, 'tokens_before': 0, 'tokens_after': 0}
+_totals_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local estimate of the model's token count: subword tokenizers keep short words whole,
+    split long ones into roughly four-character pieces and give punctuation its own token.
+    """
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def normalize_whitespace(text: str) -> str:
+    """
+    Collapses runs of spaces and tabs, strips every line and keeps at most one blank line
+    in a row. Page breaks are preserved.
+    """
+    pages = []
+    for page in text.replace('\r\n', '\n').replace('\r', '\n').split(PAGE_BREAK):
+        lines, blank = [], False
+        for line in page.split('\n'):
+            line = _HORIZONTAL_SPACE.sub(' ', line).strip()
+            if not line:
+                if lines and not blank:
+                    lines.append('')
+                blank = True
+                continue
+            lines.append(line)
+            blank = False
+        pages.append('\n'.join(lines).strip('\n'))
+    return PAGE_BREAK.join(pages)
+
+
+def _edge_key(line: str) -> str:
+    # "Page 2 of 5" and "Page 3 of 5" are the same footer
+    return re.sub(r'\d+', '#', line.lower())
+
+
+def strip_headers_footers(text: str) -> str:
+    """
+    Removes page numbers and the lines repeated at the top or bottom of most pages, then
+    joins the pages. Both are only looked for among each page's edge lines.
+    """
+    pages = [page.split('\n') for page in text.split(PAGE_BREAK)]
+    repeated = set()
+    if len(pages) > 1:
+        counts = {}
+        for lines in pages:
+            content = [line for line in lines if line]
+            for key in {_edge_key(line) for line in content[:EDGE_LINES] + content[-EDGE_LINES:]}:
+                counts[key] = counts.get(key, 0) + 1
+        threshold = max(2, (len(pages) + 1) // 2)
+        repeated = {key for key, count in counts.items() if count >= threshold}
+
+    kept_pages = []
+    for lines in pages:
+        content_indexes = [i for i, line in enumerate(lines) if line]
+        edges = set(content_indexes[:EDGE_LINES] + content_indexes[-EDGE_LINES:])
+        kept = [
+            line for i, line in enumerate(lines)
+            if not (i in edges and (_PAGE_NUMBER.match(line) or _edge_key(line) in repeated))
+        ]
+        kept_pages.append('\n'.join(kept).strip('\n'))
+    return '\n\n'.join(page for page in kept_pages if page)
+
+
+def dedupe_lines(text: str) -> str:
+    """
+    Drops later copies of blocks of DEDUPE_BLOCK_LINES or more consecutive lines already
+    seen (compared case-insensitively), such as a page extracted twice. Single repeated
+    lines are kept: the same bullet under two jobs belongs to both.
+    """
+    lines = text.split('\n')
+    keys = [line.casefold() for line in lines]
+    first_seen, dropped = {}, set()
+    for start in range(len(lines) - DEDUPE_BLOCK_LINES + 1):
+        block = tuple(keys[start:start + DEDUPE_BLOCK_LINES])
+        if not all(block) or max(len(key) for key in block) < MIN_DEDUPE_CHARS:
+            continue
+        first = first_seen.setdefault(block, start)
+        # Overlapping matches are a run of identical lines, not a repeated block
+        if first + DEDUPE_BLOCK_LINES <= start:
+            dropped.update(range(start, start + DEDUPE_BLOCK_LINES))
+    kept = [line for i, line in enumerate(lines) if i not in dropped]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(kept)).strip()
+
+
+def _cut_line(line: str, budget: int) -> str:
+    # The longest prefix of line within budget estimated tokens, cut between tokens
+    end, used = 0, 0
+    for match in _TOKEN_PATTERN.finditer(line):
+        piece = match.group()
+        tokens = 1 + (len(piece) - 1) // 4
+        if used + tokens > budget:
+            break
+        used += tokens
+        end = match.end()
+    if end == 0 and budget > 0:
+        # A single token longer than the budget (an unbroken string): cut by characters
+        return line[:budget * 4]
+    return line[:end].rstrip()
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    Cuts text so that it fits in budget estimated tokens, keeping whole lines and as much
+    of the first line that does not fit as the budget leaves room for.
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    budget -= estimate_tokens(TRUNCATION_MARKER)
+    kept, used = [], 0
+    for line in text.split('\n'):
+        tokens = estimate_tokens(line) + 1
+        if used + tokens > budget:
+            partial = _cut_line(line, budget - used - 1)
+            if partial:
+                kept.append(partial)
+            break
+        kept.append(line)
+        used += tokens
+    return '\n'.join(kept + [TRUNCATION_MARKER])
+
+
+def clean_text(text: str) -> str:
+    """
+    Normalizes whitespace, strips repeated page headers and footers and deduplicates lines.
+    """
+    return dedupe_lines(strip_headers_footers(normalize_whitespace(text or '')))
+
+
+def token_budget(model: str) -> int:
+    return settings.PROMPT_TOKEN_BUDGETS.get(model, settings.PROMPT_TOKEN_BUDGET_DEFAULT)
+
+
+def _allocate(sizes: dict[str, int], budget: int) -> dict[str, int]:
+    """
+    Splits budget between inputs: inputs smaller than an even share keep their size and
+    the remainder is shared by the larger ones.
+    """
+    allocation, remaining, pending = {}, budget, dict(sizes)
+    while pending:
+        share = remaining // len(pending)
+        small = {name: size for name, size in pending.items() if size <= share}
+        if not small:
+            allocation.update({name: share for name in pending})
+            break
+        for name, size in small.items():
+            allocation[name] = size
+            remaining -= size
+            del pending[name]
+    return allocation
+
+
+def compact_inputs(model: str, purpose: str, **inputs: str) -> dict[str, str]:
+    """
+    Shrinks the free-text inputs of one prompt (resume, job description) before they are
+    sent to model: cleans each of them, then truncates them so that together they fit the
+    model's token budget. The bytes and estimated tokens saved are printed for the call.
+
+    Args:
+        model: Gemini model the prompt is for
+        purpose: Short label for the call, used in the report
+        **inputs: The texts to compact, by name
+
+    Returns:
+        The compacted texts, by the same names
+    """
+    cleaned = {name: clean_text(text) for name, text in inputs.items()}
+    sizes = {name: estimate_tokens(text) for name, text in cleaned.items()}
+    budget = token_budget(model)
+    if sum(sizes.values()) > budget:
+        allocation = _allocate(sizes, budget)
+        cleaned = {name: truncate_to_tokens(text, allocation[name]) for name, text in cleaned.items()}
+
+    bytes_before = sum(len((text or '').encode()) for text in inputs.values())
+    bytes_after = sum(len(text.encode()) for text in cleaned.values())
+    tokens_before = sum(estimate_tokens(text or '') for text in inputs.values())
+    tokens_after = sum(estimate_tokens(text) for text in cleaned.values())
+    with _totals_lock:
+        _totals['calls'] += 1
+        _totals['bytes_before'] += bytes_before
+        _totals['bytes_after'] += bytes_after
+        _totals['tokens_before'] += tokens_before
+        _totals['tokens_after'] += tokens_after
+    print(
+        f"Prompt compaction [{purpose}, {model}]: {bytes_before - bytes_after} bytes "
+        f"and ~{tokens_before - tokens_after} tokens saved ({tokens_before} -> {tokens_after} tokens)"
+    )
+    return cleaned
+
+
+def compaction_totals() -> dict:
+    """
+    Returns the bytes and estimated tokens before and after compaction, summed over all
+    calls in this process.
+    """
+    with _totals_lock:
+        return dict(_totals)
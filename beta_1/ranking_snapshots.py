@@ -0,0 +1,125 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .candidate_pool import retrieval_candidate_ids
+from .change_log import latest_change_id, pending_changes
+from .fulltext import NOT_SEARCHED, match_keywords
+from .models import Candidate, RankingEntry, RankingSnapshot
+
+
+def latest_snapshot(company, job_description_hash: str) -> RankingSnapshot | None:
+    return (
+        RankingSnapshot.objects.filter(company=company, job_description_hash=job_description_hash)
+        .order_by('-created_at', '-id').first()
+    )
+
+
+def _reusable(snapshot: RankingSnapshot | None, compiled_jd) -> bool:
+    # Experience counts open-ended roles up to today (JD_parse.score_candidate), so stored
+    # scores are only carried over on the day they were computed
+    return (
+        snapshot is not None
+        and snapshot.fingerprint == compiled_jd.fingerprint
+        and timezone.localtime(snapshot.created_at).date() == datetime.date.today()
+    )
+
+
+def _pool_ids(company, compiled_jd, jd_content: str, pool, keyword_hits) -> set[int]:
+    # The filtered pool, narrowed to the retrieved candidates when semantic retrieval is on
+    pool_ids = set(pool.values_list('id', flat=True))
+    retrieved_ids = retrieval_candidate_ids(company, jd_content, compiled_jd, keyword_hits)
+    if retrieved_ids is not None:
+        pool_ids &= retrieved_ids
+    return pool_ids
+
+
+def _save_snapshot(company, compiled_jd, ranked, last_change_id: int, rescored: int) -> RankingSnapshot | None:
+    try:
+        with transaction.atomic():
+            snapshot = RankingSnapshot.objects.create(
+                company=company,
+                job_description_hash=compiled_jd.content_hash,
+                fingerprint=compiled_jd.fingerprint,
+                last_change_id=last_change_id,
+                candidate_count=len(ranked),
+                rescored_count=rescored,
+            )
+            RankingEntry.objects.bulk_create([
+                RankingEntry(
+                    snapshot=snapshot,
+                    candidate=candidate,
+                    rank=rank,
+                    score=score,
+                    keyword_relevance=details.get('keyword_relevance', 0.0),
+                    details_json=details,
+                )
+                for rank, (candidate, score, details) in enumerate(ranked, start=1)
+            ], batch_size=500)
+        # Older snapshots beyond the history limit are dropped
+        stale_ids = list(
+            RankingSnapshot.objects.filter(company=company, job_description_hash=compiled_jd.content_hash)
+            .order_by('-created_at', '-id').values_list('id', flat=True)[settings.RANKING_SNAPSHOT_HISTORY:]
+        )
+        if stale_ids:
+            RankingSnapshot.objects.filter(id__in=stale_ids).delete()
+        return snapshot
+    except Exception as e:
+        print(f"Error saving ranking snapshot for {compiled_jd.content_hash[:12]}: {e}")
+        return None
+
+
+def rank_with_snapshot(company, compiled_jd, jd_content: str, pool) -> list[tuple]:
+    """
+    Ranks a company's pool for a compiled JD, re-scoring only what changed since the latest
+    snapshot of this (company, JD): candidates in the change log after the snapshot, and
+    candidates that entered the pool; those that left it are dropped. Everything else is
+    carried over with its stored sub-scores, if the snapshot was computed today. A new
+    snapshot is saved whenever something was re-scored or dropped, so past snapshots form
+    the JD's ranking history.
+
+    Args:
+        company: The Company whose candidates are ranked
+        compiled_jd: CompiledJD from jd_compile.compile_jd
+        jd_content: The job description text, for semantic retrieval
+        pool: Queryset of the company's candidates to rank (candidate_pool.candidate_pool)
+
+    Returns:
+        [(candidate, score, details)] best first, as JD_parse.find_matching_candidates
+    """
+    from .JD_parse import score_pool, sort_ranking
+
+    # Read before scoring: changes made while scoring are picked up next time
+    last_change_id = latest_change_id(company.id)
+    snapshot = latest_snapshot(company, compiled_jd.content_hash)
+    keyword_hits = NOT_SEARCHED
+    if settings.SEMANTIC_RETRIEVAL_TOP_K:
+        # Retrieval and scoring share one full-text search
+        keyword_hits = match_keywords(compiled_jd.keywords, compiled_jd.project_keywords, company=company)
+    pool_ids = _pool_ids(company, compiled_jd, jd_content, pool, keyword_hits)
+
+    reusable = _reusable(snapshot, compiled_jd)
+    carried = {}
+    if reusable:
+        changed, deleted, _ = pending_changes(company.id, snapshot.last_change_id)
+        for candidate_id, score, details in snapshot.entries.values_list('candidate_id', 'score', 'details_json'):
+            if candidate_id in pool_ids and candidate_id not in changed and candidate_id not in deleted:
+                carried[candidate_id] = (score, details)
+
+    to_score = pool_ids - set(carried)
+    candidates = Candidate.objects.in_bulk(list(carried))
+    ranking = [(candidates[candidate_id], score, details) for candidate_id, (score, details) in carried.items() if candidate_id in candidates]
+    if to_score:
+        ranking += score_pool(compiled_jd, pool.filter(id__in=to_score), company=company, keyword_hits=keyword_hits)
+    ranked = sort_ranking(ranking)
+
+    if reusable and not to_score and len(ranked) == snapshot.candidate_count:
+        # Nothing changed in the pool: the snapshot stays, only its cursor moves
+        if snapshot.last_change_id != last_change_id:
+            RankingSnapshot.objects.filter(id=snapshot.id).update(last_change_id=last_change_id)
+        return ranked
+    _save_snapshot(company, compiled_jd, ranked, last_change_id, rescored=len(to_score))
+    print(f"Ranking for {compiled_jd.content_hash[:12]}: {len(to_score)} candidates scored, {len(carried)} reused from the last snapshot")
+    return ranked
@@ -0,0 +1,386 @@
+import asyncio
+import contextvars
+import itertools
+import random
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .prompt_compaction import estimate_tokens
+
+# Lower runs first: interactive requests are admitted before batch work
+INTERACTIVE = 0
+BATCH = 10
+
+WINDOW_SECONDS = 60.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RETRY_DELAY_PATTERN = re.compile(r"retry(?:Delay'?\"?:\s*'?\"?| in )([\d.]+)\s*s", re.IGNORECASE)
+
+_priority = contextvars.ContextVar('llm_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """
+    Runs the Gemini calls made inside the block at priority, e.g. BATCH for bulk imports.
+    Worker threads need the context copied in (contextvars.copy_context().run).
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class _Ticket:
+    __slots__ = ('priority', 'seq', 'model', 'tokens', 'wake')
+
+    def __init__(self, priority, seq, model, tokens, wake):
+        self.priority, self.seq, self.model, self.tokens, self.wake = priority, seq, model, tokens, wake
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+def contents_tokens(contents) -> int:
+    if isinstance(contents, str):
+        return estimate_tokens(contents)
+    if isinstance(contents, (list, tuple)):
+        return sum(contents_tokens(part) for part in contents)
+    return estimate_tokens(str(contents))
+
+
+def error_status(error: Exception) -> int | None:
+    return getattr(error, 'code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+
+
+def retry_hint(error: Exception) -> float | None:
+    """
+    Seconds the API asked us to wait: the RetryInfo detail of a 429, a Retry-After
+    header, or "retry in 12.3s" in the message.
+    """
+    details = getattr(error, 'details', None)
+    if isinstance(details, dict):
+        for detail in (details.get('error') or {}).get('details') or []:
+            delay = detail.get('retryDelay') if isinstance(detail, dict) else None
+            if delay:
+                try:
+                    return float(str(delay).rstrip('s'))
+                except ValueError:
+                    pass
+    response = getattr(error, 'response', None)
+    header = getattr(response, 'headers', {}).get('retry-after') if response is not None else None
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    match = RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class GeminiRateController:
+    """
+    Admission control shared by every Gemini call in the process.
+
+    Calls wait in a priority queue and are admitted highest priority first when
+      - fewer than the AIMD concurrency limit are in flight (raised by one per limit's
+        worth of successes, halved on a 429 at most once per backoff period), and
+      - the model's requests and tokens over the last minute leave room in this process's
+        share of settings.GEMINI_RATE_LIMITS (divided by settings.GEMINI_WORKER_COUNT).
+    429s and transient errors are retried with jittered exponential backoff, honouring the
+    server's retry delay, during which new calls for that model are held back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: list[_Ticket] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._limit = float(settings.GEMINI_INITIAL_CONCURRENCY)
+        self._windows = defaultdict(deque)  # model -> deque of (time, tokens, is_request)
+        self._cooldown_until = defaultdict(float)
+        self._decrease_held_until = 0.0
+        self._stats = defaultdict(lambda: defaultdict(float))
+
+    # --- Admission ---
+
+    def _model_limits(self, model: str) -> dict:
+        # The windows are per process: each of the deployment's processes gets an equal share
+        limits = settings.GEMINI_RATE_LIMITS.get(model, settings.GEMINI_DEFAULT_RATE_LIMIT)
+        return {name: max(1, limit // settings.GEMINI_WORKER_COUNT) if limit else limit for name, limit in limits.items()}
+
+    def _window_wait(self, model: str, tokens: int, now: float) -> float:
+        window = self._windows[model]
+        while window and now - window[0][0] >= WINDOW_SECONDS:
+            window.popleft()
+        limits = self._model_limits(model)
+        wait = 0.0
+        requests = [started for started, _, is_request in window if is_request]
+        if limits.get('rpm') and len(requests) >= limits['rpm']:
+            wait = WINDOW_SECONDS - (now - requests[len(requests) - limits['rpm']])
+        if limits.get('tpm'):
+            excess = sum(used for _, used, _ in window) + tokens - limits['tpm']
+            # A single request larger than the whole budget is let through on an empty window
+            if excess > 0 and window:
+                freed = 0
+                for started, used, _ in window:
+                    freed += used
+                    if freed >= excess:
+                        wait = max(wait, WINDOW_SECONDS - (now - started))
+                        break
+        return wait
+
+    def _next_admissible(self, now: float) -> tuple[_Ticket | None, float | None]:
+        """
+        Returns the highest-priority queued call that may start now, or (None, seconds until
+        a blocked model frees up). A model held back by its quota does not block other models.
+        """
+        if self._in_flight >= max(1, int(self._limit)):
+            return None, None
+        shortest_wait, blocked = None, set()
+        for ticket in sorted(self._queue):
+            if ticket.model in blocked:
+                continue
+            wait = max(self._cooldown_until[ticket.model] - now, self._window_wait(ticket.model, ticket.tokens, now))
+            if wait <= 0:
+                return ticket, None
+            blocked.add(ticket.model)
+            shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+        return None, shortest_wait
+
+    def _try_admit(self, ticket: _Ticket) -> tuple[bool, float | None]:
+        """
+        Called under the lock. Returns (admitted, timeout): when not admitted the caller
+        waits for a wake-up, or at most timeout seconds when a time window has to pass.
+        """
+        now = time.monotonic()
+        admissible, wait = self._next_admissible(now)
+        if admissible is not ticket:
+            return False, wait
+        self._queue.remove(ticket)
+        self._in_flight += 1
+        self._windows[ticket.model].append((now, ticket.tokens, True))
+        self._wake_next()
+        return True, None
+
+    def _wake_next(self):
+        admissible, _ = self._next_admissible(time.monotonic())
+        if admissible is not None:
+            admissible.wake()
+
+    def _enqueue(self, model: str, tokens: int, priority: int, wake) -> _Ticket:
+        ticket = _Ticket(priority, next(self._seq), model, tokens, wake)
+        self._queue.append(ticket)
+        self._stats[model]['queued'] += 1
+        return ticket
+
+    def _abandon(self, ticket: _Ticket):
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                self._wake_next()
+
+    def acquire(self, model: str, tokens: int, priority: int):
+        event = threading.Event()
+        deadline = time.monotonic() + settings.GEMINI_QUEUE_TIMEOUT
+        with self._lock:
+            ticket = self._enqueue(model, tokens, priority, event.set)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                admitted, timeout = self._try_admit(ticket)
+                if admitted:
+                    self._stats[model]['wait_seconds'] += time.monotonic() - started
+                    return
+                event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._abandon(ticket)
+                raise RateLimitExceeded(f"Timed out waiting for Gemini capacity for {model}")
+            event.wait(min(timeout if timeout is not None else remaining, remaining))
+
+    async def aacquire(self, model: str, tokens: int, priority: int):
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        deadline = time.monotonic() + settings.GEMINI_QUEUE_TIMEOUT
+        with self._lock:
+            ticket = self._enqueue(model, tokens, priority, lambda: loop.call_soon_threadsafe(event.set))
+        started = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    admitted, timeout = self._try_admit(ticket)
+                    if admitted:
+                        self._stats[model]['wait_seconds'] += time.monotonic() - started
+                        return
+                    event.clear()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RateLimitExceeded(f"Timed out waiting for Gemini capacity for {model}")
+                try:
+                    await asyncio.wait_for(event.wait(), min(timeout if timeout is not None else remaining, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    def release(self, model: str, estimated_tokens: int, actual_tokens: int | None = None,
+                error: Exception | None = None, latency: float = 0.0):
+        with self._lock:
+            self._in_flight -= 1
+            stats = self._stats[model]
+            if error is not None:
+                if error_status(error) == 429:
+                    # Multiplicative decrease, and hold the model back for the server's retry delay.
+                    # The calls already in flight fail together: only the first 429 of a backoff
+                    # period lowers the limit.
+                    now = time.monotonic()
+                    retry_after = retry_hint(error)
+                    if now >= self._decrease_held_until:
+                        self._limit = max(1.0, self._limit / 2)
+                        self._decrease_held_until = now + max(retry_after or 0.0, settings.GEMINI_BACKOFF_BASE)
+                    stats['rate_limited'] += 1
+                    if retry_after:
+                        self._cooldown_until[model] = max(self._cooldown_until[model], now + retry_after)
+            else:
+                # Additive increase: about one more slot per limit's worth of successful calls
+                self._limit = min(float(settings.GEMINI_MAX_CONCURRENCY), self._limit + 1 / self._limit)
+                stats['succeeded'] += 1
+                stats['latency_seconds'] += latency
+                if actual_tokens:
+                    # Correct the window with what the call really used, output included
+                    self._windows[model].append((time.monotonic(), actual_tokens - estimated_tokens, False))
+                    stats['tokens'] += actual_tokens
+            self._wake_next()
+
+    # --- Calls ---
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        hint = retry_hint(error)
+        if hint is not None:
+            return hint + random.uniform(0, settings.GEMINI_BACKOFF_BASE)
+        # Full jitter
+        return random.uniform(0, min(settings.GEMINI_BACKOFF_MAX, settings.GEMINI_BACKOFF_BASE * 2 ** attempt))
+
+    def _outcome(self, model: str, error: Exception, attempt: int) -> tuple[bool, float]:
+        status = error_status(error)
+        retryable = status in RETRYABLE_STATUS or type(error).__name__ in ('TimeoutException', 'ConnectError', 'ReadTimeout')
+        with self._lock:
+            if not retryable or attempt >= settings.GEMINI_MAX_RETRIES:
+                self._stats[model]['failed'] += 1
+                return False, 0.0
+            self._stats[model]['retries'] += 1
+        return True, self._backoff(attempt, error)
+
+    def call(self, model: str, contents, request, priority: int = None):
+        """
+        Runs request() (a Gemini call for model with these contents) under admission control,
+        retrying 429s and transient errors. Raises the last error when retries run out.
+        """
+        priority = _priority.get() if priority is None else priority
+        tokens = contents_tokens(contents)
+        attempt = 0
+        while True:
+            self.acquire(model, tokens, priority)
+            started = time.monotonic()
+            try:
+                response = request()
+            except Exception as e:
+                self.release(model, tokens, error=e)
+                retry, delay = self._outcome(model, e, attempt)
+                if not retry:
+                    raise
+                print(f"Gemini call to {model} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.release(model, tokens, _usage_tokens(response), latency=time.monotonic() - started)
+            return response
+
+    async def acall(self, model: str, contents, request, priority: int = None):
+        """
+        Async counterpart of call: request() returns an awaitable.
+        """
+        priority = _priority.get() if priority is None else priority
+        tokens = contents_tokens(contents)
+        attempt = 0
+        while True:
+            await self.aacquire(model, tokens, priority)
+            started = time.monotonic()
+            try:
+                response = await request()
+            except Exception as e:
+                self.release(model, tokens, error=e)
+                retry, delay = self._outcome(model, e, attempt)
+                if not retry:
+                    raise
+                print(f"Gemini call to {model} failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self.release(model, tokens, _usage_tokens(response), latency=time.monotonic() - started)
+            return response
+
+    # --- Metrics ---
+
+    def metrics(self) -> dict:
+        """
+        Snapshot of the controller: concurrency, queue depth by priority, and per model the
+        last minute's requests and tokens against its limits plus cumulative counters.
+        """
+        with self._lock:
+            now = time.monotonic()
+            queue_depth = defaultdict(int)
+            for ticket in self._queue:
+                queue_depth['interactive' if ticket.priority <= INTERACTIVE else 'batch'] += 1
+            models = {}
+            for model in set(self._windows) | set(self._stats):
+                window = [entry for entry in self._windows[model] if now - entry[0] < WINDOW_SECONDS]
+                stats = self._stats[model]
+                models[model] = {
+                    'requests_last_minute': sum(1 for _, _, is_request in window if is_request),
+                    'tokens_last_minute': sum(used for _, used, _ in window),
+                    'limits': self._model_limits(model),
+                    'cooldown_seconds': round(max(0.0, self._cooldown_until[model] - now), 2),
+                    'succeeded': int(stats['succeeded']),
+                    'rate_limited': int(stats['rate_limited']),
+                    'retries': int(stats['retries']),
+                    'failed': int(stats['failed']),
+                    'tokens_used': int(stats['tokens']),
+                    'avg_latency_seconds': round(stats['latency_seconds'] / stats['succeeded'], 3) if stats['succeeded'] else None,
+                    'avg_queue_wait_seconds': round(stats['wait_seconds'] / stats['queued'], 3) if stats['queued'] else None,
+                }
+            return {
+                'concurrency_limit': round(self._limit, 2),
+                'in_flight': self._in_flight,
+                'queue_depth': {'total': len(self._queue), **queue_depth},
+                'models': models,
+            }
+
+
+def _usage_tokens(response) -> int | None:
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'total_token_count', None) if usage is not None else None
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_rate_controller() -> GeminiRateController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = GeminiRateController()
+    return _controller
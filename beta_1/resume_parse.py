@@ -3,6 +3,12 @@ from pydantic import BaseModel
 import json
 from dotenv import load_dotenv
 import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .gemini import agenerate_content, generate_content
+from .prompt_compaction import clean_text, compact_inputs, estimate_tokens
+from .rate_limit import BATCH, llm_priority
+from .resume_rules import llm_sections_text, parse_resume_locally
 
 load_dotenv()
 
@@ -42,6 +48,8 @@ class Project(BaseModel):
     project_name: str | None = None
     description: str | None = None
 
+RESUME_MODEL = "gemini-2.0-flash"
+
 class ResumeData(BaseModel):
     personal_info: PersonalInfo | None = None
     professional_experience: list[Experience] | None = None
@@ -50,7 +58,99 @@ class ResumeData(BaseModel):
     additional_information: list[str] | None = None
     projects: list[Project] | None = None
 
+class BatchResumeData(ResumeData):
+    resume_id: str
+
+class ResumeSections(BaseModel):
+    professional_experience: list[Experience] | None = None
+    education: list[Education] | None = None
+    projects: list[Project] | None = None
+
+
+def _local_first_pass(resume_content: str):
+    """
+    Runs the rule-based extractor. Returns (local, sections_text) when it is confident
+    enough to leave only the experience, education and projects sections to the LLM, or
+    None when the whole resume should go to the LLM.
+    """
+    local = parse_resume_locally(resume_content)
+    if local['confidence'] < settings.RESUME_RULES_MIN_CONFIDENCE:
+        print(f"Resume rules confidence {local['confidence']}: parsing the full resume with the LLM")
+        return None
+    return local, llm_sections_text(local['sections'])
+
+
+def _merge(local: dict, sections: ResumeSections | None) -> ResumeData:
+    return ResumeData(
+        personal_info=PersonalInfo(**local['personal_info']),
+        professional_experience=sections.professional_experience if sections else None,
+        education=sections.education if sections else None,
+        technical_skills=TechnicalSkills(**local['technical_skills']),
+        additional_information=local['additional_information'],
+        projects=sections.projects if sections else None,
+    )
+
+
 def extract_resume_details(resume_content: str) -> ResumeData | None:
+    """
+    Extracts details from resume content in two phases. Contact details, skills and
+    additional information are read locally with rules; the LLM then structures only the
+    experience, education and projects sections. Resumes the rules cannot read with
+    confidence (settings.RESUME_RULES_MIN_CONFIDENCE) are parsed entirely by the LLM.
+
+    Args:
+        resume_content: The text content of the resume.
+
+    Returns:
+        A ResumeData object containing the extracted information, or None if extraction fails.
+    """
+    first_pass = _local_first_pass(resume_content)
+    if first_pass is None:
+        return extract_resume_details_llm(resume_content)
+    local, sections_text = first_pass
+    if not sections_text:
+        return _merge(local, None)
+    try:
+        response = generate_content(
+            model=RESUME_MODEL,
+            contents=sections_prompt(sections_text),
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": ResumeSections,
+            },
+        )
+        return _merge(local, response.parsed)
+    except Exception as e:
+        print(f"Error during resume section extraction: {e}")
+        return None
+
+
+async def aextract_resume_details(resume_content: str) -> ResumeData | None:
+    """
+    Async counterpart of extract_resume_details using the async Gemini client.
+    """
+    first_pass = _local_first_pass(resume_content)
+    if first_pass is None:
+        return await aextract_resume_details_llm(resume_content)
+    local, sections_text = first_pass
+    if not sections_text:
+        return _merge(local, None)
+    try:
+        response = await agenerate_content(
+            model=RESUME_MODEL,
+            contents=sections_prompt(sections_text),
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": ResumeSections,
+            },
+        )
+        return _merge(local, response.parsed)
+    except Exception as e:
+        print(f"Error during resume section extraction: {e}")
+        return None
+
+
+def extract_resume_details_llm(resume_content: str) -> ResumeData | None:
     """
     Extracts details from resume content using a Generative AI model.
 
@@ -61,8 +161,161 @@ def extract_resume_details(resume_content: str) -> ResumeData | None:
     Returns:
         A ResumeData object containing the extracted information, or None if extraction fails.
     """
-    client = genai.Client(api_key=api_key)
-    prompt = f"""
+    prompt = resume_prompt(resume_content)
+    try:
+        response = generate_content(
+            model=RESUME_MODEL,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": ResumeData,
+            },
+        )
+        print(response.text)
+        # print(resume_content)
+        return response.parsed
+    except Exception as e:
+        print(f"Error during resume extraction: {e}")
+        print(f"Raw response: {response.text if 'response' in locals() else 'No response'}")
+        return None
+
+
+async def aextract_resume_details_llm(resume_content: str) -> ResumeData | None:
+    """
+    Async counterpart of extract_resume_details_llm using the async Gemini client.
+    """
+    try:
+        response = await agenerate_content(
+            model=RESUME_MODEL,
+            contents=resume_prompt(resume_content),
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": ResumeData,
+            },
+        )
+        return response.parsed
+    except Exception as e:
+        print(f"Error during resume extraction: {e}")
+        return None
+
+
+def _batch_input(resume_content: str) -> tuple[str, dict | None]:
+    """
+    Returns (text to send, local first pass): only the LLM sections when the rules read
+    the resume with confidence, otherwise the whole resume and None.
+    """
+    local = parse_resume_locally(resume_content)
+    sections_text = llm_sections_text(local['sections'])
+    if local['confidence'] >= settings.RESUME_RULES_MIN_CONFIDENCE and sections_text:
+        return clean_text(sections_text), local
+    return clean_text(resume_content), None
+
+
+def _pack_batches(items: list[tuple[int, str, int]]) -> list[list[tuple[int, str]]]:
+    """
+    Greedily packs (index, text, tokens) items into batches of at most RESUME_BATCH_SIZE
+    items and RESUME_BATCH_TOKENS estimated tokens.
+    """
+    batches, current, current_tokens = [], [], 0
+    for index, text, tokens in items:
+        if current and (len(current) >= settings.RESUME_BATCH_SIZE or current_tokens + tokens > settings.RESUME_BATCH_TOKENS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append((index, text))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_batch(batch: list[tuple[int, str]]) -> dict[int, ResumeData]:
+    """
+    Parses several resumes with one structured-output call. Items the model leaves out
+    or returns under an unknown id are missing from the result.
+    """
+    response = generate_content(
+        model=RESUME_MODEL,
+        contents=batch_prompt(batch),
+        config={
+            "response_mime_type": "application/json",
+            "response_schema": list[BatchResumeData],
+        },
+    )
+    expected = {str(index) for index, _ in batch}
+    parsed = {}
+    for item in response.parsed or []:
+        if item.resume_id in expected:
+            parsed[int(item.resume_id)] = ResumeData(**item.model_dump(exclude={'resume_id'}))
+    return parsed
+
+
+def _parse_batch_or_split(batch: list[tuple[int, str]]) -> dict[int, ResumeData]:
+    # A failed call (often a response cut off mid-JSON) is retried as two smaller batches
+    try:
+        return _parse_batch(batch)
+    except Exception as e:
+        if len(batch) == 1:
+            print(f"Error during batch resume extraction: {e}")
+            return {}
+        print(f"Error parsing a batch of {len(batch)} resumes, splitting it: {e}")
+        middle = len(batch) // 2
+        return {**_parse_batch_or_split(batch[:middle]), **_parse_batch_or_split(batch[middle:])}
+
+
+def _at_batch_priority(func):
+    # Pool threads do not inherit the caller's context, so the priority is set in each call
+    def run(*args):
+        with llm_priority(BATCH):
+            return func(*args)
+    return run
+
+
+def extract_resume_details_batch(resume_contents: list[str]) -> list[ResumeData | None]:
+    """
+    Parses many resumes with as few LLM calls as possible, for bulk imports. Short resumes
+    are packed several to a structured-output request (a list of ResumeData tagged with
+    per-item ids); resumes over RESUME_BATCH_ITEM_TOKENS and items a batch failed to
+    return are parsed one at a time with extract_resume_details. Like the single path,
+    resumes the local rules read with confidence only send their experience, education
+    and projects sections. The calls run at BATCH priority so uploads are served first.
+
+    Args:
+        resume_contents: Text content of each resume
+
+    Returns:
+        A list aligned with resume_contents holding a ResumeData, or None where parsing failed
+    """
+    inputs = [_batch_input(content) for content in resume_contents]
+    results = [None] * len(resume_contents)
+    singles, packable = [], []
+    for index, (text, _) in enumerate(inputs):
+        tokens = estimate_tokens(text)
+        if tokens > settings.RESUME_BATCH_ITEM_TOKENS:
+            singles.append(index)
+        else:
+            packable.append((index, text, tokens))
+
+    batches = _pack_batches(packable)
+    with ThreadPoolExecutor(max_workers=settings.RESUME_BATCH_CONCURRENCY) as pool:
+        for parsed in pool.map(_at_batch_priority(_parse_batch_or_split), batches):
+            for index, data in parsed.items():
+                local = inputs[index][1]
+                if local:
+                    results[index] = _merge(local, data)
+                elif data.personal_info:
+                    results[index] = data
+
+        retry = singles + [index for index, _, _ in packable if results[index] is None]
+        if retry:
+            print(f"Parsed {len(resume_contents) - len(retry)} resumes in {len(batches)} batch calls; parsing {len(retry)} one by one")
+        for index, data in zip(retry, pool.map(_at_batch_priority(extract_resume_details), [resume_contents[i] for i in retry])):
+            results[index] = data
+    return results
+
+
+def resume_prompt(resume_content: str) -> str:
+    resume_content = compact_inputs(RESUME_MODEL, 'resume parse', resume=resume_content)['resume']
+    return f"""
     Extract the following information from the resume content provided below and format it as a JSON object according to the schema provided.
 
     Resume Content:
@@ -118,20 +371,76 @@ def extract_resume_details(resume_content: str) -> ResumeData | None:
     Ensure that the JSON object is valid and all extracted information is placed in the correct fields. If a piece of information is not found, set the corresponding field to null. For lists, if no items are found, return an empty list.
     """
 
-    try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt,
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": ResumeData,
-            },
-        )
-        print(response.text)
-        # print(resume_content)
-        return response.parsed
-    except Exception as e:
-        print(f"Error during resume extraction: {e}")
-        print(f"Raw response: {response.text if 'response' in locals() else 'No response'}")
-        return None
 
+def sections_prompt(sections_text: str) -> str:
+    sections_text = compact_inputs(RESUME_MODEL, 'resume sections', sections=sections_text)['sections']
+    return f"""
+    Extract the work experience, education and projects from the resume sections provided below and format them as a JSON object according to the schema provided.
+
+    Resume Sections:
+    ```
+    {sections_text}
+    ```
+
+    JSON Schema:
+    ```json
+    {{
+      "professional_experience": [
+        {{
+          "company": "string | null",
+          "location": "string | null",
+          "role": "string | null",
+          "start_date": "string | null",
+          "end_date": "string | null",
+          "responsibilities": "list[string] | null"
+        }}
+      ],
+      "education": [
+        {{
+          "institution": "string | null",
+          "location": "string | null",
+          "degree": "string | null",
+          "start_date": "string | null",
+          "end_date": "string | null"
+        }}
+      ],
+      "projects": [
+        {{
+          "project_name": "string | null",
+          "description": "string | null"
+        }}
+      ]
+    }}
+    ```
+    Ensure Projects are extracted as a list of projects and full details are extracted for each project.
+    If a piece of information is not found, set the corresponding field to null. For lists, if no items are found, return an empty list.
+    """
+
+
+def batch_prompt(batch: list[tuple[int, str]]) -> str:
+    compacted = compact_inputs(RESUME_MODEL, 'resume batch', **{f"resume_{index}": text for index, text in batch})
+    resumes = '\n\n'.join(
+        f"=== RESUME resume_id={index} ===\n{compacted[f'resume_{index}']}\n=== END RESUME {index} ==="
+        for index, _ in batch
+    )
+    return f"""
+    Below are {len(batch)} separate resumes (or resume sections), each delimited by its resume_id. Extract each one
+    independently and return a JSON array with one object per resume, in the same order, setting "resume_id" to the id
+    it was given. Never mix information between resumes.
+
+    {resumes}
+
+    Each object follows this schema (fields with no information are null, empty lists are []):
+    ```json
+    {{
+      "resume_id": "string",
+      "personal_info": {{"name": "string | null", "title": "string | null", "linkedin_url": "string | null", "email": "string | null", "phone": "string | null", "location": "string | null"}},
+      "professional_experience": [{{"company": "string | null", "location": "string | null", "role": "string | null", "start_date": "string | null", "end_date": "string | null", "responsibilities": "list[string] | null"}}],
+      "education": [{{"institution": "string | null", "location": "string | null", "degree": "string | null", "start_date": "string | null", "end_date": "string | null"}}],
+      "technical_skills": {{"technical_skills": "list[string] | null", "frameworks_libraries": "list[string] | null", "tools": "list[string] | null"}},
+      "additional_information": "list[string] | null",
+      "projects": [{{"project_name": "string | null", "description": "string | null"}}]
+    }}
+    ```
+    Ensure Projects are extracted as a list of projects and full details are extracted for each project.
+    """
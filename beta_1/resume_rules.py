@@ -0,0 +1,258 @@
+import re
+
+# Canonical section -> headings that start it (compared lowercased, without punctuation)
+SECTION_HEADINGS = {
+    'summary': ('summary', 'profile', 'professional summary', 'career summary', 'objective', 'career objective', 'about me'),
+    'experience': (
+        'experience', 'work experience', 'professional experience', 'employment history', 'work history',
+        'employment', 'internships', 'internship', 'internship experience',
+    ),
+    'education': ('education', 'academic background', 'academics', 'educational qualifications', 'education and training'),
+    'skills': (
+        'skills', 'technical skills', 'key skills', 'core skills', 'core competencies', 'technologies',
+        'tech stack', 'skills and tools', 'technical expertise', 'skill set', 'skillset',
+    ),
+    'projects': ('projects', 'personal projects', 'academic projects', 'key projects', 'selected projects'),
+    'additional': (
+        'certifications', 'certificates', 'achievements', 'awards', 'honors', 'honours', 'publications',
+        'languages', 'interests', 'hobbies', 'activities', 'extracurricular activities', 'volunteering',
+        'additional information', 'accomplishments',
+    ),
+}
+HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+# Sections whose structure (roles, dates, descriptions) is left to the LLM
+LLM_SECTIONS = ('experience', 'education', 'projects')
+
+MAX_HEADING_CHARS = 40
+MAX_SKILL_CHARS = 40
+MAX_SKILL_WORDS = 5
+HEADER_LINES = 8
+# A name further than this many lines from the first contact line is a weaker guess
+MAX_NAME_CONTACT_DISTANCE = 3
+# Share of the name's confidence weight kept for such a guess
+DISTANT_NAME_CONFIDENCE = 0.4
+# Header lines that title the document rather than name the candidate
+DOCUMENT_TITLES = {'resume', 'résumé', 'cv', 'curriculum vitae', 'bio data', 'biodata', 'bio-data', 'my resume'}
+
+# Weights of the fields found locally, each scaled by how plausible the find is; their sum is the
+# extractor's confidence
+CONFIDENCE_WEIGHTS = {'name': 0.25, 'email': 0.25, 'contact': 0.1, 'skills': 0.2, 'sections': 0.2}
+
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+LINKEDIN_PATTERN = re.compile(r'(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/[^\s,|;)>\]]+', re.IGNORECASE)
+PHONE_PATTERN = re.compile(r'\+?\(?\d[\d\s().-]{7,}\d')
+LOCATION_PATTERN = re.compile(r'^[A-Z][A-Za-z .]+,\s*[A-Z][A-Za-z .]+$')
+BULLET_PATTERN = re.compile(r'^[\s•·▪◦●■\-*–>]+')
+SKILL_SEPARATORS = ',;|•·▪'
+BRACKETS = {'(': ')', '[': ']', '{': '}'}
+NAME_WORD = re.compile(r"^[A-Za-z][A-Za-z.'-]*$")
+
+
+def _clean(line: str) -> str:
+    return BULLET_PATTERN.sub('', line).strip()
+
+
+def _heading(line: str) -> tuple[str | None, str]:
+    """
+    Returns (section, remainder) when line is a section heading, e.g. "SKILLS" or
+    "Technical Skills: Python, Go"; (None, line) otherwise.
+    """
+    head, _, rest = line.partition(':')
+    key = re.sub(r'[^a-z& ]', '', head.lower()).replace('&', 'and')
+    key = ' '.join(key.split())
+    if len(head) <= MAX_HEADING_CHARS and key in HEADING_LOOKUP:
+        return HEADING_LOOKUP[key], rest.strip()
+    return None, line
+
+
+def split_sections(text: str) -> tuple[list[str], dict[str, str]]:
+    """
+    Splits resume text on its section headings.
+
+    Returns:
+        (header_lines, sections): the non-empty lines before the first heading, and the
+        text of each canonical section (repeated sections are concatenated)
+    """
+    header, sections, current = [], {}, None
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        section, rest = _heading(_clean(line))
+        # Inside a section, "Languages: Python, Go" is a labelled line rather than a new
+        # section; only a labelled skills line can still open the skills section
+        if section and rest and current is not None and (section != 'skills' or current == 'skills'):
+            section = None
+        if section:
+            current = section
+            sections.setdefault(current, [])
+            if rest:
+                sections[current].append(rest)
+        elif current is None:
+            header.append(line)
+        else:
+            sections[current].append(line)
+    return header, {section: '\n'.join(lines) for section, lines in sections.items() if lines}
+
+
+def _is_document_title(line: str) -> bool:
+    return ' '.join(re.sub(r'[^\w\s-]', '', line.lower()).split()) in DOCUMENT_TITLES
+
+
+def _looks_like_name(line: str) -> bool:
+    words = line.split()
+    return 1 < len(words) <= 5 and all(NAME_WORD.match(word) for word in words) and not _is_document_title(line)
+
+
+def _contact_index(header: list[str]) -> int | None:
+    # First header line with an email, LinkedIn URL or phone number
+    for index, line in enumerate(header[:HEADER_LINES]):
+        if EMAIL_PATTERN.search(line) or LINKEDIN_PATTERN.search(line) or PHONE_PATTERN.search(line):
+            return index
+    return None
+
+
+def _find_name(header: list[str]) -> tuple[int | None, str | None, str | None]:
+    """
+    Returns (line index, name, title) of the first header line that looks like a name,
+    skipping document titles such as "Curriculum Vitae"; the title is the line after it.
+    """
+    for index, line in enumerate(header[:HEADER_LINES]):
+        line = re.sub(r'^name\s*:\s*', '', line, flags=re.IGNORECASE)
+        if _looks_like_name(line) and not EMAIL_PATTERN.search(line):
+            following = header[index + 1] if index + 1 < len(header) else ''
+            title = None
+            if (
+                following and len(following.split()) <= 8 and not _is_document_title(following)
+                and not re.search(r'[@\d]|linkedin|http', following, re.IGNORECASE)
+            ):
+                title = following
+            return index, line, title
+    return None, None, None
+
+
+def extract_personal_info(header: list[str], text: str) -> dict:
+    """
+    Finds contact details anywhere in the text and the name, title and location in the
+    lines above the first section heading.
+    """
+    email = EMAIL_PATTERN.search(text)
+    linkedin = LINKEDIN_PATTERN.search(text)
+    phone = None
+    for match in PHONE_PATTERN.finditer(text):
+        # Ten to fifteen digits: longer than a date range, at most an international number
+        if 10 <= len(re.sub(r'\D', '', match.group())) <= 15:
+            phone = match.group().strip()
+            break
+
+    _, name, title = _find_name(header)
+    location = None
+    for line in header[:HEADER_LINES]:
+        for part in re.split(r'[|•·]', line):
+            part = re.sub(r'^location\s*:\s*', '', part.strip(), flags=re.IGNORECASE)
+            if location is None and LOCATION_PATTERN.match(part) and part != name:
+                location = part
+
+    linkedin_url = linkedin.group().rstrip('/.') if linkedin else None
+    if linkedin_url and not linkedin_url.lower().startswith('http'):
+        linkedin_url = 'https://' + linkedin_url
+    return {
+        'name': name,
+        'title': title,
+        'linkedin_url': linkedin_url,
+        'email': email.group() if email else None,
+        'phone': phone,
+        'location': location,
+    }
+
+
+def _split_skills(items: str) -> list[str]:
+    # Splits on separators outside brackets: "Python (Django, Flask)" is one item
+    parts, current, closers = [], [], []
+    for char in items:
+        if char in BRACKETS:
+            closers.append(BRACKETS[char])
+        elif closers and char == closers[-1]:
+            closers.pop()
+        elif char in SKILL_SEPARATORS and not closers:
+            parts.append(''.join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def extract_skills(skills_text: str) -> dict:
+    """
+    Splits a skills section into the TechnicalSkills fields. Lines labelled
+    "Frameworks: ..." or "Tools: ..." go to their field, everything else is a technical skill.
+    """
+    skills = {'technical_skills': [], 'frameworks_libraries': [], 'tools': []}
+    seen = set()
+    for line in skills_text.splitlines():
+        line = _clean(line)
+        label, sep, items = line.partition(':')
+        if not sep or len(label) > MAX_HEADING_CHARS:
+            label, items = '', line
+        label = label.lower()
+        if 'framework' in label or 'librar' in label:
+            field = 'frameworks_libraries'
+        elif 'tool' in label or 'platform' in label:
+            field = 'tools'
+        else:
+            field = 'technical_skills'
+        for item in _split_skills(items):
+            item = item.strip(' .')
+            if not item or len(item) > MAX_SKILL_CHARS or len(item.split()) > MAX_SKILL_WORDS:
+                continue
+            if item.lower() not in seen:
+                seen.add(item.lower())
+                skills[field].append(item)
+    return {field: values or None for field, values in skills.items()}
+
+
+def parse_resume_locally(text: str) -> dict:
+    """
+    Deterministic first pass over a resume: contact details, skills and additional
+    information are read with rules, and the experience, education and projects sections
+    are located for the LLM.
+
+    Returns:
+        dict with personal_info, technical_skills and additional_information in the
+        ResumeData shape, sections (canonical section -> text) and confidence (0-1)
+    """
+    header, sections = split_sections(text or '')
+    personal_info = extract_personal_info(header, text or '')
+    technical_skills = extract_skills(sections.get('skills', ''))
+    additional = [_clean(line) for line in sections.get('additional', '').splitlines() if _clean(line)]
+
+    # A name guessed far from the contact details is less likely to be the candidate's
+    name_index, _, _ = _find_name(header)
+    contact_index = _contact_index(header)
+    name_found = 0.0
+    if personal_info['name']:
+        name_found = 1.0
+        if contact_index is not None and abs(contact_index - name_index) > MAX_NAME_CONTACT_DISTANCE:
+            name_found = DISTANT_NAME_CONFIDENCE
+    found = {
+        'name': name_found,
+        'email': bool(personal_info['email']),
+        'contact': bool(personal_info['phone'] or personal_info['linkedin_url']),
+        'skills': any(technical_skills.values()),
+        'sections': any(section in sections for section in LLM_SECTIONS),
+    }
+    return {
+        'personal_info': personal_info,
+        'technical_skills': technical_skills,
+        'additional_information': additional or None,
+        'sections': sections,
+        'confidence': round(sum(CONFIDENCE_WEIGHTS[key] * float(share) for key, share in found.items()), 2),
+    }
+
+
+def llm_sections_text(sections: dict[str, str]) -> str:
+    """
+    The part of the resume the LLM still has to structure: experience, education and projects.
+    """
+    return '\n\n'.join(f"{section.upper()}\n{sections[section]}" for section in LLM_SECTIONS if section in sections)
@@ -0,0 +1,186 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredResume
+from .single_flight import asingle_flight, single_flight
+
+# Shards of two hex characters per level keep directories small as the store grows
+SHARD_WIDTH = 2
+SHARD_DEPTH = 2
+
+
+def shard_path(content_hash: str, extension: str = '') -> str:
+    """
+    Returns <RESUME_STORE_ROOT>/<ab>/<cd>/<hash><ext> for a SHA-256 hex digest.
+    """
+    shards = [content_hash[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+    return os.path.join(settings.RESUME_STORE_ROOT, *shards, content_hash + extension)
+
+
+def store_resume_file(resume_file) -> StoredResume:
+    """
+    Saves an uploaded resume into the content-addressed store. The upload is hashed while
+    it is streamed to a temporary file; if the same bytes are already stored the temporary
+    file is dropped and the existing entry returned.
+
+    The upload holds the stored file until it calls release_upload, so a concurrent upload
+    of the same bytes that gives up cannot delete it before attach_resume has run.
+
+    Args:
+        resume_file: Django UploadedFile
+
+    Returns:
+        The StoredResume for the file's content
+    """
+    root = settings.RESUME_STORE_ROOT
+    os.makedirs(root, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=root, prefix='.upload-', delete=False) as temp:
+        for chunk in resume_file.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+            temp.write(chunk)
+    content_hash = digest.hexdigest()
+    extension = os.path.splitext(resume_file.name)[1].lower()
+
+    with transaction.atomic():
+        stored = StoredResume.objects.select_for_update().filter(content_hash=content_hash).first()
+        if stored is None:
+            try:
+                with transaction.atomic():
+                    stored = StoredResume.objects.create(
+                        content_hash=content_hash, path=shard_path(content_hash, extension), size=size,
+                        original_name=resume_file.name[:255],
+                    )
+            except IntegrityError:
+                # Stored concurrently by another upload of the same file
+                stored = StoredResume.objects.select_for_update().get(content_hash=content_hash)
+        StoredResume.objects.filter(content_hash=content_hash).update(pending_uploads=F('pending_uploads') + 1)
+        # Under the row lock, discard_if_unreferenced cannot remove the file after this check
+        if os.path.exists(stored.path):
+            os.remove(temp.name)
+        else:
+            os.makedirs(os.path.dirname(stored.path), exist_ok=True)
+            os.replace(temp.name, stored.path)
+    return stored
+
+
+def cached_resume_data(content_hash: str):
+    """
+    Returns the ResumeData already parsed from this file, or None.
+    """
+    from .resume_parse import ResumeData
+    parsed = StoredResume.objects.filter(content_hash=content_hash).values_list('parsed_data', flat=True).first()
+    if not parsed:
+        return None
+    try:
+        return ResumeData.model_validate(parsed)
+    except Exception as e:
+        print(f"Error loading cached resume data for {content_hash[:12]}: {e}")
+        return None
+
+
+def save_resume_data(content_hash: str, extracted_data):
+    StoredResume.objects.filter(content_hash=content_hash).update(parsed_data=extracted_data.model_dump())
+
+
+def parse_stored_resume(stored: StoredResume, resume_text: str):
+    """
+    Parses a stored resume with the LLM once per file content: concurrent uploads of the
+    same file share one call, and later uploads read the cached ResumeData.
+
+    Returns:
+        ResumeData, or None if parsing failed
+    """
+    from .resume_parse import extract_resume_details
+
+    def compute():
+        extracted_data = extract_resume_details(resume_text)
+        if extracted_data:
+            save_resume_data(stored.content_hash, extracted_data)
+        return extracted_data
+
+    return single_flight(
+        f"resume-parse:{stored.content_hash}",
+        lambda: cached_resume_data(stored.content_hash),
+        compute,
+    )
+
+
+async def aparse_stored_resume(stored: StoredResume, resume_text: str):
+    """
+    Async counterpart of parse_stored_resume.
+    """
+    from asgiref.sync import sync_to_async
+    from .resume_parse import aextract_resume_details
+
+    async def compute():
+        extracted_data = await aextract_resume_details(resume_text)
+        if extracted_data:
+            await sync_to_async(save_resume_data)(stored.content_hash, extracted_data)
+        return extracted_data
+
+    return await asingle_flight(
+        f"resume-parse:{stored.content_hash}",
+        lambda: cached_resume_data(stored.content_hash),
+        compute,
+    )
+
+
+def attach_resume(candidate, stored: StoredResume):
+    """
+    Points candidate at a stored resume and moves the reference count from its previous
+    resume, which is deleted once no candidate uses it. Saves the candidate.
+    """
+    previous = candidate.resume_hash
+    candidate.resume_hash = stored.content_hash
+    candidate.resume_file_path = stored.path
+    with transaction.atomic():
+        candidate.save()
+        if previous != stored.content_hash:
+            StoredResume.objects.filter(content_hash=stored.content_hash).update(ref_count=F('ref_count') + 1)
+    if previous and previous != stored.content_hash:
+        release_resume(previous)
+
+
+def release_resume(content_hash: str):
+    """
+    Drops one candidate reference to a stored resume.
+    """
+    StoredResume.objects.filter(content_hash=content_hash, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+    discard_if_unreferenced(content_hash)
+
+
+def release_upload(content_hash: str):
+    """
+    Ends the hold an upload took with store_resume_file, once it has attached the file to
+    its candidate or given up on it. Every store_resume_file call is paired with one call.
+    """
+    StoredResume.objects.filter(content_hash=content_hash, pending_uploads__gt=0).update(pending_uploads=F('pending_uploads') - 1)
+    discard_if_unreferenced(content_hash)
+
+
+def discard_if_unreferenced(content_hash: str):
+    """
+    Deletes a stored resume and its file when no candidate refers to it and no upload of
+    it is in flight, e.g. after an upload that could not be parsed.
+    """
+    with transaction.atomic():
+        stored = (
+            StoredResume.objects.select_for_update()
+            .filter(content_hash=content_hash, ref_count__lte=0, pending_uploads__lte=0).first()
+        )
+        if stored is None:
+            return
+        stored.delete()
+        # Removed under the row lock so that a concurrent store_resume_file restores the file
+        try:
+            os.remove(stored.path)
+        except FileNotFoundError:
+            pass
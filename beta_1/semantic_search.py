@@ -0,0 +1,450 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .change_log import latest_change_id, pending_changes
+from .models import Candidate
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to in-process locking only
+    fcntl = None
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+# --- Embedding providers ---
+# A provider exposes `name`, `dim` and `embed(texts) -> float32 array (len(texts), dim)`
+# with L2-normalized rows. Select one with settings.EMBEDDING_PROVIDER.
+
+class HashingEmbeddingProvider:
+    """
+    Dependency-free CPU embeddings: signed feature hashing of word unigrams and bigrams.
+    Deterministic across processes, so vectors written by one worker are valid in all.
+    """
+    name = 'hashing'
+
+    def __init__(self, dim: int | None = None):
+        self.dim = dim or settings.EMBEDDING_DIM
+
+    def _features(self, text: str):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        yield from tokens
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"{first} {second}"
+
+    def embed(self, texts) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text or ''):
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], 'little') % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                counts[(bucket, sign)] = counts.get((bucket, sign), 0) + 1
+            for (bucket, sign), count in counts.items():
+                vectors[row, bucket] += sign * (1.0 + np.log(count))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerProvider:
+    """
+    Local CPU transformer model (requires the optional sentence-transformers package).
+    """
+    name = 'sentence-transformers'
+
+    def __init__(self, dim: int | None = None):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME, device='cpu')
+        self.name = f"sentence-transformers:{settings.EMBEDDING_MODEL_NAME}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts) -> np.ndarray:
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+class GeminiEmbeddingProvider:
+    """
+    Remote embeddings through the Gemini API, for deployments without local model capacity.
+    """
+    name = 'gemini'
+
+    def __init__(self, dim: int | None = None):
+        self.model = settings.EMBEDDING_MODEL_NAME
+        self.name = f"gemini:{self.model}"
+        self.dim = dim or settings.EMBEDDING_DIM
+
+    def embed(self, texts) -> np.ndarray:
+        from .gemini import embed_content
+
+        result = embed_content(
+            model=self.model,
+            contents=list(texts),
+            config={"output_dimensionality": self.dim},
+        )
+        vectors = np.array([embedding.values for embedding in result.embeddings], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = import_string(settings.EMBEDDING_PROVIDER)()
+    return _provider
+
+
+def candidate_profile_text(candidate: Candidate) -> str:
+    """
+    Flattens the parts of a candidate profile that carry meaning for retrieval:
+    skills, experience roles and descriptions, and projects.
+    """
+    parts = [' '.join(cs.skill.skill_name for cs in candidate.candidateskill_set.all())]
+    for exp in candidate.experiences.all():
+        parts.append(f"{exp.role or ''} {exp.company or ''} {exp.description or ''}")
+    for project in candidate.projects.all():
+        parts.append(f"{project.name or ''} {project.description or ''}")
+    return '\n'.join(part for part in parts if part.strip())
+
+
+# --- Vector index ---
+
+class CandidateVectorIndex:
+    """
+    Memory-mapped float32 matrix of candidate vectors for one company, with a
+    random-hyperplane LSH index for approximate nearest-neighbour search.
+
+    Files in `directory`:
+        vectors.f32  (capacity, dim) float32, L2-normalized rows
+        ids.i64      (capacity,) candidate id per row, -1 for a free row
+        sigs.u16     (capacity, n_tables) LSH bucket of each row per table
+        meta.json    dim, capacity, count, provider, LSH shape, change-log cursor
+    Rows are updated in place, so other workers that mapped the files see writes
+    immediately. Growing or resetting the matrix writes new files and swaps them in, never
+    truncating a file another worker has mapped; it bumps `generation` and readers remap.
+    """
+
+    def __init__(self, directory: str, dim: int, provider_name: str, n_tables: int = 8, n_bits: int = 12):
+        self.directory = directory
+        self.dim = dim
+        self.provider_name = provider_name
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self._lock = threading.RLock()
+        self._meta = None
+        self._meta_mtime = None
+        self._row_of = {}
+        planes = np.random.default_rng(1729).standard_normal((n_tables * n_bits, dim)).astype(np.float32)
+        self._planes = planes
+        self._bit_weights = (1 << np.arange(n_bits)).astype(np.uint32)
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path('meta.json'))
+
+    # -- file management --
+
+    def _write_meta(self):
+        tmp_path = self._path('meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self._meta, f)
+        os.replace(tmp_path, self._path('meta.json'))
+        self._meta_mtime = os.stat(self._path('meta.json')).st_mtime_ns
+
+    def _open_arrays(self):
+        capacity = self._meta['capacity']
+        self.vectors = np.memmap(self._path('vectors.f32'), dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self.ids = np.memmap(self._path('ids.i64'), dtype=np.int64, mode='r+', shape=(capacity,))
+        self.sigs = np.memmap(self._path('sigs.u16'), dtype=np.uint16, mode='r+', shape=(capacity, self.n_tables))
+        count = self._meta['count']
+        self._row_of = {int(candidate_id): row for row, candidate_id in enumerate(self.ids[:count]) if candidate_id >= 0}
+
+    def _stored_generation(self) -> int:
+        try:
+            with open(self._path('meta.json')) as f:
+                return json.load(f).get('generation', 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _create(self, capacity: int = 1024):
+        # The generation must move past the one on disk, which may have been written with
+        # another provider or LSH shape this process never loaded
+        generation = max((self._meta or {}).get('generation', 0), self._stored_generation()) + 1
+        for name, dtype, shape in (
+            ('vectors.f32', np.float32, (capacity, self.dim)),
+            ('ids.i64', np.int64, (capacity,)),
+            ('sigs.u16', np.uint16, (capacity, self.n_tables)),
+        ):
+            tmp_path = self._path(name + '.tmp')
+            array = np.memmap(tmp_path, dtype=dtype, mode='w+', shape=shape)
+            if name == 'ids.i64':
+                array[:] = -1
+            array.flush()
+            del array
+            os.replace(tmp_path, self._path(name))
+        self._meta = {
+            'dim': self.dim,
+            'capacity': capacity,
+            'count': 0,
+            'provider': self.provider_name,
+            'n_tables': self.n_tables,
+            'n_bits': self.n_bits,
+            'generation': generation,
+            'last_change_id': 0,
+        }
+        self._write_meta()
+        self._open_arrays()
+
+    def _grow(self):
+        old_capacity = self._meta['capacity']
+        new_capacity = old_capacity * 2
+        for name, dtype, row_shape in (
+            ('vectors.f32', np.float32, (self.dim,)),
+            ('ids.i64', np.int64, ()),
+            ('sigs.u16', np.uint16, (self.n_tables,)),
+        ):
+            old = getattr(self, {'vectors.f32': 'vectors', 'ids.i64': 'ids', 'sigs.u16': 'sigs'}[name])
+            tmp_path = self._path(name + '.tmp')
+            grown = np.memmap(tmp_path, dtype=dtype, mode='w+', shape=(new_capacity,) + row_shape)
+            grown[:old_capacity] = old
+            if name == 'ids.i64':
+                grown[old_capacity:] = -1
+            grown.flush()
+            del grown
+            os.replace(tmp_path, self._path(name))
+        self._meta['capacity'] = new_capacity
+        self._meta['generation'] += 1
+        self._write_meta()
+        self._open_arrays()
+
+    def load(self) -> bool:
+        """
+        Maps the index files, (re)opening them if another process changed their layout.
+        Returns False if there is no usable index for the current provider.
+        """
+        with self._lock:
+            meta_path = self._path('meta.json')
+            if not os.path.exists(meta_path):
+                return False
+            mtime = os.stat(meta_path).st_mtime_ns
+            if self._meta is not None and mtime == self._meta_mtime:
+                return True
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get('dim') != self.dim or meta.get('provider') != self.provider_name or meta.get('n_tables') != self.n_tables or meta.get('n_bits') != self.n_bits:
+                return False
+            previous_generation = (self._meta or {}).get('generation')
+            self._meta = meta
+            self._meta_mtime = mtime
+            if previous_generation != meta['generation'] or not hasattr(self, 'vectors'):
+                self._open_arrays()
+            else:
+                count = meta['count']
+                self._row_of = {int(candidate_id): row for row, candidate_id in enumerate(self.ids[:count]) if candidate_id >= 0}
+            return True
+
+    def _file_lock(self):
+        return _FileLock(self._path('index.lock'))
+
+    # -- writes --
+
+    def _signatures(self, vectors: np.ndarray) -> np.ndarray:
+        bits = (vectors @ self._planes.T) > 0
+        bits = bits.reshape(len(vectors), self.n_tables, self.n_bits)
+        return (bits.astype(np.uint32) * self._bit_weights).sum(axis=2).astype(np.uint16)
+
+    def reset(self):
+        with self._lock, self._file_lock():
+            self._create()
+
+    def apply(self, upsert_ids, upsert_vectors: np.ndarray, remove_ids, last_change_id: int | None = None):
+        """
+        Writes new or changed candidate vectors and frees rows of removed candidates.
+        """
+        with self._lock, self._file_lock():
+            if not self.load():
+                self._create()
+            for candidate_id in remove_ids:
+                row = self._row_of.pop(int(candidate_id), None)
+                if row is not None:
+                    self.ids[row] = -1
+            if len(upsert_ids):
+                signatures = self._signatures(upsert_vectors)
+                free_rows = list(np.nonzero(self.ids[:self._meta['count']] < 0)[0])
+                for candidate_id, vector, signature in zip(upsert_ids, upsert_vectors, signatures):
+                    candidate_id = int(candidate_id)
+                    row = self._row_of.get(candidate_id)
+                    if row is None:
+                        if free_rows:
+                            row = free_rows.pop()
+                        else:
+                            if self._meta['count'] >= self._meta['capacity']:
+                                self._grow()
+                            row = self._meta['count']
+                            self._meta['count'] += 1
+                        self._row_of[candidate_id] = row
+                    self.vectors[row] = vector
+                    self.sigs[row] = signature
+                    self.ids[row] = candidate_id
+            self.vectors.flush()
+            self.ids.flush()
+            self.sigs.flush()
+            if last_change_id is not None:
+                self._meta['last_change_id'] = max(last_change_id, self._meta.get('last_change_id', 0))
+            self._write_meta()
+
+    @property
+    def last_change_id(self) -> int:
+        return (self._meta or {}).get('last_change_id', 0)
+
+    # -- reads --
+
+    def search(self, query_vector: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """
+        Returns up to k (candidate_id, cosine similarity) pairs, best first.
+
+        Rows sharing an LSH bucket with the query in any table are scored exactly;
+        small indexes, or probes that find too few rows, are scanned in full.
+        """
+        with self._lock:
+            if not self.load():
+                return []
+            count = self._meta['count']
+            if count == 0:
+                return []
+            ids = self.ids[:count]
+            if count > settings.SEMANTIC_BRUTE_FORCE_LIMIT:
+                query_signature = self._signatures(query_vector[None, :])[0]
+                rows = np.nonzero((self.sigs[:count] == query_signature).any(axis=1) & (ids >= 0))[0]
+                if len(rows) < k * 4:
+                    rows = np.nonzero(ids >= 0)[0]
+            else:
+                rows = np.nonzero(ids >= 0)[0]
+            if len(rows) == 0:
+                return []
+            scores = self.vectors[rows] @ query_vector
+            top = min(k, len(rows))
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+            return [(int(ids[rows[i]]), float(scores[i])) for i in best]
+
+
+class _FileLock:
+    # Serializes index writes across worker processes where flock is available
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.handle = open(self.path, 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_company_index(company_id) -> CandidateVectorIndex:
+    with _indexes_lock:
+        index = _indexes.get(company_id)
+        if index is None:
+            provider = get_embedding_provider()
+            index = CandidateVectorIndex(
+                os.path.join(settings.EMBEDDING_INDEX_DIR, str(company_id)),
+                dim=provider.dim,
+                provider_name=provider.name,
+            )
+            _indexes[company_id] = index
+    return index
+
+
+def _embed_candidates(candidate_ids):
+    candidates = list(
+        Candidate.objects.filter(id__in=candidate_ids)
+        .prefetch_related('candidateskill_set__skill', 'experiences', 'projects')
+    )
+    if not candidates:
+        return [], np.zeros((0, get_embedding_provider().dim), dtype=np.float32)
+    vectors = get_embedding_provider().embed([candidate_profile_text(c) for c in candidates])
+    return [c.id for c in candidates], vectors
+
+
+def rebuild_company_index(company_id, batch_size: int = 256) -> int:
+    """
+    Re-embeds every candidate of a company into a fresh index.
+    Returns the number of candidates indexed.
+    """
+    index = get_company_index(company_id)
+    cursor = latest_change_id(company_id)
+    index.reset()
+    candidate_ids = list(Candidate.objects.filter(company_id=company_id).values_list('id', flat=True))
+    for start in range(0, len(candidate_ids), batch_size):
+        ids, vectors = _embed_candidates(candidate_ids[start:start + batch_size])
+        index.apply(ids, vectors, [])
+    index.apply([], np.zeros((0, index.dim), dtype=np.float32), [], last_change_id=cursor)
+    return len(candidate_ids)
+
+
+def sync_company_index(company_id) -> CandidateVectorIndex:
+    """
+    Brings a company's index up to date with the candidate change log,
+    re-embedding only candidates written since the index cursor.
+    """
+    index = get_company_index(company_id)
+    if not index.load():
+        rebuild_company_index(company_id)
+        return index
+    changed, deleted, last_id = pending_changes(company_id, index.last_change_id)
+    if last_id == index.last_change_id:
+        return index
+    ids, vectors = _embed_candidates(changed)
+    missing = changed - set(ids)
+    index.apply(ids, vectors, deleted | missing, last_change_id=last_id)
+    return index
+
+
+def semantic_search(company, text: str, k: int | None = None) -> list[tuple[int, float]]:
+    """
+    Returns the top-k (candidate_id, similarity) pairs of a company for a JD or query text.
+
+    Args:
+        company: The Company (or company id) whose pool is searched
+        text: Job description or free-text query
+        k: Number of candidates, defaults to settings.SEMANTIC_RETRIEVAL_TOP_K
+    """
+    company_id = getattr(company, 'id', company)
+    k = k or settings.SEMANTIC_RETRIEVAL_TOP_K
+    try:
+        index = sync_company_index(company_id)
+        query_vector = get_embedding_provider().embed([text])[0]
+        return index.search(query_vector, k)
+    except Exception as e:
+        print(f"Error in semantic_search: {e}")
+        return []
@@ -110,8 +110,8 @@ class CandidateSerializer(serializers.ModelSerializer):
 class AISummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = AISummary
-        fields = ['id', 'candidate', 'job_description_hash', 'summary_text', 'score', 'details_json', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'candidate', 'job_description_hash', 'summary_text', 'score', 'details_json', 'is_stale', 'created_at']
+        read_only_fields = ['is_stale', 'created_at']
 
 class ActivityLogSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .change_log import clear_profile_hash, record_candidate_change
+from .identity import sync_candidate_identities
+from .models import Candidate, CandidateSkill, Experience, Project, Skill, SkillAlias, SkillSynonym
+from .resume_store import release_resume
+from .skill_dictionary import bump_dictionary_version
+
+
+@receiver(post_save, sender=Candidate)
+def candidate_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Keep the normalized identity keys in step with the candidate's contact details
+    sync_candidate_identities(instance)
+    record_candidate_change(instance.id, instance.company_id)
+    clear_profile_hash(instance.id)
+
+
+@receiver(post_delete, sender=Candidate)
+def candidate_deleted(sender, instance, **kwargs):
+    record_candidate_change(instance.id, instance.company_id, deleted=True)
+    if instance.resume_hash:
+        release_resume(instance.resume_hash)
+
+
+@receiver([post_save, post_delete], sender=Experience)
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=CandidateSkill)
+def candidate_profile_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    record_candidate_change(instance.candidate_id)
+    clear_profile_hash(instance.candidate_id)
+
+
+@receiver([post_save, post_delete], sender=Skill)
+@receiver([post_save, post_delete], sender=SkillAlias)
+@receiver([post_save, post_delete], sender=SkillSynonym)
+def skill_dictionary_changed(sender, **kwargs):
+    bump_dictionary_version()
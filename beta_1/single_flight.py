@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future, InvalidStateError
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import ComputationLease
+
+# How often a worker waiting on another process's lease re-checks for the result
+POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 2.0
+
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+class SingleFlightTimeout(Exception):
+    pass
+
+
+def _join_or_lead(key: str) -> tuple[Future, bool]:
+    """
+    Returns (future, is_leader). Only the leader computes; everyone else in this process
+    waits on the leader's future.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        _inflight[key] = future
+        return future, True
+
+
+def _finish(key: str, future: Future, result=None, error: BaseException | None = None):
+    with _inflight_lock:
+        _inflight.pop(key, None)
+    # A waiter may have cancelled the shared future; the result is simply not delivered to it
+    if future.done():
+        return
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def acquire_lease(key: str, owner: str, ttl: float) -> bool:
+    """
+    Takes the cross-process lease on key, replacing it if its holder let it expire.
+    """
+    now = timezone.now()
+    ComputationLease.objects.filter(key=key, expires_at__lt=now).delete()
+    try:
+        with transaction.atomic():
+            ComputationLease.objects.create(key=key, owner=owner, expires_at=now + timedelta(seconds=ttl))
+        return True
+    except IntegrityError:
+        return False
+
+
+def release_lease(key: str, owner: str):
+    ComputationLease.objects.filter(key=key, owner=owner).delete()
+
+
+def _lead(key: str, lookup, compute, ttl: float, wait: float):
+    """
+    Produces the result as this process's leader: serve it from lookup if another process
+    stored it, otherwise take the lease and compute it, or wait for the lease holder.
+    """
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    interval = POLL_INTERVAL
+    while True:
+        result = lookup()
+        if result is not None:
+            return result
+        if acquire_lease(key, owner, ttl):
+            try:
+                # The previous holder may have stored the result just before releasing
+                result = lookup()
+                return result if result is not None else compute()
+            finally:
+                release_lease(key, owner)
+        if time.monotonic() >= deadline:
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight computation {key}")
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+
+def single_flight(key: str, lookup, compute, ttl: float = None, wait: float = None):
+    """
+    Runs compute() at most once at a time for key across threads and processes.
+
+    Concurrent callers in this process wait on the first caller's result; other processes
+    wait on the ComputationLease row and then read the result back through lookup().
+
+    Args:
+        key: Identity of the computation
+        lookup: Returns the stored result, or None if it has not been computed yet
+        compute: Computes and stores the result
+        ttl: Seconds before an unreleased lease is taken over (default settings.SINGLE_FLIGHT_LEASE_TTL)
+        wait: Longest a caller waits for another worker's result (default settings.SINGLE_FLIGHT_WAIT)
+
+    Returns:
+        The result of lookup() or compute()
+    """
+    ttl = settings.SINGLE_FLIGHT_LEASE_TTL if ttl is None else ttl
+    wait = settings.SINGLE_FLIGHT_WAIT if wait is None else wait
+    future, is_leader = _join_or_lead(key)
+    if not is_leader:
+        return future.result(timeout=wait)
+    try:
+        result = _lead(key, lookup, compute, ttl, wait)
+    except BaseException as e:
+        _finish(key, future, error=e)
+        raise
+    _finish(key, future, result)
+    return result
+
+
+async def asingle_flight(key: str, lookup, compute, ttl: float = None, wait: float = None):
+    """
+    Async counterpart of single_flight. lookup is a sync callable (run in a thread) and
+    compute a coroutine function. Waiters in this process await the leader's future without
+    holding a thread, and share it with sync callers of single_flight for the same key.
+    """
+    ttl = settings.SINGLE_FLIGHT_LEASE_TTL if ttl is None else ttl
+    wait = settings.SINGLE_FLIGHT_WAIT if wait is None else wait
+    future, is_leader = _join_or_lead(key)
+    if not is_leader:
+        # Shielded: a waiter that times out or is cancelled must not cancel the future the
+        # leader and the other waiters share
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=wait)
+
+    owner = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    interval = POLL_INTERVAL
+    try:
+        while True:
+            result = await sync_to_async(lookup)()
+            if result is not None:
+                break
+            if await sync_to_async(acquire_lease)(key, owner, ttl):
+                try:
+                    result = await sync_to_async(lookup)()
+                    if result is None:
+                        result = await compute()
+                finally:
+                    await sync_to_async(release_lease)(key, owner)
+                break
+            if time.monotonic() >= deadline:
+                raise SingleFlightTimeout(f"Timed out waiting for in-flight computation {key}")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+    except BaseException as e:
+        _finish(key, future, error=e)
+        raise
+    _finish(key, future, result)
+    return result
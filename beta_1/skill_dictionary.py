@@ -0,0 +1,209 @@
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .change_log import clear_profile_hash, record_candidate_change
+from .models import CandidateSkill, Skill, SkillAlias, SkillDictionaryVersion
+
+# Common alternative spellings seeded by `manage.py canonicalize_skills --seed-aliases`.
+# Keys and values are normalized names; the value must already exist as a skill.
+DEFAULT_ALIASES = {
+    'python3': 'python',
+    'python 3': 'python',
+    'js': 'javascript',
+    'es6': 'javascript',
+    'ts': 'typescript',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue',
+    'vue.js': 'vue',
+    'angularjs': 'angular',
+    'nodejs': 'node.js',
+    'node': 'node.js',
+    'golang': 'go',
+    'k8s': 'kubernetes',
+    'postgres': 'postgresql',
+    'mongo': 'mongodb',
+    'amazon web services': 'aws',
+    'gcp': 'google cloud',
+    'ml': 'machine learning',
+    'scikit learn': 'scikit-learn',
+    'sklearn': 'scikit-learn',
+    'c sharp': 'c#',
+    'cpp': 'c++',
+}
+
+_lock = threading.Lock()
+_alias_map = None
+_alias_map_version = None
+# Names looked up in the database and not found; cleared when the dictionary version moves
+_unknown_names = set()
+# Last dictionary version read from the database, and when
+_version = None
+_version_checked_at = 0.0
+
+
+def normalize_skill_name(name: str | None) -> str:
+    """
+    Casefolds a skill name and collapses whitespace: " Machine  Learning" -> "machine learning".
+    """
+    if not name:
+        return ''
+    return re.sub(r'\s+', ' ', name).strip().casefold()
+
+
+def bump_dictionary_version():
+    """
+    Records a change to the skill dictionary (skills, aliases, synonyms) so every process
+    rebuilds its alias map and matcher. Called from the Skill / SkillAlias / SkillSynonym
+    signals; code that writes those tables with bulk operations must call it itself.
+    """
+    if SkillDictionaryVersion.objects.filter(id=1).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            SkillDictionaryVersion.objects.create(id=1, version=1)
+    except IntegrityError:
+        SkillDictionaryVersion.objects.filter(id=1).update(version=F('version') + 1)
+
+
+def dictionary_version() -> int:
+    """
+    Returns the skill dictionary version, read from the database at most once every
+    settings.SKILL_DICTIONARY_CHECK_INTERVAL seconds. Caches built from the dictionary keep
+    the version they were built at and are rebuilt once it moves, whichever process changed it.
+    """
+    global _version, _version_checked_at
+    now = time.monotonic()
+    if _version is None or now - _version_checked_at >= settings.SKILL_DICTIONARY_CHECK_INTERVAL:
+        _version = SkillDictionaryVersion.objects.filter(id=1).values_list('version', flat=True).first() or 0
+        _version_checked_at = now
+    return _version
+
+
+def _load_alias_map() -> dict[str, int]:
+    alias_map = {}
+    # Skills without alias rows still resolve by their own normalized name; lowest id wins
+    for skill_id, skill_name in Skill.objects.order_by('-id').values_list('id', 'skill_name'):
+        alias_map[normalize_skill_name(skill_name)] = skill_id
+    alias_map.update(dict(SkillAlias.objects.values_list('alias', 'skill_id')))
+    return alias_map
+
+
+def get_alias_map() -> dict[str, int]:
+    """
+    Returns the in-process alias -> canonical skill id map, reloading it when the
+    dictionary version has moved.
+    """
+    global _alias_map, _alias_map_version
+    version = dictionary_version()
+    alias_map = _alias_map
+    if alias_map is None or _alias_map_version != version:
+        with _lock:
+            if _alias_map is None or _alias_map_version != version:
+                _alias_map = _load_alias_map()
+                _alias_map_version = version
+                _unknown_names.clear()
+            alias_map = _alias_map
+    return alias_map
+
+
+def canonical_skill_id(name: str | None) -> int | None:
+    """
+    Resolves any spelling of a skill to its canonical Skill id.
+
+    A miss falls back to the database once per dictionary version, so aliases and skills
+    added since the alias map was loaded are still found.
+    """
+    normalized = normalize_skill_name(name)
+    if not normalized:
+        return None
+    alias_map = get_alias_map()
+    skill_id = alias_map.get(normalized)
+    if skill_id is None and normalized not in _unknown_names:
+        skill_id = SkillAlias.objects.filter(alias=normalized).values_list('skill_id', flat=True).first()
+        if skill_id is None:
+            skill_id = Skill.objects.filter(skill_name__iexact=normalized).order_by('id').values_list('id', flat=True).first()
+        if skill_id is not None:
+            alias_map[normalized] = skill_id
+        else:
+            _unknown_names.add(normalized)
+    return skill_id
+
+
+def canonical_skill_ids(names) -> set[int]:
+    """
+    Resolves a list of skill names to the set of canonical ids, ignoring unknown names.
+    """
+    skill_ids = set()
+    for name in names or []:
+        skill_id = canonical_skill_id(name)
+        if skill_id is not None:
+            skill_ids.add(skill_id)
+    return skill_ids
+
+
+def add_alias(alias: str, skill: Skill) -> SkillAlias | None:
+    """
+    Points a spelling at a canonical skill, replacing any previous target.
+    """
+    normalized = normalize_skill_name(alias)
+    if not normalized:
+        return None
+    skill_alias, _ = SkillAlias.objects.update_or_create(alias=normalized, defaults={'skill': skill})
+    return skill_alias
+
+
+def get_or_create_canonical_skill(name: str | None) -> Skill | None:
+    """
+    Returns the canonical Skill for a name, creating it (and its alias row) if it is new.
+    """
+    normalized = normalize_skill_name(name)
+    if not normalized:
+        return None
+    skill_id = canonical_skill_id(normalized)
+    if skill_id is not None:
+        skill = Skill.objects.filter(id=skill_id).first()
+        if skill:
+            return skill
+
+    display_name = re.sub(r'\s+', ' ', name).strip()[:100]
+    try:
+        with transaction.atomic():
+            skill, _ = Skill.objects.get_or_create(skill_name=display_name)
+    except IntegrityError:
+        # Another request created it concurrently
+        skill = Skill.objects.get(skill_name=display_name)
+    SkillAlias.objects.get_or_create(alias=normalized[:100], defaults={'skill': skill})
+    # Resolvable here at once; the matcher picks the new skill up with the next version check
+    get_alias_map()[normalized] = skill.id
+    _unknown_names.discard(normalized)
+    return skill
+
+
+def attach_candidate_skills(candidate, names) -> list[Skill]:
+    """
+    Links a candidate to the canonical skills for the given names, skipping duplicates
+    such as "Python" and "python " that resolve to the same skill.
+
+    Returns:
+        The distinct canonical Skill objects that were attached
+    """
+    skills = {}
+    for name in names or []:
+        skill = get_or_create_canonical_skill(name)
+        if skill and skill.id not in skills:
+            skills[skill.id] = skill
+    CandidateSkill.objects.bulk_create(
+        [CandidateSkill(candidate=candidate, skill=skill) for skill in skills.values()],
+        ignore_conflicts=True,
+    )
+    if skills:
+        # bulk_create sends no post_save signals, so report the profile change here
+        record_candidate_change(candidate.id, candidate.company_id)
+        clear_profile_hash(candidate.id)
+    return list(skills.values())
@@ -0,0 +1,176 @@
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .models import SkillSynonym
+from .skill_dictionary import dictionary_version, get_alias_map, normalize_skill_name
+
+# Related-but-different skills seeded by `manage.py seed_skill_synonyms`.
+# Names are normalized; edges are stored in both directions.
+DEFAULT_SYNONYMS = [
+    ('javascript', 'typescript', 0.8),
+    ('mysql', 'postgresql', 0.7),
+    ('flask', 'fastapi', 0.7),
+    ('django', 'flask', 0.6),
+    ('pytorch', 'tensorflow', 0.6),
+    ('react', 'vue', 0.5),
+    ('react', 'angular', 0.5),
+    ('docker', 'kubernetes', 0.5),
+    ('aws', 'google cloud', 0.5),
+    ('aws', 'azure', 0.5),
+]
+
+NGRAM_SIZE = 3
+# How many distinct JD skill names keep their match weights cached per matcher
+WEIGHT_CACHE_SIZE = 2048
+
+
+def _compact(name: str) -> str:
+    # Drop punctuation that only varies by spelling ("react.js" -> "reactjs") but keep + and #
+    return re.sub(r'[^\w+#]+', '', name)
+
+
+def _ngrams(name: str) -> set[str]:
+    padded = f"#{_compact(name)}#"
+    if len(padded) <= NGRAM_SIZE:
+        return {padded}
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def _tokens(name: str) -> set[str]:
+    return {token for token in re.split(r'[^\w+#]+', name) if token}
+
+
+class SkillMatcher:
+    """
+    Similarity-weighted skill matching over every known skill spelling.
+
+    Built once from the alias map and synonym graph: a character n-gram inverted index and a
+    token index give fuzzy matches by counting shared postings (no pairwise string distance),
+    and synonym edges extend those matches to related skills at a reduced weight.
+    """
+
+    def __init__(self, alias_map: dict[str, int], synonyms, min_similarity: float = 0.6, version: int = 0):
+        self.alias_map = alias_map
+        self.version = version
+        self.min_similarity = min_similarity
+        self._entries = list(alias_map.items())
+        self._gram_postings = defaultdict(list)
+        self._token_postings = defaultdict(list)
+        self._gram_counts = []
+        self._token_counts = []
+        for index, (name, _) in enumerate(self._entries):
+            grams = _ngrams(name)
+            tokens = _tokens(name)
+            self._gram_counts.append(len(grams))
+            self._token_counts.append(len(tokens))
+            for gram in grams:
+                self._gram_postings[gram].append(index)
+            for token in tokens:
+                self._token_postings[token].append(index)
+
+        self._synonyms = defaultdict(dict)
+        for skill_id, related_skill_id, weight in synonyms:
+            self._synonyms[skill_id][related_skill_id] = max(weight, self._synonyms[skill_id].get(related_skill_id, 0))
+            self._synonyms[related_skill_id][skill_id] = max(weight, self._synonyms[related_skill_id].get(skill_id, 0))
+
+        self._weights_cache = {}
+        self._cache_lock = threading.Lock()
+
+    def similar_skills(self, name: str) -> dict[int, float]:
+        """
+        Returns {skill_id: similarity} for all skills whose spelling is close to name,
+        before synonym expansion. An exact alias match scores 1.0.
+        """
+        normalized = normalize_skill_name(name)
+        if not normalized:
+            return {}
+        scores = {}
+        exact_id = self.alias_map.get(normalized)
+        if exact_id is not None:
+            scores[exact_id] = 1.0
+
+        query_grams = _ngrams(normalized)
+        gram_overlap = Counter()
+        for gram in query_grams:
+            gram_overlap.update(self._gram_postings.get(gram, ()))
+        query_tokens = _tokens(normalized)
+        token_overlap = Counter()
+        for token in query_tokens:
+            token_overlap.update(self._token_postings.get(token, ()))
+
+        for index in set(gram_overlap) | set(token_overlap):
+            # Dice coefficient on n-grams, Jaccard on whole tokens; keep the stronger signal
+            dice = 2.0 * gram_overlap[index] / (len(query_grams) + self._gram_counts[index])
+            shared_tokens = token_overlap[index]
+            jaccard = shared_tokens / (len(query_tokens) + self._token_counts[index] - shared_tokens) if shared_tokens else 0.0
+            similarity = max(dice, jaccard)
+            if similarity >= self.min_similarity:
+                skill_id = self._entries[index][1]
+                if similarity > scores.get(skill_id, 0.0):
+                    scores[skill_id] = similarity
+        return scores
+
+    def match_weights(self, name: str) -> dict[int, float]:
+        """
+        Returns {skill_id: weight} of every skill that counts towards a required skill,
+        including synonym neighbours. Results are cached per normalized name.
+        """
+        normalized = normalize_skill_name(name)
+        weights = self._weights_cache.get(normalized)
+        if weights is not None:
+            return weights
+
+        weights = dict(self.similar_skills(normalized))
+        for skill_id, similarity in list(weights.items()):
+            for related_skill_id, synonym_weight in self._synonyms.get(skill_id, {}).items():
+                weight = similarity * synonym_weight
+                if weight > weights.get(related_skill_id, 0.0):
+                    weights[related_skill_id] = weight
+
+        with self._cache_lock:
+            if len(self._weights_cache) >= WEIGHT_CACHE_SIZE:
+                self._weights_cache.clear()
+            self._weights_cache[normalized] = weights
+        return weights
+
+    def best_match(self, name: str, candidate_skill_ids) -> tuple[float, int | None]:
+        """
+        Returns (weight, skill_id) of the candidate skill that best satisfies a required skill,
+        or (0.0, None) if none does.
+        """
+        weights = self.match_weights(name)
+        best_weight, best_skill_id = 0.0, None
+        for skill_id in candidate_skill_ids:
+            weight = weights.get(skill_id, 0.0)
+            if weight > best_weight:
+                best_weight, best_skill_id = weight, skill_id
+        return best_weight, best_skill_id
+
+
+_lock = threading.Lock()
+_matcher = None
+
+
+def get_skill_matcher() -> SkillMatcher:
+    """
+    Returns the process-wide SkillMatcher, rebuilding it when the skill dictionary version
+    has moved (skill_dictionary.dictionary_version).
+    """
+    global _matcher
+    version = dictionary_version()
+    matcher = _matcher
+    if matcher is None or matcher.version != version:
+        with _lock:
+            if _matcher is None or _matcher.version != version:
+                synonyms = SkillSynonym.objects.values_list('skill_id', 'related_skill_id', 'weight')
+                _matcher = SkillMatcher(
+                    dict(get_alias_map()),
+                    list(synonyms),
+                    min_similarity=settings.SKILL_MATCH_MIN_SIMILARITY,
+                    version=version,
+                )
+            matcher = _matcher
+    return matcher
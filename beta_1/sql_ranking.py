@@ -0,0 +1,211 @@
+import datetime
+
+from django.conf import settings
+from django.db.models import (
+    Case, DurationField, Exists, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Q, Subquery, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from .candidate_pool import experience_duration, retrieval_candidate_ids
+from .models import Candidate, CandidateSkill, Experience, Project
+
+YEAR_DAYS = 365.25
+
+
+def _years(years: float) -> datetime.timedelta:
+    return datetime.timedelta(days=years * YEAR_DAYS)
+
+
+def _best_skill_weight(weights: dict[int, float]):
+    # Weight of the candidate skill that best satisfies one required skill, 0 without a match;
+    # rounded to 3 places like the weights score_candidate sums
+    if not weights:
+        return Value(0.0)
+    best = (
+        CandidateSkill.objects.filter(candidate=OuterRef('pk'), skill_id__in=list(weights))
+        .annotate(weight=Case(
+            *[When(skill_id=skill_id, then=Value(round(weight, 3))) for skill_id, weight in weights.items()],
+            default=Value(0.0), output_field=FloatField(),
+        ))
+        .order_by('-weight').values('weight')[:1]
+    )
+    return Coalesce(Subquery(best, output_field=FloatField()), Value(0.0))
+
+
+def _keyword_found(keyword: str):
+    # Same fields as the portable full-text backend: skills, roles, experience and projects
+    return Exists(Candidate.objects.filter(pk=OuterRef('pk')).filter(
+        Q(candidateskill__skill__skill_name__icontains=keyword)
+        | Q(experiences__role__icontains=keyword)
+        | Q(experiences__description__icontains=keyword)
+        | Q(projects__name__icontains=keyword)
+        | Q(projects__description__icontains=keyword)
+    ))
+
+
+def _project_keyword_found(keyword: str):
+    return Exists(Project.objects.filter(candidate=OuterRef('pk')).filter(
+        Q(name__icontains=keyword) | Q(description__icontains=keyword)
+    ))
+
+
+def _sum(expressions, output_field):
+    total = Value(0, output_field=output_field)
+    for expression in expressions:
+        total = total + expression
+    return ExpressionWrapper(total, output_field=output_field)
+
+
+def scored_queryset(compiled_jd, pool):
+    """
+    Annotates a candidate queryset with the score_candidate sub-scores, computed by the
+    database: per required skill the best match weight (subqueries), matched_skill_count,
+    experience_days with Case/When banding, role-match flags (EXISTS on the experiences),
+    location and keyword matches, and total_score.
+
+    Scores equal score_candidate's with keyword hits from fulltext.DatabaseBackend: keywords
+    are matched as substrings rather than through the full-text index. With the FTS5 backend
+    keyword scores can differ, since FTS matches whole stemmed tokens ("java" does not match
+    "javascript" there, "searching" matches "search").
+    """
+    annotations = {}
+    skill_fields = []
+    for index, (_, weights) in enumerate(compiled_jd.skill_weights):
+        annotations[f'skill_weight_{index}'] = _best_skill_weight(weights)
+        skill_fields.append(f'skill_weight_{index}')
+    keyword_fields = []
+    for index, keyword in enumerate(compiled_jd.keywords):
+        annotations[f'keyword_{index}'] = _keyword_found(keyword)
+        keyword_fields.append(f'keyword_{index}')
+    project_keyword_fields = []
+    for index, keyword in enumerate(compiled_jd.project_keywords):
+        annotations[f'project_keyword_{index}'] = _project_keyword_found(keyword)
+        project_keyword_fields.append(f'project_keyword_{index}')
+    annotations['experience_days'] = Coalesce(experience_duration(), Value(datetime.timedelta(0)), output_field=DurationField())
+    if compiled_jd.role:
+        annotations['role_exact'] = Exists(Experience.objects.filter(candidate=OuterRef('pk'), role__iexact=compiled_jd.role))
+        annotations['role_partial'] = Exists(Experience.objects.filter(candidate=OuterRef('pk'), role__icontains=compiled_jd.role))
+    queryset = pool.annotate(**annotations)
+
+    scores = {}
+    if skill_fields:
+        scores['matched_skill_count'] = _sum(
+            [Case(When(**{f'{field}__gt': 0}, then=Value(1)), default=Value(0)) for field in skill_fields], IntegerField()
+        )
+        scores['skill_score'] = ExpressionWrapper(
+            _sum([F(field) for field in skill_fields], FloatField()) * Value(30.0 / len(skill_fields)), output_field=FloatField()
+        )
+    else:
+        scores['matched_skill_count'] = Value(0)
+        scores['skill_score'] = Value(30.0)
+
+    required = compiled_jd.experience_years
+    if required is not None:
+        band = Case(
+            When(experience_days__gte=_years(required - 1), experience_days__lte=_years(required + 1), then=Value(25)),
+            When(experience_days__gte=_years(required - 3), experience_days__lte=_years(required + 3), then=Value(15)),
+            default=Value(5),
+        )
+        penalty = Case(
+            When(experience_days__gt=_years(required + 5), then=Value(-5)),
+            When(experience_days__lt=_years(required - 3), then=Value(-5)),
+            default=Value(0),
+        )
+        scores['experience_score'] = ExpressionWrapper(band + penalty, output_field=IntegerField())
+    else:
+        scores['experience_score'] = Value(25)
+
+    if compiled_jd.role:
+        scores['role_score'] = Case(When(role_exact=True, then=Value(20)), When(role_partial=True, then=Value(10)), default=Value(0))
+    else:
+        scores['role_score'] = Value(0)
+
+    # Candidates have no location field; score_candidate compares against the LinkedIn URL
+    if compiled_jd.location:
+        scores['location_score'] = Case(
+            When(linkedin_url__iexact=compiled_jd.location, then=Value(10)),
+            When(linkedin_url__icontains=compiled_jd.location, then=Value(5)),
+            default=Value(0),
+        )
+    else:
+        scores['location_score'] = Value(0)
+
+    total_keywords = len(keyword_fields) + len(project_keyword_fields)
+    scores['keyword_matches'] = _sum(
+        [Case(When(**{field: True}, then=Value(1)), default=Value(0)) for field in keyword_fields + project_keyword_fields],
+        IntegerField(),
+    )
+    queryset = queryset.annotate(**scores)
+    keyword_score = (
+        ExpressionWrapper(F('keyword_matches') * Value(15.0 / total_keywords), output_field=FloatField())
+        if total_keywords else Value(0.0)
+    )
+    return queryset.annotate(keyword_score=keyword_score).annotate(total_score=ExpressionWrapper(
+        F('skill_score') + F('experience_score') + F('role_score') + F('location_score') + F('keyword_score'),
+        output_field=FloatField(),
+    ))
+
+
+def _details(candidate, compiled_jd) -> dict:
+    # The score_candidate details of one ranked row, read from its annotations
+    years = candidate.experience_days.total_seconds() / 86400 / YEAR_DAYS
+    skill_weights = {
+        skill: round(getattr(candidate, f'skill_weight_{index}'), 3)
+        for index, skill in enumerate(compiled_jd.skills)
+        if getattr(candidate, f'skill_weight_{index}') > 0
+    }
+    details = {
+        'matched_skills': list(skill_weights),
+        'skill_match_weights': skill_weights,
+        'skill_score': candidate.skill_score,
+        'candidate_experience': f"{years:.2f} years",
+        'required_experience': f"{compiled_jd.experience_years} years" if compiled_jd.experience_years is not None else "N/A",
+        'experience_score': candidate.experience_score,
+        'matched_roles': [
+            exp.role for exp in candidate.experiences.all()
+            if compiled_jd.role_lower and exp.role and compiled_jd.role_lower in exp.role.lower()
+        ],
+        'role_score': candidate.role_score,
+        'required_role': compiled_jd.role,
+        'candidate_location': candidate.linkedin_url,
+        'location_score': candidate.location_score,
+        'required_location': compiled_jd.location,
+        'matched_keywords': [keyword for index, keyword in enumerate(compiled_jd.keywords) if getattr(candidate, f'keyword_{index}')],
+        'matched_project_keywords': [
+            keyword for index, keyword in enumerate(compiled_jd.project_keywords) if getattr(candidate, f'project_keyword_{index}')
+        ],
+        'keyword_score': candidate.keyword_score,
+        'keyword_relevance': float(candidate.keyword_matches),
+        'required_keywords': compiled_jd.requirements.keywords,
+        'required_project_keywords': compiled_jd.requirements.project_keywords,
+        'total_score': candidate.total_score,
+    }
+    if compiled_jd.experience_years is not None:
+        if years - compiled_jd.experience_years > 5:
+            details['overfit'] = True
+        elif years - compiled_jd.experience_years < -3:
+            details['underfit'] = True
+    return details
+
+
+def rank_in_database(company, compiled_jd, jd_content: str, pool, limit: int | None = None) -> list[tuple]:
+    """
+    Ranking backend that scores, orders and limits in SQL (scored_queryset), so only the
+    top rows are loaded into Python; for pools too large to score in memory. Takes the same
+    arguments as ranking_snapshots.rank_with_snapshot.
+
+    Args:
+        limit: Rows returned, default settings.SQL_RANKING_TOP_K
+
+    Returns:
+        [(candidate, score, details)] best first, at most limit rows
+    """
+    retrieved_ids = retrieval_candidate_ids(company, jd_content, compiled_jd)
+    if retrieved_ids is not None:
+        pool = pool.filter(id__in=retrieved_ids)
+    top = (
+        scored_queryset(compiled_jd, pool)
+        .order_by('-total_score', '-keyword_matches', 'id')
+        .prefetch_related('experiences')[:limit or settings.SQL_RANKING_TOP_K]
+    )
+    return [(candidate, candidate.total_score, _details(candidate, compiled_jd)) for candidate in top]
@@ -1,3 +1,629 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from . import JD_parse, b_views, feature_store, resume_parse, skill_dictionary, skill_matcher, text_extraction, warmup
+from .batch_analysis import create_job, run_job
+from .change_log import prune_changes
+from .fulltext import DatabaseBackend, SQLiteFTSBackend, get_fulltext_backend, match_keywords
+from .JD_parse import JDRequirements, score_pool
+from .jd_compile import CompiledJD
+from .keyword_matcher import JDKeywordMatcher, KeywordAutomaton
+from .models import (
+    AISummary, Candidate, CandidateChange, Company, Experience, ExtractedText, HRProfile, IndexCursor, Project,
+    RankingSnapshot, Skill, SkillDictionaryVersion, SkillSynonym, StoredResume,
+)
+from .rate_limit import GeminiRateController
+from .ranking_snapshots import rank_with_snapshot
+from .resume_store import attach_resume, release_upload, store_resume_file
+from .semantic_search import CandidateVectorIndex
+from .skill_dictionary import attach_candidate_skills, canonical_skill_id
+from .sql_ranking import scored_queryset
+from .single_flight import asingle_flight
+from .warmup import warm_fulltext_index
+
+
+class AsyncSingleFlightTests(TransactionTestCase):
+    def test_waiter_timeout_does_not_cancel_shared_future(self):
+        calls = []
+
+        async def scenario():
+            release = asyncio.Event()
+
+            async def compute():
+                calls.append(1)
+                await release.wait()
+                return 'analysis'
+
+            leader = asyncio.create_task(asingle_flight('test-key', lambda: None, compute, wait=10))
+            while not calls:
+                await asyncio.sleep(0.01)
+            impatient = asyncio.create_task(asingle_flight('test-key', lambda: None, compute, wait=0.05))
+            patient = asyncio.create_task(asingle_flight('test-key', lambda: None, compute, wait=10))
+            with self.assertRaises(asyncio.TimeoutError):
+                await impatient
+            release.set()
+            return await leader, await patient
+
+        self.assertEqual(asyncio.run(scenario()), ('analysis', 'analysis'))
+        self.assertEqual(len(calls), 1)
+
+
+class BatchAnalysisJobTests(TestCase):
+    def setUp(self):
+        self.batch_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.batch_dir.cleanup)
+        self.company = Company.objects.create(name='Acme')
+        user = User.objects.create(username='hr')
+        self.candidates = [
+            Candidate.objects.create(company=self.company, name=name, email=f"{name.lower()}@example.com", created_by=user)
+            for name in ('Alice', 'Bob', 'Carol')
+        ]
+
+    def test_local_backend_job_stores_analyses(self):
+        with override_settings(ANALYSIS_BATCH_DIR=self.batch_dir.name):
+            job = create_job(self.company, 'Backend engineer, Python', backend='beta_1.batch_backends.LocalFakeBackend')
+            self.assertEqual(job.items.count(), 3)
+            run_job(job, chunk_size=2, poll_interval=0)
+
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'COMPLETED')
+            self.assertEqual(set(job.items.values_list('status', flat=True)), {'DONE'})
+            self.assertEqual(job.items.values('remote_batch_id').distinct().count(), 2)
+            summaries = AISummary.objects.filter(company=self.company, job_description_hash=job.job_description_hash)
+            self.assertEqual(
+                sorted(summaries.values_list('candidate_id', flat=True)), [c.id for c in self.candidates]
+            )
+            self.assertTrue(all(summary.score == 50.0 for summary in summaries))
+
+            # Every request asks for the analysis schema
+            job_dir = os.path.join(self.batch_dir.name, f"job-{job.id}")
+            with open(os.path.join(job_dir, sorted(os.listdir(job_dir))[0])) as f:
+                request = json.loads(f.readline())['request']
+            self.assertIn('summary_assessment', request['generation_config']['response_json_schema']['properties'])
+
+            # Analysed candidates get no item in a second job for the same JD
+            self.assertEqual(create_job(self.company, 'Backend engineer, Python').items.count(), 0)
+
+
+class QuotaExceeded(Exception):
+    code = 429
+
+
+class GeminiRateControllerTests(TestCase):
+    @override_settings(GEMINI_INITIAL_CONCURRENCY=8, GEMINI_BACKOFF_BASE=30)
+    def test_simultaneous_429s_halve_the_limit_once(self):
+        controller = GeminiRateController()
+        controller._in_flight = 8
+        for _ in range(8):
+            controller.release('gemini-2.0-flash', 100, error=QuotaExceeded('quota'))
+        self.assertEqual(controller.metrics()['concurrency_limit'], 4)
+
+    @override_settings(GEMINI_WORKER_COUNT=4, GEMINI_RATE_LIMITS={'gemini-2.0-flash': {'rpm': 2000, 'tpm': 0}})
+    def test_limits_are_shared_between_workers(self):
+        self.assertEqual(GeminiRateController()._model_limits('gemini-2.0-flash'), {'rpm': 500, 'tpm': 0})
+
+
+def reset_skill_caches():
+    # Rolled-back tests reuse version numbers: drop what earlier tests cached
+    skill_dictionary._version = skill_dictionary._alias_map = skill_matcher._matcher = None
+
+
+@override_settings(SKILL_DICTIONARY_CHECK_INTERVAL=0)
+class SkillDictionaryVersionTests(TestCase):
+    def setUp(self):
+        reset_skill_caches()
+
+    def test_skill_added_by_another_process_is_matched(self):
+        python = Skill.objects.create(skill_name='Python')
+        compiled = CompiledJD(JDRequirements(skills=['Python', 'Rust']))
+        self.assertEqual(compiled.match_skills({python.id}), {'Python': 1.0})
+
+        # Written by another process: no signal runs here, only the version row moves
+        rust = Skill.objects.bulk_create([Skill(skill_name='Rust')])[0]
+        SkillDictionaryVersion.objects.update(version=F('version') + 1)
+
+        self.assertFalse(compiled.is_current())
+        self.assertEqual(canonical_skill_id(' RUST '), rust.id)
+        recompiled = CompiledJD(JDRequirements(skills=['Python', 'Rust']))
+        self.assertEqual(recompiled.match_skills({python.id, rust.id}), {'Python': 1.0, 'Rust': 1.0})
+        self.assertTrue(recompiled.is_current())
+
+
+class CandidateVectorIndexTests(TestCase):
+    def test_reset_leaves_other_readers_mapping_intact(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = CandidateVectorIndex(directory, dim=8, provider_name='test')
+            reader = CandidateVectorIndex(directory, dim=8, provider_name='test')
+            vectors = np.eye(8, dtype=np.float32)[:3]
+            writer.apply([11, 12, 13], vectors, [])
+            self.assertEqual(reader.search(vectors[1], 1)[0][0], 12)
+            mapped = reader.vectors
+
+            writer.reset()
+            # The reader's old generation is untouched until it remaps
+            np.testing.assert_array_equal(mapped[:3], vectors)
+            self.assertEqual(reader.search(vectors[1], 1), [])
+            self.assertEqual(reader._meta['generation'], writer._meta['generation'])
+
+
+class CandidateChangeLogTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name='Acme')
+        self.user = User.objects.create(username='hr')
+
+    def changes(self, candidate):
+        return CandidateChange.objects.filter(candidate_id=candidate.id).count()
+
+    def test_one_entry_per_candidate_per_transaction(self):
+        with transaction.atomic():
+            candidate = Candidate.objects.create(company=self.company, name='Alice', email='alice@example.com', created_by=self.user)
+            for role in ('Engineer', 'Lead', 'Manager'):
+                Experience.objects.create(candidate=candidate, role=role, company='X')
+            attach_candidate_skills(candidate, ['Python', 'Django', 'SQL'])
+        self.assertEqual(self.changes(candidate), 1)
+
+        # A rolled-back write does not hide the next one
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Experience.objects.create(candidate=candidate, role='Intern', company='Y')
+                raise RuntimeError
+        Experience.objects.create(candidate=candidate, role='Architect', company='Z')
+        self.assertEqual(self.changes(candidate), 2)
+
+    def test_prune_keeps_entries_a_consumer_has_not_applied(self):
+        candidates = [
+            Candidate.objects.create(company=self.company, name=name, email=f"{name}@example.com", created_by=self.user)
+            for name in ('a', 'b', 'c', 'd')
+        ]
+        change_ids = list(CandidateChange.objects.order_by('id').values_list('id', flat=True))
+        IndexCursor.objects.create(name='fulltext', last_change_id=change_ids[1])
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(EMBEDDING_INDEX_DIR=directory, FEATURE_STORE_DIR=directory):
+            self.assertEqual(prune_changes(), 2)
+            self.assertEqual(list(CandidateChange.objects.values_list('candidate_id', flat=True).order_by('id')), [c.id for c in candidates[2:]])
+
+            # With every consumer caught up, only the newest entry stays
+            IndexCursor.objects.filter(name='fulltext').update(last_change_id=change_ids[-1])
+            prune_changes()
+            self.assertEqual(list(CandidateChange.objects.values_list('id', flat=True)), change_ids[-1:])
+
+
+class KeywordAutomatonTests(TestCase):
+    def test_matches_what_substring_search_finds(self):
+        # Overlapping patterns, shared prefixes and suffixes, symbols and mixed case
+        patterns = ['he', 'she', 'his', 'hers', 'Java', 'javascript', 'script', 'C++', 'c#', 'node.js', 'a', 'aaa', '']
+        alphabet = 'ahjsvcripte+#.nod SRHE'
+        rng = random.Random(45)
+        automaton = KeywordAutomaton(patterns)
+        for _ in range(500):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            expected = {index for index, pattern in enumerate(patterns) if pattern and pattern.lower() in text.lower()}
+            self.assertEqual(automaton.find(text), expected, text)
+
+    def test_project_keywords_only_match_projects(self):
+        matcher = JDKeywordMatcher(['Kafka', 'search'], ['search', 'crawler'])
+        self.assertEqual(matcher.match('Kafka and Elasticsearch', 'a web crawler'), (['Kafka', 'search'], ['crawler']))
+        self.assertEqual(matcher.match('', 'site search'), (['search'], ['search']))
+
+
+@override_settings(SKILL_DICTIONARY_CHECK_INTERVAL=0)
+class FullTextIndexTests(TestCase):
+    def setUp(self):
+        reset_skill_caches()
+        company = Company.objects.create(name='Acme')
+        user = User.objects.create(username='hr')
+        self.candidate = Candidate.objects.create(company=company, name='Alice', email='alice@example.com', created_by=user)
+        attach_candidate_skills(self.candidate, ['Python'])
+        Project.objects.create(candidate=self.candidate, name='Crawler', description='Site search on Kafka')
+
+    def test_search_falls_back_until_the_index_is_built(self):
+        if not isinstance(get_fulltext_backend(), SQLiteFTSBackend):
+            self.skipTest('SQLite FTS5 is not available')
+        self.assertFalse(get_fulltext_backend().is_built())
+        hits = match_keywords(['kafka'], ['search'])
+        # The fallback scanned the database and did not build the index on the request path
+        self.assertEqual(hits[self.candidate.id]['project_keywords'], ['search'])
+        self.assertFalse(IndexCursor.objects.filter(name='fulltext').exists())
+
+        warm_fulltext_index()
+        self.assertTrue(get_fulltext_backend().is_built())
+        hits = match_keywords(['kafka'], ['search'])
+        self.assertEqual(hits[self.candidate.id]['project_keywords'], ['search'])
+
+
+def write_pdf(path, pages):
+    """
+    Writes a minimal PDF with one line of Helvetica text per page.
+    """
+    page_ids = [4 + 2 * index for index in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % page_id for page_id in page_ids) + b"] /Count %d >>" % len(pages),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for page_id, text in zip(page_ids, pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_id + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    body, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(body)
+
+
+class TextExtractionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_pdf_stops_at_the_page_cap(self):
+        path = os.path.join(self.directory, 'resume.pdf')
+        write_pdf(path, ['Page one', 'Page two', 'Page three'])
+        text = text_extraction.extract_text(path, max_pages=2)
+        self.assertEqual([page.strip() for page in text.split('\f')], ['Page one', 'Page two'])
+        entry = ExtractedText.objects.get()
+        self.assertEqual((entry.pages, entry.truncated), (2, True))
+
+        # A higher cap extracts the truncated document again
+        self.assertIn('Page three', text_extraction.extract_text(path, max_pages=5))
+        entry.refresh_from_db()
+        self.assertEqual((entry.pages, entry.truncated), (3, False))
+
+    def test_same_bytes_are_extracted_once(self):
+        for name in ('a.txt', 'b.txt'):
+            with open(os.path.join(self.directory, name), 'w') as f:
+                f.write('Alice\nPython developer')
+        self.assertEqual(text_extraction.extract_text(os.path.join(self.directory, 'a.txt')), 'Alice\nPython developer')
+        with mock.patch.object(text_extraction.subprocess, 'run') as run:
+            self.assertEqual(text_extraction.extract_text(os.path.join(self.directory, 'b.txt')), 'Alice\nPython developer')
+        run.assert_not_called()
+        self.assertEqual(ExtractedText.objects.count(), 1)
+
+    @override_settings(TEXT_EXTRACTION_TIMEOUT=0.5)
+    def test_extraction_that_runs_too_long_is_killed(self):
+        path = os.path.join(self.directory, 'slow.txt')
+        with open(path, 'w') as f:
+            f.write('never read')
+        hang = [sys.executable, '-c', 'import time; time.sleep(30)']
+        with mock.patch.object(text_extraction, '_worker_command', return_value=hang):
+            started = time.monotonic()
+            self.assertIsNone(text_extraction.extract_text(path))
+            self.assertIsNone(asyncio.run(text_extraction.aextract_text(path)))
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertFalse(ExtractedText.objects.exists())
+
+
+def resume_text(name, company):
+    return (
+        f"{name}\n{name.split()[0].lower()}@example.com | +1 415 555 0100\nSan Francisco, CA\n\n"
+        f"Skills\nPython, Django\n\nExperience\nBackend Engineer at {company}, 2020 - Present\n"
+    )
+
+
+class ResumeParsingTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        patcher = mock.patch.object(resume_parse, 'generate_content', side_effect=self.generate_content)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generate_content(self, model, contents, config):
+        # Stands in for Gemini: the experience found in each resume is its "Company<n>"
+        schema = config['response_schema']
+        self.calls.append((schema, contents))
+        if schema == list[resume_parse.BatchResumeData]:
+            items = re.findall(r'=== RESUME resume_id=(\d+) ===\n(.*?)\n=== END RESUME', contents, re.DOTALL)
+            parsed = [
+                resume_parse.BatchResumeData(
+                    resume_id=resume_id, professional_experience=[resume_parse.Experience(company=re.search(r'Company\d+', text).group())],
+                    personal_info=resume_parse.PersonalInfo(name=text.split('\n')[0]),
+                )
+                for resume_id, text in items
+            ]
+            # Out of order, one left out and one id that was not asked for
+            parsed = parsed[::-1][1:] + [resume_parse.BatchResumeData(resume_id='99')]
+            return SimpleNamespace(parsed=parsed, text='')
+        experience = [resume_parse.Experience(company=re.search(r'Company\d+', contents).group())]
+        if schema is resume_parse.ResumeSections:
+            return SimpleNamespace(parsed=resume_parse.ResumeSections(professional_experience=experience), text='')
+        return SimpleNamespace(
+            parsed=resume_parse.ResumeData(personal_info=resume_parse.PersonalInfo(name='From LLM'), professional_experience=experience),
+            text='',
+        )
+
+    def test_rules_read_contact_details_and_skills_locally(self):
+        data = resume_parse.extract_resume_details(resume_text('Alice Smith', 'Company1'))
+        [(schema, contents)] = self.calls
+        # Only the experience section goes to the LLM
+        self.assertIs(schema, resume_parse.ResumeSections)
+        self.assertIn('Company1', contents)
+        self.assertNotIn('alice@example.com', contents)
+        self.assertEqual((data.personal_info.name, data.personal_info.email), ('Alice Smith', 'alice@example.com'))
+        self.assertEqual(data.technical_skills.technical_skills, ['Python', 'Django'])
+        self.assertEqual(data.professional_experience[0].company, 'Company1')
+
+    def test_unstructured_resume_falls_back_to_the_llm(self):
+        data = resume_parse.extract_resume_details('Worked on backend systems at Company2 for several years')
+        [(schema, _)] = self.calls
+        self.assertIs(schema, resume_parse.ResumeData)
+        self.assertEqual((data.personal_info.name, data.professional_experience[0].company), ('From LLM', 'Company2'))
+
+    @override_settings(RESUME_BATCH_SIZE=4, RESUME_BATCH_CONCURRENCY=1)
+    def test_batch_results_map_back_to_their_resumes(self):
+        resumes = [resume_text(name, f"Company{index}") for index, name in enumerate(['Alice Smith', 'Bob Jones', 'Carol White', 'Dave Brown'])]
+        resumes.append('Worked on backend systems at Company4 for several years')
+        results = resume_parse.extract_resume_details_batch(resumes)
+
+        self.assertEqual([schema for schema, _ in self.calls].count(list[resume_parse.BatchResumeData]), 2)
+        self.assertEqual([data.professional_experience[0].company for data in results], [f"Company{index}" for index in range(5)])
+        self.assertEqual([data.personal_info.email for data in results[:4]], [f"{name}@example.com" for name in ('alice', 'bob', 'carol', 'dave')])
+        # The item each batch left out was parsed on its own
+        self.assertEqual([schema for schema, _ in self.calls[2:]], [resume_parse.ResumeSections, resume_parse.ResumeData])
+
+
+@override_settings(SKILL_DICTIONARY_CHECK_INTERVAL=0, SEMANTIC_RETRIEVAL_TOP_K=0)
+class CompanyScopingTests(TransactionTestCase):
+    def setUp(self):
+        reset_skill_caches()
+        self.companies = {name: Company.objects.create(name=name) for name in ('Acme', 'Globex')}
+        self.users = {}
+        for name, company in self.companies.items():
+            user = User.objects.create(username=f"hr-{name}")
+            HRProfile.objects.create(user=user, company=company)
+            self.users[name] = user
+            for person in ('alice', 'bob'):
+                candidate = Candidate.objects.create(
+                    company=company, name=f"{person}-{name}", email=f"{person}@{name.lower()}.com", created_by=user
+                )
+                attach_candidate_skills(candidate, ['Python', 'Kafka'])
+        Candidate.objects.filter(name='bob-Acme').update(status='REJECTED')
+        compiled_jd = CompiledJD(JDRequirements(skills=['Python'], keywords=['kafka']), content_hash='python-jd')
+        patcher = mock.patch.object(JD_parse, 'compile_jd', return_value=compiled_jd)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ranked_names(self, **scope):
+        return sorted(candidate.name for candidate, _, _ in JD_parse.find_matching_candidates('Python engineer', **scope))
+
+    def test_ranking_only_sees_one_company(self):
+        self.assertEqual(self.ranked_names(company=self.companies['Acme']), ['alice-Acme'])
+        self.assertEqual(self.ranked_names(user=self.users['Globex']), ['alice-Globex', 'bob-Globex'])
+        self.assertEqual(self.ranked_names(), [])
+
+    def test_keyword_search_is_scoped(self):
+        acme_ids = set(Candidate.objects.filter(company=self.companies['Acme']).values_list('id', flat=True))
+        self.assertEqual(set(match_keywords(['kafka'], company=self.companies['Acme'])), acme_ids)
+        self.assertEqual(set(DatabaseBackend().search(['kafka'], [], company_id=self.companies['Acme'].id)), acme_ids)
+        # And once the FTS index is built
+        warm_fulltext_index()
+        self.assertEqual(set(match_keywords(['kafka'], company=self.companies['Acme'])), acme_ids)
+
+
+class ResumeStoreTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(RESUME_STORE_ROOT=directory.name))
+        company = Company.objects.create(name='Acme')
+        user = User.objects.create(username='hr')
+        self.candidate = Candidate.objects.create(company=company, name='Alice', email='alice@example.com', created_by=user)
+
+    def upload(self):
+        return store_resume_file(SimpleUploadedFile('alice.pdf', b'%PDF-1.4 resume'))
+
+    def test_failed_upload_keeps_a_file_another_upload_is_attaching(self):
+        first, second = self.upload(), self.upload()
+        self.assertEqual(first.path, second.path)
+
+        # The first upload could not be parsed; the second one still holds the file
+        release_upload(first.content_hash)
+        self.assertTrue(os.path.exists(second.path))
+        attach_resume(self.candidate, second)
+        release_upload(second.content_hash)
+        self.assertTrue(os.path.exists(second.path))
+        self.assertEqual(StoredResume.objects.get().ref_count, 1)
+
+    def test_unattached_upload_is_deleted_on_release(self):
+        stored = self.upload()
+        release_upload(stored.content_hash)
+        self.assertFalse(os.path.exists(stored.path))
+        self.assertFalse(StoredResume.objects.exists())
+
+
+@override_settings(SKILL_DICTIONARY_CHECK_INTERVAL=0, SEMANTIC_RETRIEVAL_TOP_K=0)
+class RankingSnapshotTests(TransactionTestCase):
+    # Committed writes: the change log is read the way other requests see it
+
+    def setUp(self):
+        reset_skill_caches()
+        self.company = Company.objects.create(name='Acme')
+        user = User.objects.create(username='hr')
+        self.candidates = {}
+        for name, skills in (('alice', ['Python', 'Django']), ('bob', ['Python']), ('carol', ['Go'])):
+            candidate = Candidate.objects.create(company=self.company, name=name, email=f"{name}@example.com", created_by=user)
+            attach_candidate_skills(candidate, skills)
+            self.candidates[name] = candidate
+        self.compiled_jd = CompiledJD(
+            JDRequirements(skills=['Python', 'Django'], role='Backend Engineer'), content_hash='backend-jd'
+        )
+
+    def rank(self):
+        ranked = rank_with_snapshot(self.company, self.compiled_jd, 'Backend engineer', Candidate.objects.filter(company=self.company))
+        return {candidate.name: score for candidate, score, _ in ranked}
+
+    def test_only_changed_candidates_are_rescored(self):
+        first = self.rank()
+        self.assertEqual(RankingSnapshot.objects.get().rescored_count, 3)
+
+        Experience.objects.create(candidate=self.candidates['bob'], role='Backend Engineer', company='X')
+        second = self.rank()
+        latest = RankingSnapshot.objects.order_by('-id').first()
+        self.assertEqual((latest.rescored_count, latest.candidate_count), (1, 3))
+        self.assertGreater(second['bob'], first['bob'])
+        self.assertEqual({name: second[name] for name in ('alice', 'carol')}, {name: first[name] for name in ('alice', 'carol')})
+
+        # Carried-over scores match a ranking from scratch
+        RankingSnapshot.objects.all().delete()
+        self.assertEqual(self.rank(), second)
+
+
+@override_settings(SKILL_DICTIONARY_CHECK_INTERVAL=0, SEMANTIC_RETRIEVAL_TOP_K=0)
+class FeatureStoreTests(TransactionTestCase):
+    # Committed writes: the store follows the change log the way other workers see it
+
+    def setUp(self):
+        reset_skill_caches()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(FEATURE_STORE_DIR=directory.name))
+        feature_store._stores.clear()
+        self.addCleanup(feature_store._stores.clear)
+        self.company = Company.objects.create(name='Acme')
+        self.user = User.objects.create(username='hr')
+        self.candidates = {name: self.candidate(name, skills) for name, skills in (('alice', ['Python', 'Django']), ('bob', ['Python']), ('carol', ['Go']))}
+        self.compiled_jd = CompiledJD(JDRequirements(skills=['Python', 'Django'], role='Backend Engineer', experience_years=2))
+
+    def candidate(self, name, skills):
+        candidate = Candidate.objects.create(company=self.company, name=name, email=f"{name}@example.com", created_by=self.user)
+        attach_candidate_skills(candidate, skills)
+        return candidate
+
+    def assert_matches_database(self):
+        pool = Candidate.objects.filter(company=self.company)
+        ranked = feature_store.rank_with_features(self.company, self.compiled_jd, 'Backend engineer', pool)
+        expected = {candidate.name: score for candidate, score, _ in score_pool(self.compiled_jd, pool, company=self.company)}
+        self.assertEqual({candidate.name: score for candidate, score, _ in ranked}, expected)
+        features = feature_store.sync_company_features(self.company.id)
+        self.assertEqual(sorted(features.candidate_ids.tolist()), sorted(pool.values_list('id', flat=True)))
+
+    def test_store_follows_candidate_writes(self):
+        self.assert_matches_database()
+        generation = feature_store.sync_company_features(self.company.id).generation
+
+        bob = self.candidates['bob']
+        attach_candidate_skills(bob, ['Django'])
+        Experience.objects.create(
+            candidate=bob, role='Backend Engineer', company='X',
+            start_date=datetime.date.today() - datetime.timedelta(days=800), end_date=datetime.date.today(),
+        )
+        self.candidates['carol'].delete()
+        self.candidate('dave', ['Python'])
+        self.assert_matches_database()
+        features = feature_store.sync_company_features(self.company.id)
+        self.assertEqual(features.generation, generation + 1)
+        self.assertEqual(features.last_change_id, CandidateChange.objects.order_by('-id').values_list('id', flat=True).first())
+
+
+@override_settings(SKILL_DICTIONARY_CHECK_INTERVAL=0)
+class SQLRankingTests(TestCase):
+    def setUp(self):
+        reset_skill_caches()
+        self.company = Company.objects.create(name='Acme')
+        user = User.objects.create(username='hr')
+        today = datetime.date.today()
+
+        def candidate(name, skills, experiences=(), projects=(), linkedin_url=None):
+            candidate = Candidate.objects.create(
+                company=self.company, name=name, email=f"{name}@example.com", created_by=user, linkedin_url=linkedin_url
+            )
+            attach_candidate_skills(candidate, skills)
+            for role, years, ended_years_ago, description in experiences:
+                end = today - datetime.timedelta(days=int(ended_years_ago * 365.25)) if ended_years_ago else None
+                start = (end or today) - datetime.timedelta(days=int(years * 365.25))
+                Experience.objects.create(candidate=candidate, role=role, company='X', start_date=start, end_date=end, description=description)
+            for project_name, description in projects:
+                Project.objects.create(candidate=candidate, name=project_name, description=description)
+
+        candidate('exact', ['Python', 'JavaScript'], [('Backend Engineer', 4, 0, 'Django services on Kafka')], [('Search', 'Elasticsearch')])
+        candidate('partial', ['python3', 'TypeScript'], [('Senior Backend Engineer', 2, 1, ''), ('Intern', 0.5, 3, 'kafka')])
+        candidate('senior', ['Python'], [('Architect', 12, 0, 'django')], [('Crawler', 'site search')], linkedin_url='https://www.linkedin.com/in/berlin')
+        candidate('junior', ['Go'], [('Developer', 0.3, 0, '')])
+        candidate('empty', [])
+        SkillSynonym.objects.create(skill_id=canonical_skill_id('javascript'), related_skill_id=canonical_skill_id('typescript'), weight=0.8)
+
+    def test_sql_scores_match_score_candidate(self):
+        requirements = JDRequirements(
+            skills=['Python', 'JavaScript'], experience_years=4, role='Backend Engineer', location='berlin',
+            keywords=['django', 'kafka'], project_keywords=['search'],
+        )
+        compiled_jd = CompiledJD(requirements)
+        pool = Candidate.objects.filter(company=self.company)
+        # scored_queryset matches keywords as substrings, as the portable full-text backend does
+        keyword_hits = DatabaseBackend().search(compiled_jd.keywords, compiled_jd.project_keywords, company_id=self.company.id)
+
+        expected = {candidate.name: details for candidate, _, details in score_pool(compiled_jd, pool, keyword_hits=keyword_hits)}
+        actual = {candidate.name: candidate for candidate in scored_queryset(compiled_jd, pool)}
+        self.assertEqual(set(actual), set(expected))
+        for name, details in expected.items():
+            for field in ('skill_score', 'experience_score', 'role_score', 'location_score', 'keyword_score', 'total_score'):
+                self.assertAlmostEqual(getattr(actual[name], field), details[field], places=6, msg=f"{name} {field}")
+
+
+@override_settings(SKILL_DICTIONARY_CHECK_INTERVAL=0, WARMUP_ON_BOOT=True)
+class WarmupReadinessTests(TestCase):
+    def setUp(self):
+        reset_skill_caches()
+        saved = dict(warmup._status, steps=dict(warmup._status['steps'])), warmup._boot_enabled
+        self.addCleanup(self.restore, *saved)
+        warmup._status.update(state='idle', started_at=None, finished_at=None, steps={})
+        warmup._boot_enabled = False
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(FEATURE_STORE_DIR=directory.name))
+        feature_store._stores.clear()
+        self.addCleanup(feature_store._stores.clear)
+        company = Company.objects.create(name='Acme')
+        user = User.objects.create(username='hr')
+        candidate = Candidate.objects.create(company=company, name='Alice', email='alice@example.com', created_by=user)
+        attach_candidate_skills(candidate, ['Python'])
+
+    def restore(self, status, boot_enabled):
+        warmup._status.clear()
+        warmup._status.update(status)
+        warmup._boot_enabled = boot_enabled
+
+    def test_not_ready_until_warm_up_finishes(self):
+        # Processes not started by a server entry point are ready straight away
+        self.assertEqual(self.client.get('/skillsync/ready/').status_code, 200)
+
+        # The background thread is replaced by running warm_caches below
+        with mock.patch.object(warmup, 'start_warmup', return_value=True), \
+                mock.patch.object(b_views, 'start_warmup', return_value=False):
+            self.assertTrue(warmup.warm_on_boot())
+            response = self.client.get('/skillsync/ready/')
+            self.assertEqual(response.status_code, 503)
+            self.assertFalse(response.json()['ready'])
+
+            warmup.warm_caches()
+            response = self.client.get('/skillsync/ready/')
+        self.assertEqual(response.status_code, 200)
+        steps = response.json()['steps']
+        self.assertEqual(set(steps), {'skill_dictionary', 'compiled_jds', 'fulltext_index', 'feature_stores'})
+        self.assertFalse([name for name, step in steps.items() if 'error' in step])
+        self.assertTrue(get_fulltext_backend().is_built())
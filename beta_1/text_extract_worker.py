@@ -0,0 +1,102 @@
+"""
+Standalone resume text extractor run by beta_1.text_extraction in a subprocess:
+
+    python text_extract_worker.py <path> <kind> <max_pages> <max_chars> <memory_limit_mb>
+
+Writes {"text", "pages", "truncated", "extractor"} as JSON to stdout. It imports nothing
+from Django so it starts quickly, and a hung or memory-hungry document only takes this
+process down.
+"""
+import json
+import sys
+
+
+def _pdf_pages_pypdf(path, max_pages):
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    for index, page in enumerate(reader.pages):
+        if index >= max_pages:
+            return
+        yield page.extract_text() or ''
+
+
+def _pdf_pages_pdfminer(path, max_pages):
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    for page_layout in extract_pages(path, maxpages=max_pages):
+        yield ''.join(element.get_text() for element in page_layout if isinstance(element, LTTextContainer))
+
+
+def extract_pdf(path, max_pages, max_chars):
+    """
+    Reads the PDF's text layer one page at a time, stopping at max_pages or max_chars.
+    Uses pypdf when installed and pdfminer.six (a pdfplumber dependency) otherwise.
+    """
+    try:
+        import pypdf  # noqa: F401
+        pages, extractor = _pdf_pages_pypdf(path, max_pages + 1), 'pypdf'
+    except ImportError:
+        pages, extractor = _pdf_pages_pdfminer(path, max_pages + 1), 'pdfminer'
+
+    # Generators read one page past the cap only to learn whether the document was cut short
+    parts, total, truncated = [], 0, False
+    for index, text in enumerate(pages):
+        if index >= max_pages:
+            truncated = True
+            break
+        parts.append(text)
+        total += len(text)
+        if total >= max_chars:
+            truncated = True
+            break
+    count = len(parts)
+    # Form feeds between pages let prompt compaction find repeated headers and footers
+    return '\f'.join(parts), count, truncated, extractor
+
+
+def extract_docx(path, max_chars):
+    import docx
+    document = docx.Document(path)
+    parts, total = [], 0
+    blocks = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            blocks.append(' | '.join(cell.text for cell in row.cells))
+    for text in blocks:
+        parts.append(text)
+        total += len(text) + 1
+        if total >= max_chars:
+            return '\n'.join(parts), 1, True, 'python-docx'
+    return '\n'.join(parts), 1, False, 'python-docx'
+
+
+def extract_txt(path, max_chars):
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        text = f.read(max_chars + 1)
+    return text[:max_chars], 1, len(text) > max_chars, 'text'
+
+
+def limit_memory(megabytes):
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return
+    limit = megabytes * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def main(argv):
+    path, kind, max_pages, max_chars = argv[1], argv[2], int(argv[3]), int(argv[4])
+    if len(argv) > 5 and int(argv[5]) > 0:
+        limit_memory(int(argv[5]))
+    if kind == 'pdf':
+        text, pages, truncated, extractor = extract_pdf(path, max_pages, max_chars)
+    elif kind == 'docx':
+        text, pages, truncated, extractor = extract_docx(path, max_chars)
+    else:
+        text, pages, truncated, extractor = extract_txt(path, max_chars)
+    json.dump({'text': text[:max_chars], 'pages': pages, 'truncated': truncated, 'extractor': extractor}, sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import ExtractedText
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'text_extract_worker.py')
+
+PDF_MAGIC = b'%PDF'
+ZIP_MAGIC = b'PK\x03\x04'
+TEXT_EXTENSIONS = {'.txt', '.text', '.md', ''}
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 of a file's bytes, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def detect_kind(path: str) -> str | None:
+    """
+    Returns 'pdf', 'docx' or 'txt' from the file's leading bytes and extension,
+    or None for formats we cannot read (e.g. legacy .doc).
+    """
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    extension = os.path.splitext(path)[1].lower()
+    if head.startswith(PDF_MAGIC):
+        return 'pdf'
+    if head.startswith(ZIP_MAGIC) and extension in ('.docx', ''):
+        return 'docx'
+    if extension in TEXT_EXTENSIONS:
+        return 'txt'
+    return None
+
+
+def _worker_command(path: str, kind: str, max_pages: int) -> list[str]:
+    return [
+        sys.executable, WORKER_PATH, path, kind, str(max_pages),
+        str(settings.TEXT_EXTRACTION_MAX_CHARS), str(settings.TEXT_EXTRACTION_MEMORY_MB),
+    ]
+
+
+def _cached(content_hash: str, max_pages: int) -> ExtractedText | None:
+    entry = ExtractedText.objects.filter(content_hash=content_hash).first()
+    # A PDF cut short by a lower page cap is extracted again when the cap is raised
+    if entry and entry.kind == 'pdf' and entry.truncated and entry.pages < max_pages:
+        return None
+    return entry
+
+
+def _store(content_hash: str, kind: str, result: dict) -> ExtractedText:
+    entry, _ = ExtractedText.objects.update_or_create(
+        content_hash=content_hash,
+        defaults={
+            'text': result['text'],
+            'kind': kind,
+            'pages': result['pages'],
+            'truncated': result['truncated'],
+            'extractor': result['extractor'],
+        },
+    )
+    return entry
+
+
+def _prepare(path: str, max_pages: int | None):
+    """
+    Returns (content_hash, kind, max_pages, cached_text); cached_text is None on a cache miss.
+    """
+    max_pages = max_pages or settings.TEXT_EXTRACTION_MAX_PAGES
+    content_hash = file_digest(path)
+    entry = _cached(content_hash, max_pages)
+    kind = entry.kind if entry else detect_kind(path)
+    return content_hash, kind, max_pages, (entry.text if entry else None)
+
+
+def extract_text(path: str, max_pages: int = None) -> str | None:
+    """
+    Extracts the text of a PDF, DOCX or TXT resume.
+
+    PDFs are read from their text layer page by page up to max_pages (default
+    settings.TEXT_EXTRACTION_MAX_PAGES). Parsing runs in a subprocess with a time and memory
+    limit so a pathological document cannot pin the worker. Results are cached by the
+    SHA-256 of the file's bytes, so the same file uploaded again is not parsed twice.
+
+    Args:
+        path: Path to the resume file
+        max_pages: Optional page cap for PDFs
+
+    Returns:
+        The extracted text, or None if the file could not be read in time
+    """
+    try:
+        content_hash, kind, max_pages, text = _prepare(path, max_pages)
+        if text is not None:
+            return text
+        if kind is None:
+            print(f"Error extracting text from {path}: unsupported file type")
+            return None
+        completed = subprocess.run(
+            _worker_command(path, kind, max_pages),
+            capture_output=True,
+            timeout=settings.TEXT_EXTRACTION_TIMEOUT,
+        )
+        if completed.returncode != 0:
+            print(f"Error extracting text from {path}: {completed.stderr.decode(errors='ignore')[-500:]}")
+            return None
+        return _store(content_hash, kind, json.loads(completed.stdout)).text
+    except subprocess.TimeoutExpired:
+        print(f"Error extracting text from {path}: timed out after {settings.TEXT_EXTRACTION_TIMEOUT}s")
+        return None
+    except Exception as e:
+        print(f"Error extracting text from {path}: {e}")
+        return None
+
+
+async def aextract_text(path: str, max_pages: int = None) -> str | None:
+    """
+    Async counterpart of extract_text: waits on the extraction subprocess without holding a thread.
+    """
+    try:
+        content_hash, kind, max_pages, text = await sync_to_async(_prepare)(path, max_pages)
+        if text is not None:
+            return text
+        if kind is None:
+            print(f"Error extracting text from {path}: unsupported file type")
+            return None
+        process = await asyncio.create_subprocess_exec(
+            *_worker_command(path, kind, max_pages),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=settings.TEXT_EXTRACTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            print(f"Error extracting text from {path}: timed out after {settings.TEXT_EXTRACTION_TIMEOUT}s")
+            return None
+        if process.returncode != 0:
+            print(f"Error extracting text from {path}: {stderr.decode(errors='ignore')[-500:]}")
+            return None
+        entry = await sync_to_async(_store)(content_hash, kind, json.loads(stdout))
+        return entry.text
+    except Exception as e:
+        print(f"Error extracting text from {path}: {e}")
+        return None
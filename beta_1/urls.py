@@ -1,5 +1,5 @@
 from django.urls import path
-from . import b_views
+from . import b_views, b_async_views
 
 urlpatterns = [
     # Company Management
@@ -15,14 +15,17 @@ urlpatterns = [
     path('skillsync/candidates/<int:pk>/', b_views.candidate_detail_update_status, name='candidate-detail-update'),
 
     # Resume & Profile Management
-    path('skillsync/resume/upload/', b_views.upload_resume_api, name='resume-upload'),
-    path('skillsync/linkedin/search/', b_views.linkedin_search_api, name='linkedin-search'),
-    path('skillsync/linkedin/profile/', b_views.scrape_and_analyze_linkedin_profile_api, name='linkedin-profile-scrape'),
+    path('skillsync/resume/upload/', b_async_views.upload_resume_api, name='resume-upload'),
+    path('skillsync/linkedin/search/', b_async_views.linkedin_search_api, name='linkedin-search'),
+    path('skillsync/linkedin/profile/', b_async_views.scrape_and_analyze_linkedin_profile_api, name='linkedin-profile-scrape'),
 
     # Dashboard & Search
     path('skillsync/dashboard/', b_views.hr_dashboard_summary, name='hr-dashboard'),
     # path('skillsync/search/candidates/', b_views.search_candidates_by_jd, name='search-candidates'),
+    path('skillsync/search/candidates/stream/', b_async_views.search_candidates_stream, name='search-candidates-stream'),
+    path('skillsync/llm/metrics/', b_views.llm_metrics, name='llm-metrics'),
+    path('skillsync/ready/', b_views.readiness, name='readiness'),
 
     # AI Analysis
-    path('skillsync/analysis/generate/', b_views.generate_candidate_analysis, name='generate-candidate-analysis'),
+    path('skillsync/analysis/generate/', b_async_views.generate_candidate_analysis, name='generate-candidate-analysis'),
 ]
\ No newline at end of file
@@ -11,14 +11,14 @@ from django.shortcuts import get_object_or_404
 from django.conf import settings
 import os
 import beta_1.resume_parse as resume_parse
-import mimetypes
-import pdfplumber
-import docx
 from dateutil import parser
 import datetime
 from beta_1 import JD_parse
 from beta_1.JD_parse import calculate_total_experience
 from beta_1.JD_scrape import search_and_store_profiles
+from beta_1.skill_dictionary import attach_candidate_skills
+from beta_1.text_extraction import extract_text
+from beta_1.resume_store import attach_resume, cached_resume_data, parse_stored_resume, release_upload, store_resume_file
 import http.client
 import json
 from google import genai
@@ -62,16 +62,8 @@ def generate_ai_summary(candidate, job_description):
     return f"Summary for {candidate.name} relevant to the job description."
 
 def extract_text_from_resume(file_path):
-    mime, _ = mimetypes.guess_type(file_path)
-    if mime == 'application/pdf':
-        with pdfplumber.open(file_path) as pdf:
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
-    elif mime in ['application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'application/msword']:
-        doc = docx.Document(file_path)
-        return "\n".join([para.text for para in doc.paragraphs])
-    else:  # Assume plain text
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
+    # PDF/DOCX/TXT extraction with page cap, subprocess timeout and content-hash cache
+    return extract_text(file_path) or ''
 
 class ResumeUploadView(APIView):
     parser_classes = [MultiPartParser, FormParser]
@@ -80,17 +72,14 @@ class ResumeUploadView(APIView):
         file_obj = request.FILES.get('resume')
         if not file_obj:
             return Response({'error': 'No file uploaded.'}, status=status.HTTP_400_BAD_REQUEST)
-        # Save file
-        resume_dir = os.path.join(settings.BASE_DIR, 'resumes')
-        os.makedirs(resume_dir, exist_ok=True)
-        file_path = os.path.join(resume_dir, file_obj.name)
-        with open(file_path, 'wb+') as destination:
-            for chunk in file_obj.chunks():
-                destination.write(chunk)
-        # Read file content for parsing
-        resume_content = extract_text_from_resume(file_path)
-        parsed = resume_parse.extract_resume_details(resume_content)
+        # Save file into the content-addressed store; an identical earlier upload reuses its parse
+        stored = store_resume_file(file_obj)
+        parsed = cached_resume_data(stored.content_hash)
+        if parsed is None:
+            resume_content = extract_text_from_resume(stored.path)
+            parsed = parse_stored_resume(stored, resume_content) if resume_content else None
         if not parsed or not parsed.personal_info:
+            release_upload(stored.content_hash)
             return Response({'error': 'Failed to parse resume.'}, status=400)
         info = parsed.personal_info
         # Check if candidate exists by email
@@ -101,17 +90,19 @@ class ResumeUploadView(APIView):
                 'phone': info.phone or '',
                 'linkedin_url': info.linkedin_url or '',
                 'github_url': '',  # Not parsed in current schema
-                'resume_file_path': file_path
             }
         )
-        if not created:
+        if created:
+            attach_resume(candidate, stored)
+            release_upload(stored.content_hash)
+        else:
             # Update existing candidate fields
             candidate.name = info.name or candidate.name
             candidate.phone = info.phone or candidate.phone
             candidate.linkedin_url = info.linkedin_url or candidate.linkedin_url
             candidate.github_url = candidate.github_url  # Not parsed
-            candidate.resume_file_path = file_path
-            candidate.save()
+            attach_resume(candidate, stored)
+            release_upload(stored.content_hash)
             # Remove old related data
             CandidateSkill.objects.filter(candidate=candidate).delete()
             Experience.objects.filter(candidate=candidate).delete()
@@ -125,9 +116,7 @@ class ResumeUploadView(APIView):
                 skills += parsed.technical_skills.frameworks_libraries
             if parsed.technical_skills.tools:
                 skills += parsed.technical_skills.tools
-        for skill_name in set(skills):
-            skill, _ = Skill.objects.get_or_create(skill_name=skill_name)
-            CandidateSkill.objects.create(candidate=candidate, skill=skill)
+        attach_candidate_skills(candidate, skills)
         # Add experiences
         if parsed.professional_experience:
             for exp in parsed.professional_experience:
@@ -176,7 +165,7 @@ class CandidateResumeView(APIView):
 class CandidateSearchView(APIView):
     def post(self, request):
         jd_text = request.data.get('query', '')
-        matches = JD_parse.get_candidate_scores_from_llm(jd_text)
+        matches = JD_parse.get_candidate_scores_from_llm(jd_text, user=request.user, min_years=request.data.get('min_years'))
         print(matches)
         if not matches:
             return Response({'error': 'No matches found.'}, status=404)
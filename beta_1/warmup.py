@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+_status = {'state': 'idle', 'started_at': None, 'finished_at': None, 'steps': {}}
+_status_lock = threading.Lock()
+_thread = None
+# Set by warm_on_boot in processes started from a server entry point
+_boot_enabled = False
+
+
+def warm_skill_dictionary() -> int:
+    from .skill_dictionary import get_alias_map
+    from .skill_matcher import get_skill_matcher
+    alias_map = get_alias_map()
+    get_skill_matcher()
+    return len(alias_map)
+
+
+def warm_compiled_jds(limit: int) -> int:
+    """
+    Compiles the most recently searched job descriptions from their saved requirements.
+    """
+    from .jd_compile import compile_jd
+    from .models import JobDescription
+    contents = JobDescription.objects.order_by('-last_used_at').values_list('content', flat=True)[:limit]
+    return sum(1 for content in contents if compile_jd(content, record_use=False))
+
+
+def warm_fulltext_index() -> int:
+    """
+    Builds the full-text index if it has never been built, otherwise applies pending changes.
+    Returns the number of candidates indexed by a rebuild (0 for a sync).
+    """
+    from .fulltext import get_fulltext_backend
+    from .models import Candidate
+    backend = get_fulltext_backend()
+    if backend.is_built():
+        backend.sync()
+        return 0
+    backend.rebuild()
+    return Candidate.objects.count()
+
+
+def warm_feature_stores(limit: int) -> int:
+    """
+    Maps (building or syncing where needed) the feature arrays of the companies whose
+    candidates changed most recently.
+    """
+    from .feature_store import sync_company_features
+    from .models import Company
+    company_ids = (
+        Company.objects.annotate(last_activity=Max('candidates__updated_at'))
+        .filter(last_activity__isnull=False).order_by('-last_activity').values_list('id', flat=True)[:limit]
+    )
+    for company_id in company_ids:
+        sync_company_features(company_id)
+    return len(company_ids)
+
+
+def _run_step(name: str, warm, *args):
+    started = time.monotonic()
+    result = {}
+    try:
+        result['count'] = warm(*args)
+    except Exception as e:
+        print(f"Error warming {name}: {e}")
+        result['error'] = str(e)
+    result['seconds'] = round(time.monotonic() - started, 3)
+    with _status_lock:
+        _status['steps'][name] = result
+    return result
+
+
+def warm_caches(recent_jds: int | None = None, companies: int | None = None) -> dict:
+    """
+    Preloads the caches the first searches would otherwise fill: the skill alias map and
+    matcher, the compiled form of recently searched JDs, the full-text index and per-company
+    feature arrays.
+    A failing step is reported and the rest still run; what it missed loads on first use.
+
+    Args:
+        recent_jds: JDs to compile, default settings.WARMUP_RECENT_JDS
+        companies: Companies whose features are mapped, default settings.WARMUP_COMPANIES
+
+    Returns:
+        The warm-up status (warmup_status)
+    """
+    with _status_lock:
+        _status.update(state='warming', started_at=timezone.now().isoformat(), finished_at=None, steps={})
+    _run_step('skill_dictionary', warm_skill_dictionary)
+    _run_step('compiled_jds', warm_compiled_jds, settings.WARMUP_RECENT_JDS if recent_jds is None else recent_jds)
+    _run_step('fulltext_index', warm_fulltext_index)
+    _run_step('feature_stores', warm_feature_stores, settings.WARMUP_COMPANIES if companies is None else companies)
+    with _status_lock:
+        _status.update(state='ready', finished_at=timezone.now().isoformat())
+    return warmup_status()
+
+
+def _warm_in_background():
+    try:
+        warm_caches()
+    finally:
+        connection.close()
+
+
+def start_warmup() -> bool:
+    """
+    Starts warm_caches in a background thread unless it is running or has finished.
+    Returns True if a warm-up was started.
+    """
+    global _thread
+    with _status_lock:
+        if _status['state'] != 'idle':
+            return False
+        _status['state'] = 'warming'
+        _thread = threading.Thread(target=_warm_in_background, name='cache-warmup', daemon=True)
+    _thread.start()
+    return True
+
+
+def warm_on_boot() -> bool:
+    """
+    Called by the server entry points (skillsync/wsgi.py, skillsync/asgi.py) once the
+    application is loaded: starts the background warm-up when settings.WARMUP_ON_BOOT is on.
+    Management commands, tests and scripts do not import them, so they never warm up.
+    Returns True if a warm-up was started.
+    """
+    global _boot_enabled
+    if not settings.WARMUP_ON_BOOT:
+        return False
+    _boot_enabled = True
+    return start_warmup()
+
+
+def boot_warmup_enabled() -> bool:
+    return _boot_enabled
+
+
+def _after_fork_in_child():
+    # A warm-up thread does not survive fork (e.g. a preloading gunicorn master): let the
+    # worker start its own. The lock may have been held by another thread at fork time.
+    global _thread, _status_lock
+    _status_lock = threading.Lock()
+    if _thread is not None and _status['state'] == 'warming':
+        _status.update(state='idle', started_at=None, finished_at=None, steps={})
+        _thread = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def warmup_status() -> dict:
+    """
+    Returns this process's warm-up progress. 'ready' is True once warm-up has finished,
+    or straight away in a process that does not warm up on boot (see warm_on_boot).
+    """
+    with _status_lock:
+        status = dict(_status, steps=dict(_status['steps']))
+    status['ready'] = status['state'] == 'ready' or (status['state'] == 'idle' and not _boot_enabled)
+    return status
@@ -2,6 +2,8 @@
 ASGI config for skillsync project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn skillsync.asgi:application``) so the
+streaming search endpoint delivers its server-sent events as they are produced.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -14,3 +16,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "skillsync.settings")
 
 application = get_asgi_application()
+
+# Serving processes preload the search caches in the background; /skillsync/ready/ reports
+# when they are warm
+from beta_1.warmup import warm_on_boot  # noqa: E402
+
+warm_on_boot()
@@ -130,3 +130,137 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'assets')
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# SkillSync application settings
+
+# How long (in seconds) a scraped LinkedIn profile is reused before ScrapingDog is called again.
+SCRAPED_PROFILE_MAX_AGE = int(os.getenv("SCRAPED_PROFILE_MAX_AGE", 7 * 24 * 60 * 60))
+
+# Minimum n-gram/token similarity for a candidate skill to count towards a required skill.
+SKILL_MATCH_MIN_SIMILARITY = float(os.getenv("SKILL_MATCH_MIN_SIMILARITY", 0.6))
+
+# Each process rebuilds its skill alias map and matcher when the skill dictionary version in the
+# database moves; the version is read at most every SKILL_DICTIONARY_CHECK_INTERVAL seconds.
+SKILL_DICTIONARY_CHECK_INTERVAL = float(os.getenv("SKILL_DICTIONARY_CHECK_INTERVAL", 5))
+
+# Semantic candidate retrieval. EMBEDDING_PROVIDER is a dotted path to a provider class in
+# beta_1.semantic_search (HashingEmbeddingProvider, SentenceTransformerProvider, GeminiEmbeddingProvider).
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "beta_1.semantic_search.HashingEmbeddingProvider")
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", 384))
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", os.path.join(BASE_DIR, "media", "embeddings"))
+# Semantically closest candidates kept by the retrieval stage, on top of every candidate matching a
+# required skill or JD keyword, before scoring and the LLM; 0 disables the stage.
+SEMANTIC_RETRIEVAL_TOP_K = int(os.getenv("SEMANTIC_RETRIEVAL_TOP_K", 200))
+# Pools up to this size are scanned exactly instead of through the LSH buckets.
+SEMANTIC_BRUTE_FORCE_LIMIT = int(os.getenv("SEMANTIC_BRUTE_FORCE_LIMIT", 20000))
+
+# Full-text backend for keyword matching (dotted path to a beta_1.fulltext backend class).
+# Empty picks SQLite FTS5 when available and the portable database backend otherwise.
+FULLTEXT_BACKEND = os.getenv("FULLTEXT_BACKEND", "")
+
+# LLM re-ranking: only the top-K deterministic matches are sent, in chunks of at most
+# LLM_RERANK_CHUNK_TOKENS (estimated) scored concurrently and calibrated on shared anchors.
+LLM_RERANK_TOP_K = int(os.getenv("LLM_RERANK_TOP_K", 50))
+LLM_RERANK_CHUNK_TOKENS = int(os.getenv("LLM_RERANK_CHUNK_TOKENS", 6000))
+LLM_RERANK_CONCURRENCY = int(os.getenv("LLM_RERANK_CONCURRENCY", 4))
+LLM_RERANK_ANCHORS = int(os.getenv("LLM_RERANK_ANCHORS", 2))
+
+# Single-flight for LLM analyses: identical concurrent requests wait for one computation.
+# A worker's lease is taken over after SINGLE_FLIGHT_LEASE_TTL seconds; waiters give up after SINGLE_FLIGHT_WAIT.
+SINGLE_FLIGHT_LEASE_TTL = float(os.getenv("SINGLE_FLIGHT_LEASE_TTL", 180))
+SINGLE_FLIGHT_WAIT = float(os.getenv("SINGLE_FLIGHT_WAIT", 120))
+
+# Resume text extraction: PDFs are read up to TEXT_EXTRACTION_MAX_PAGES pages from their text layer,
+# in a subprocess killed after TEXT_EXTRACTION_TIMEOUT seconds and capped at TEXT_EXTRACTION_MEMORY_MB (0 = no cap).
+TEXT_EXTRACTION_MAX_PAGES = int(os.getenv("TEXT_EXTRACTION_MAX_PAGES", 15))
+TEXT_EXTRACTION_MAX_CHARS = int(os.getenv("TEXT_EXTRACTION_MAX_CHARS", 100000))
+TEXT_EXTRACTION_TIMEOUT = float(os.getenv("TEXT_EXTRACTION_TIMEOUT", 20))
+TEXT_EXTRACTION_MEMORY_MB = int(os.getenv("TEXT_EXTRACTION_MEMORY_MB", 512))
+
+# Content-addressed resume store: uploads are saved once per SHA-256 under sharded directories.
+RESUME_STORE_ROOT = os.getenv("RESUME_STORE_ROOT", os.path.join(BASE_DIR, "media", "resume_store"))
+
+# Prompt compaction: resume and JD text is cleaned and cut to an estimated token budget per model.
+PROMPT_TOKEN_BUDGETS = {
+    "gemini-2.0-flash": int(os.getenv("PROMPT_TOKEN_BUDGET_GEMINI_2_0_FLASH", 12000)),
+    "gemini-1.5-flash": int(os.getenv("PROMPT_TOKEN_BUDGET_GEMINI_1_5_FLASH", 12000)),
+}
+PROMPT_TOKEN_BUDGET_DEFAULT = int(os.getenv("PROMPT_TOKEN_BUDGET_DEFAULT", 8000))
+
+# Resume parsing: contact details and skills are read with local rules; below this confidence (0-1)
+# the whole resume is parsed by the LLM instead. Set above 1 to always use the LLM.
+RESUME_RULES_MIN_CONFIDENCE = float(os.getenv("RESUME_RULES_MIN_CONFIDENCE", 0.8))
+
+# Batched resume parsing for bulk imports: resumes up to RESUME_BATCH_ITEM_TOKENS (estimated) are packed
+# RESUME_BATCH_SIZE at a time into requests of at most RESUME_BATCH_TOKENS, RESUME_BATCH_CONCURRENCY in parallel.
+RESUME_BATCH_SIZE = int(os.getenv("RESUME_BATCH_SIZE", 8))
+RESUME_BATCH_TOKENS = int(os.getenv("RESUME_BATCH_TOKENS", 10000))
+RESUME_BATCH_ITEM_TOKENS = int(os.getenv("RESUME_BATCH_ITEM_TOKENS", 2500))
+RESUME_BATCH_CONCURRENCY = int(os.getenv("RESUME_BATCH_CONCURRENCY", 4))
+
+# Offline batch re-analysis (manage.py batch_analyze_candidates): requests are written to JSONL files of
+# ANALYSIS_BATCH_CHUNK_SIZE under ANALYSIS_BATCH_DIR and run on ANALYSIS_BATCH_BACKEND
+# (beta_1.batch_backends.LocalFakeBackend never calls Gemini).
+ANALYSIS_BATCH_BACKEND = os.getenv("ANALYSIS_BATCH_BACKEND", "beta_1.batch_backends.GeminiBatchBackend")
+ANALYSIS_BATCH_DIR = os.getenv("ANALYSIS_BATCH_DIR", os.path.join(BASE_DIR, "media", "batch_jobs"))
+ANALYSIS_BATCH_CHUNK_SIZE = int(os.getenv("ANALYSIS_BATCH_CHUNK_SIZE", 500))
+ANALYSIS_BATCH_POLL_INTERVAL = float(os.getenv("ANALYSIS_BATCH_POLL_INTERVAL", 60))
+
+# Gemini rate limiting: every call waits for its model's requests/tokens per minute (GEMINI_RATE_LIMITS,
+# 0 = unlimited) and an adaptive concurrency limit between 1 and GEMINI_MAX_CONCURRENCY. 429s and
+# transient errors are retried GEMINI_MAX_RETRIES times with jittered exponential backoff.
+# The limits are for the whole deployment and every process gets 1/GEMINI_WORKER_COUNT of them:
+# set it to the number of server and worker processes calling Gemini.
+GEMINI_RATE_LIMITS = {
+    "gemini-2.0-flash": {
+        "rpm": int(os.getenv("GEMINI_2_0_FLASH_RPM", 2000)),
+        "tpm": int(os.getenv("GEMINI_2_0_FLASH_TPM", 4000000)),
+    },
+    "gemini-1.5-flash": {
+        "rpm": int(os.getenv("GEMINI_1_5_FLASH_RPM", 2000)),
+        "tpm": int(os.getenv("GEMINI_1_5_FLASH_TPM", 4000000)),
+    },
+}
+GEMINI_DEFAULT_RATE_LIMIT = {
+    "rpm": int(os.getenv("GEMINI_DEFAULT_RPM", 1000)),
+    "tpm": int(os.getenv("GEMINI_DEFAULT_TPM", 1000000)),
+}
+GEMINI_WORKER_COUNT = max(1, int(os.getenv("GEMINI_WORKER_COUNT", 1)))
+GEMINI_INITIAL_CONCURRENCY = int(os.getenv("GEMINI_INITIAL_CONCURRENCY", 8))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 32))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 4))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", 1.0))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", 60))
+GEMINI_QUEUE_TIMEOUT = float(os.getenv("GEMINI_QUEUE_TIMEOUT", 120))
+
+# Job descriptions: requirements are extracted once per JD text and saved (JobDescription); each process
+# keeps the compiled form of the COMPILED_JD_CACHE_SIZE most recently searched JDs.
+COMPILED_JD_CACHE_SIZE = int(os.getenv("COMPILED_JD_CACHE_SIZE", 256))
+
+# Ranking snapshots: each company's ranking per JD is stored and only changed candidates are re-scored;
+# the RANKING_SNAPSHOT_HISTORY most recent snapshots per JD are kept.
+RANKING_SNAPSHOT_HISTORY = int(os.getenv("RANKING_SNAPSHOT_HISTORY", 10))
+
+# Candidate ranking pool (candidate_pool.candidate_pool): statuses left out of rankings, and whether a
+# candidate needs at least one skill counting towards a required JD skill to be ranked.
+RANKING_EXCLUDED_STATUSES = [status for status in os.getenv("RANKING_EXCLUDED_STATUSES", "REJECTED").split(",") if status]
+RANKING_REQUIRE_SKILL_MATCH = os.getenv("RANKING_REQUIRE_SKILL_MATCH", "False") == "True"
+
+# Ranking backend, the dotted path of a function (company, compiled_jd, jd_content, pool) -> ranking:
+# beta_1.ranking_snapshots.rank_with_snapshot scores in Python with incremental snapshots;
+# beta_1.sql_ranking.rank_in_database scores in SQL and returns only the top SQL_RANKING_TOP_K rows;
+# beta_1.feature_store.rank_with_features scores from the memory-mapped feature arrays under FEATURE_STORE_DIR.
+RANKING_BACKEND = os.getenv("RANKING_BACKEND", "beta_1.ranking_snapshots.rank_with_snapshot")
+SQL_RANKING_TOP_K = int(os.getenv("SQL_RANKING_TOP_K", 200))
+
+# Candidate feature store: packed per-company ranking features (skills, experience, roles, location) in
+# memory-mapped files shared by all workers, updated from the candidate change log.
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", os.path.join(BASE_DIR, "media", "features"))
+
+# Cache warm-up: processes started from skillsync/wsgi.py or asgi.py preload the skill dictionary, the WARMUP_RECENT_JDS most recently
+# searched JDs, the full-text index and the feature arrays of the WARMUP_COMPANIES most active companies in the background;
+# /skillsync/ready/ returns 503 until they are loaded. `manage.py warm_caches` runs the same preload.
+WARMUP_ON_BOOT = os.getenv("WARMUP_ON_BOOT", "True") == "True"
+WARMUP_RECENT_JDS = int(os.getenv("WARMUP_RECENT_JDS", 50))
+WARMUP_COMPANIES = int(os.getenv("WARMUP_COMPANIES", 20))
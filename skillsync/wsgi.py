@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "skillsync.settings")
 
 application = get_wsgi_application()
+
+# Serving processes preload the search caches in the background; /skillsync/ready/ reports
+# when they are warm
+from beta_1.warmup import warm_on_boot  # noqa: E402
+
+warm_on_boot()